@@ -0,0 +1,159 @@
+from typing import Optional
+import asyncio
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Brotli support is optional (pip install brotli); gzip is always available
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Bodies smaller than this are sent uncompressed
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+# Levels tuned for dynamic responses: most of the size win for a fraction
+# of the CPU of the maximum settings
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Complete bodies at least this large are compressed in a worker thread
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+# Server-sent events must reach the client as they are written
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, or None"""
+    supported = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            qualities[coding] = quality
+
+    best, best_quality = None, 0.0
+    for coding in supported:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        # Ties go to the first supported coding, i.e. brotli
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+class _Compressor:
+    """Incremental gzip or brotli compressor"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        if self.encoding == "br":
+            if finish:
+                return self._brotli.process(data) + self._brotli.finish()
+            # Flush so streamed chunks (e.g. NDJSON lines) aren't held back
+            return self._brotli.process(data) + self._brotli.flush()
+        mode = zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH
+        return self._zlib.compress(data) + self._zlib.flush(mode)
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli or gzip, as negotiated via Accept-Encoding
+
+    Complete bodies below minimum_size, responses that already carry a
+    Content-Encoding and server-sent events are passed through. Streaming
+    bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+
+    def _should_pass_through(self, message: Message) -> bool:
+        headers = Headers(raw=message["headers"])
+        content_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        return (
+            message["status"] in (204, 206, 304)
+            or "content-encoding" in headers
+            or content_type in EXCLUDED_CONTENT_TYPES
+        )
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Held back until the first body chunk shows what to do with it
+            self.start_message = message
+            self.passthrough = self._should_pass_through(message)
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            start_message = self.start_message
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._send(start_message)
+                await self._send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                del headers["Content-Length"]
+                body = self.compressor.compress(body, finish=False)
+            else:
+                if len(body) >= THREAD_MINIMUM_SIZE:
+                    body = await asyncio.to_thread(self.compressor.compress, body, True)
+                else:
+                    body = self.compressor.compress(body, finish=True)
+                headers["Content-Length"] = str(len(body))
+            await self._send(start_message)
+            await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        body = self.compressor.compress(body, finish=not more_body)
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
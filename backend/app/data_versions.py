@@ -0,0 +1,85 @@
+from typing import Dict, List, Optional, Sequence, NamedTuple
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+# Change counters kept by the data_version triggers in db/init.sql. Responses
+# that depend on the current date (days until expiry, alert buckets) include
+# it in the version, and Last-Modified is never earlier than today's start.
+DATA_VERSIONS_QUERY = text("""
+    SELECT
+        CURRENT_DATE AS today,
+        string_agg(table_name || ':' || version, ',' ORDER BY table_name) AS versions,
+        GREATEST(MAX(updated_at), CURRENT_DATE::timestamptz) AS last_modified
+    FROM data_versions
+    WHERE table_name = ANY(:tables)
+""")
+
+# Tables behind each conditional GET
+INVENTORY_TABLES = ["inventory_items", "products", "categories", "stores"]
+# inventory_expiry_buckets is only bumped by the day rollover (see db/init.sql)
+ALERT_TABLES = INVENTORY_TABLES + ["inventory_expiry_buckets"]
+RECOMMENDATION_TABLES = ["recommendations"]
+DASHBOARD_TABLES = ["dashboard_stats"]
+
+class DataVersion(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime]
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        # no-cache makes browsers revalidate every poll instead of reusing blindly
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+def _data_version_from_row(row, extra: Sequence[str]) -> DataVersion:
+    key = "|".join([str(row.today), row.versions or ""] + [str(part) for part in extra])
+    etag = 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+    return DataVersion(etag=etag, last_modified=row.last_modified)
+
+def get_data_version(db: Session, tables: List[str], *extra: str) -> DataVersion:
+    """Version of the given tables, plus anything else the response depends on"""
+    row = db.execute(DATA_VERSIONS_QUERY, {"tables": tables}).one()
+    return _data_version_from_row(row, extra)
+
+async def get_data_version_async(db: AsyncSession, tables: List[str], *extra: str) -> DataVersion:
+    """Async version of get_data_version"""
+    row = (await db.execute(DATA_VERSIONS_QUERY, {"tables": tables})).one()
+    return _data_version_from_row(row, extra)
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def is_not_modified(request: Request, version: DataVersion) -> bool:
+    """Whether the client's cached copy is still current"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, version.etag)
+
+    # If-Modified-Since only applies without If-None-Match
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and version.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return version.last_modified.replace(microsecond=0) <= since
+    return False
+
+def not_modified_response(request: Request, version: DataVersion) -> Optional[Response]:
+    """A 304 response when the client's copy is current, else None"""
+    if is_not_modified(request, version):
+        return Response(status_code=304, headers=version.headers)
+    return None
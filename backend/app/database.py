@@ -1,8 +1,20 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from fastapi import Request
+from typing import Dict, Any, List, Optional
+import itertools
+import logging
 import os
+import time
+import threading
 from dotenv import load_dotenv
+from .query_stats import instrument_engine
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
@@ -10,12 +22,206 @@ load_dotenv()
 # Get database URL from environment or use default
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://smartshelf:smartshelf_password@db:5432/smartshelf_db")
 
+# Connection pool settings, applied to both the sync and the async engine.
+# Each worker process can open up to DB_POOL_SIZE + DB_MAX_OVERFLOW
+# connections per engine, which is what to budget against max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Optional streaming replicas (comma-separated URLs). Read-only routes spread
+# over them round-robin; writes and background jobs stay on the primary.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# A replica that fails to connect is skipped for this long before it's tried again
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+# Fail over quickly instead of waiting on an unreachable replica
+DB_REPLICA_CONNECT_TIMEOUT = float(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "2"))
+
+# Request header asking for reads from the primary, to see the request's own writes
+READ_YOUR_WRITES_HEADER = "x-read-your-writes"
+
+class PoolWaitStats:
+    """Counters for how long checkouts wait on a pool"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+    
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+    
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "total_wait_seconds": round(self.total_wait_seconds, 6),
+                "avg_wait_seconds": round(self.total_wait_seconds / attempts, 6) if attempts else 0.0,
+                "max_wait_seconds": round(self.max_wait_seconds, 6)
+            }
+
+class _TimedCheckoutMixin:
+    """Times how long each checkout blocks waiting for a free connection"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+    
+    def recreate(self):
+        # Keep the counters when the engine rebuilds its pool (e.g. after dispose)
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start)
+        return connection
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
 # Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+instrument_engine(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _asyncpg_url(url: str) -> str:
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+# Async engine for the API routes, on the same database through asyncpg
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _asyncpg_url(DATABASE_URL))
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncAdaptedQueuePool, **POOL_OPTIONS
+)
+instrument_engine(async_engine.sync_engine)
+
+# Create async session factory; objects stay usable after commit so routes
+# can build responses without lazy-loading on a closed transaction
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+class Replica:
+    """A read replica's async engine and its health"""
+    
+    def __init__(self, url: str):
+        parsed = make_url(url)
+        self.name = f"{parsed.host}:{parsed.port or 5432}/{parsed.database}"
+        self.engine = create_async_engine(
+            _asyncpg_url(url),
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            connect_args={"timeout": DB_REPLICA_CONNECT_TIMEOUT},
+            **POOL_OPTIONS
+        )
+        instrument_engine(self.engine.sync_engine)
+        self.down_until = 0.0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+    
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+class ReplicaRouter:
+    """Round-robin over the healthy replicas; empty when none are configured or up"""
+    
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._next = itertools.count()
+    
+    def candidates(self) -> List[Replica]:
+        """Healthy replicas in the order to try them for one session"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return []
+        start = next(self._next) % len(healthy)
+        return healthy[start:] + healthy[:start]
+    
+    def mark_down(self, replica: Replica, error: Exception) -> None:
+        replica.down_until = time.monotonic() + DB_REPLICA_RETRY_SECONDS
+        replica.failures += 1
+        replica.last_error = str(error)
+        logger.warning(f"Replica {replica.name} unavailable, skipping it for {DB_REPLICA_RETRY_SECONDS}s: {error}")
+    
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "failures": replica.failures,
+                "last_error": replica.last_error,
+            }
+            for replica in self.replicas
+        ]
+    
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+replica_router = ReplicaRouter(DATABASE_REPLICA_URLS)
+
+def pool_status(pool) -> Dict[str, Any]:
+    """Live usage and wait-time counters for an engine's pool"""
+    status = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # Negative while the pool hasn't opened pool_size connections yet
+        "overflow": pool.overflow(),
+        "max_connections": pool.size() + DB_MAX_OVERFLOW,
+    }
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        status.update(wait_stats.as_dict())
+    return status
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool settings and live stats for the sync, async and replica engines"""
+    return {
+        "settings": {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+        },
+        "sync": pool_status(engine.pool),
+        "async": pool_status(async_engine.sync_engine.pool),
+        "replicas": {
+            replica.name: pool_status(replica.engine.sync_engine.pool)
+            for replica in replica_router.replicas
+        },
+    }
+
 # Create base class for ORM models
 Base = declarative_base()
 
@@ -25,4 +231,36 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Dependency for getting an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def reads_from_primary(request: Request) -> bool:
+    """Whether the request opted into reading from the primary (read-your-writes)"""
+    return request.headers.get(READ_YOUR_WRITES_HEADER, "").lower() in ("1", "true")
+
+async def open_read_session(use_primary: bool = False) -> AsyncSession:
+    """
+    Session for read-only work on a healthy replica, or the primary when
+    asked for, when no replica is configured or when every replica is down
+    """
+    if not use_primary:
+        for replica in replica_router.candidates():
+            db = AsyncSessionLocal(bind=replica.engine)
+            try:
+                # Connect now, so an unreachable replica fails over here
+                await db.connection()
+                return db
+            except (exc.DBAPIError, OSError) as e:
+                await db.close()
+                replica_router.mark_down(replica, e)
+    return AsyncSessionLocal()
+
+# Dependency for read-only routes: a replica session unless the request asks
+# for read-your-writes. Never write through it.
+async def get_async_read_db(request: Request):
+    async with await open_read_session(reads_from_primary(request)) as db:
+        yield db
@@ -1,7 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import products, chat, recommendations
-from app.database import engine, Base
+from app.routers import products, chat, recommendations, inventory, events, admin
+from app.database import engine, async_engine, replica_router, Base
+from app.models.dashboard import dashboard_service
+from app.models.live_updates import live_updates
+from app.models.feedback import feedback_ingestor
+from app.models.scheduled_jobs import register_default_jobs
+from app.scheduler import job_scheduler, JOBS_ENABLED
+from app.compression import CompressionMiddleware
+from app.query_stats import QueryStatsMiddleware
+from app.metrics import MetricsMiddleware, metrics_registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
 import os
 import json
 from dotenv import load_dotenv
@@ -39,10 +47,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Recommendation refreshes, dashboard rollups and model reloads (see /admin/jobs)
+register_default_jobs(job_scheduler)
+
+# Per-request SQL statement counts and timings (see /admin/sql-stats)
+app.add_middleware(QueryStatsMiddleware)
+
+# Negotiated brotli/gzip compression for larger responses
+app.add_middleware(CompressionMiddleware)
+
+# Request latency and in-flight metrics (outermost, so compression is included)
+app.add_middleware(MetricsMiddleware)
+
+@app.on_event("startup")
+async def start_background_services():
+    dashboard_service.start()
+    live_updates.start()
+    feedback_ingestor.start()
+    if JOBS_ENABLED:
+        job_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await job_scheduler.stop()
+    await live_updates.stop()
+    await feedback_ingestor.stop()
+    dashboard_service.stop()
+    await async_engine.dispose()
+    await replica_router.dispose()
+
 # Include routers
 app.include_router(products.router, tags=["products"])
 app.include_router(chat.router, tags=["chat"])
 app.include_router(recommendations.router, tags=["recommendations"])
+app.include_router(inventory.router, tags=["inventory"])
+app.include_router(events.router, tags=["events"])
+app.include_router(admin.router, tags=["admin"])
 
 @app.get("/")
 async def root():
@@ -52,6 +92,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker process"""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/test")
 async def test_api():
     """Simple test endpoint to verify API is working"""
@@ -0,0 +1,304 @@
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .database import get_pool_stats
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# LLM round trips take seconds, not milliseconds
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+# Background jobs run from well under a second to several minutes
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _ShardedValues:
+    """
+    Per-thread value arrays, summed when scraped
+
+    Each thread only ever writes its own shard, so recording needs no lock
+    (the lock is taken once per thread, when its shard is registered).
+    """
+
+    def __init__(self, width: int):
+        self._width = width
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, List[float]]] = []
+        self._register_lock = threading.Lock()
+
+    def get(self, key: LabelValues) -> List[float]:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._register_lock:
+                self._shards.append(shard)
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0.0] * self._width
+        return values
+
+    def collect(self) -> Dict[LabelValues, List[float]]:
+        with self._register_lock:
+            shards = list(self._shards)
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in shards:
+            for key, values in list(shard.items()):
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = list(values)
+                else:
+                    for index, value in enumerate(values):
+                        total[index] += value
+        return totals
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonic counter; label values are passed positionally"""
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values = _ShardedValues(1)
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._values.get(labelvalues)[0] += amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(values[0])}"
+            for key, values in sorted(self._values.collect().items())
+        ]
+
+class Gauge(Counter):
+    """Up/down gauge (e.g. requests in flight); shards may go negative, their sum doesn't"""
+    type = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self._values.get(labelvalues)[0] -= amount
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed bucket upper bounds"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket, one for +Inf, then the sum
+        self._values = _ShardedValues(len(self.buckets) + 2)
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        values = self._values.get(labelvalues)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        """Observe the duration of the block, including when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def samples(self) -> List[str]:
+        lines = []
+        bucket_names = self.labelnames + ("le",)
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for key, values in sorted(self._values.collect().items()):
+            cumulative = 0.0
+            for bound, count in zip(bounds, values[:-1]):
+                cumulative += count
+                labels = _format_labels(bucket_names, key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+class CallbackMetric(_Metric):
+    """Gauge or counter whose values are read from elsewhere at scrape time"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[LabelValues, float]], type: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.type = type
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self.callback().items())
+        ]
+
+class MetricsRegistry:
+    """Metrics rendered by GET /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> bytes:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return ("\n".join(lines) + "\n").encode()
+
+metrics_registry = MetricsRegistry()
+
+http_request_duration_seconds = metrics_registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Time to serve an HTTP request, until the last body chunk is sent",
+    ("method", "route", "status"),
+))
+http_requests_in_progress = metrics_registry.register(Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ("method",),
+))
+predictor_inference_duration_seconds = metrics_registry.register(Histogram(
+    "predictor_inference_duration_seconds",
+    "Time spent running inference on the prediction models",
+    ("operation",),
+))
+llm_request_duration_seconds = metrics_registry.register(Histogram(
+    "llm_request_duration_seconds",
+    "Time spent waiting on LLM chat completion calls",
+    ("model", "call"),
+    buckets=LLM_BUCKETS,
+))
+llm_request_errors_total = metrics_registry.register(Counter(
+    "llm_request_errors_total",
+    "LLM chat completion calls that raised",
+    ("model", "call"),
+))
+llm_tokens_total = metrics_registry.register(Counter(
+    "llm_tokens_total",
+    "Tokens reported by the LLM API",
+    ("model", "type"),
+))
+
+job_duration_seconds = metrics_registry.register(Histogram(
+    "job_duration_seconds",
+    "Time taken by scheduled job runs, by outcome",
+    ("job", "status"),
+    buckets=JOB_BUCKETS,
+))
+jobs_in_progress = metrics_registry.register(Gauge(
+    "jobs_in_progress",
+    "Scheduled job runs currently executing in this worker",
+    ("job",),
+))
+
+def _pool_engines() -> Dict[str, dict]:
+    stats = get_pool_stats()
+    engines = {"sync": stats["sync"], "async": stats["async"]}
+    engines.update({f"replica:{name}": status for name, status in stats["replicas"].items()})
+    return engines
+
+def _pool_values(*fields: str) -> Callable[[], Dict[LabelValues, float]]:
+    def collect() -> Dict[LabelValues, float]:
+        return {
+            (engine, field): status[field]
+            for engine, status in _pool_engines().items()
+            for field in fields
+            if field in status
+        }
+    return collect
+
+metrics_registry.register(CallbackMetric(
+    "db_pool_connections",
+    "Connection pool usage per engine",
+    ("engine", "state"),
+    _pool_values("size", "checked_out", "checked_in", "overflow", "max_connections"),
+))
+metrics_registry.register(CallbackMetric(
+    "db_pool_events_total",
+    "Pool checkouts and checkout timeouts per engine",
+    ("engine", "event"),
+    _pool_values("checkouts", "timeouts"),
+    type="counter",
+))
+metrics_registry.register(CallbackMetric(
+    "db_pool_wait_seconds_total",
+    "Total time checkouts spent waiting for a free connection",
+    ("engine",),
+    lambda: {
+        (engine,): status["total_wait_seconds"]
+        for engine, status in _pool_engines().items()
+    },
+    type="counter",
+))
+
+def _route_label(scope: Scope) -> str:
+    # The route template, so path parameters don't multiply the series
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """Records request latency by route and status, and requests in flight"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec(method)
+            http_request_duration_seconds.observe(
+                time.perf_counter() - start, method, _route_label(scope), status
+            )
@@ -6,6 +6,7 @@ import json
 from datetime import datetime, timedelta
 import pandas as pd
 import random
+import time
 from dotenv import load_dotenv
 
 # Configure logging - reduce verbosity
@@ -14,6 +15,7 @@ logger = logging.getLogger(__name__)
 
 # Import predictor service
 from .predictor import predictor_service
+from ..metrics import llm_request_duration_seconds, llm_request_errors_total, llm_tokens_total
 
 # Try to quietly load from .env file without excessive logging
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -550,6 +552,24 @@ def create_function_specs():
     ]
 
 # Agentic Service class
+def create_chat_completion(client, call: str, **kwargs):
+    """client.chat.completions.create, recorded in the LLM latency, error and token metrics"""
+    model = kwargs["model"]
+    start = time.perf_counter()
+    try:
+        response = client.chat.completions.create(**kwargs)
+    except Exception:
+        llm_request_errors_total.inc(model, call)
+        raise
+    finally:
+        llm_request_duration_seconds.observe(time.perf_counter() - start, model, call)
+    
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        llm_tokens_total.inc(model, "prompt", amount=usage.prompt_tokens or 0)
+        llm_tokens_total.inc(model, "completion", amount=usage.completion_tokens or 0)
+    return response
+
 class AgenticService:
     """Service to handle agentic interactions using OpenAI function calling"""
     
@@ -592,7 +612,9 @@ class AgenticService:
             client = OpenAI(api_key=api_key)
             
             # First, ask the model what function it would like to call
-            response = client.chat.completions.create(
+            response = create_chat_completion(
+                client,
+                "tool_selection",
                 model="gpt-3.5-turbo",  # Using a more widely available model
                 messages=[
                     {"role": "system", "content": "You are an AI assistant for SmartShelf, an intelligent product management system for tracking perishable products. CRITICAL INSTRUCTION: You must ONLY provide information returned directly by the function calls. DO NOT make up or hallucinate any product IDs, statistics, or data. When asked for specific products, you MUST first call a function to retrieve the actual data. If a user asks about 'highest risk' products, you MUST query products with risk_level='high' and sort by days_to_expiry. NEVER mention specific product information unless it was explicitly returned in your function call results."},
@@ -651,7 +673,9 @@ class AgenticService:
                     })
                 
                 # Get the final response
-                final_response = client.chat.completions.create(
+                final_response = create_chat_completion(
+                    client,
+                    "final_answer",
                     model="gpt-3.5-turbo",  # Using a more widely available model
                     messages=messages
                 )
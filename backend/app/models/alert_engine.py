@@ -0,0 +1,107 @@
+from typing import Dict, List, Any, Tuple
+import asyncio
+import logging
+from functools import lru_cache
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from ..database import AsyncSessionLocal
+from ..serialization import serializer_for_paths
+
+logger = logging.getLogger(__name__)
+
+# Alert reads go through inventory_expiry_buckets, which holds the expiration
+# date and alert level of every inventory item. Triggers in db/init.sql keep
+# it in sync as inventory_items change and the expiry_buckets_rollover job
+# rolls the levels forward when the date changes, so a request only touches
+# the rows within its threshold. Should the job not have run yet today (e.g.
+# JOBS_ENABLED=false), the first alert read of the day does the rollover.
+
+# Alert fields as (dotted response path, SQL expression), in response order
+ALERT_COLUMNS = [
+    ("product.id", "b.inventory_item_id"),
+    ("product.product_id", "p.id"),
+    ("product.name", "p.name"),
+    ("product.category", "c.name"),
+    ("product.store", "s.name"),
+    ("product.quantity", "i.quantity"),
+    ("product.expiration_date", "b.expiration_date"),
+    ("product.days_until_expiry", "(b.expiration_date - CURRENT_DATE)"),
+    ("alert_level", "b.alert_level"),
+    ("recommended_action", "expiry_recommended_action(b.alert_level)"),
+]
+
+ALERTS_QUERY_TEMPLATE = """
+    SELECT 
+        {columns}
+    FROM 
+        inventory_expiry_buckets b
+        JOIN inventory_items i ON b.inventory_item_id = i.id
+        JOIN products p ON i.product_id = p.id
+        JOIN categories c ON p.category_id = c.id
+        {store_join}
+    WHERE 
+        b.expiration_date <= CURRENT_DATE + CAST(:threshold AS INTEGER)
+    ORDER BY
+        b.expiration_date ASC, b.inventory_item_id ASC
+"""
+
+@lru_cache(maxsize=64)
+def _alerts_query(paths: Tuple[str, ...]):
+    """ALERTS_QUERY_TEMPLATE selecting only the given ALERT_COLUMNS paths"""
+    expressions = dict(ALERT_COLUMNS)
+    return text(ALERTS_QUERY_TEMPLATE.format(
+        columns=",\n        ".join(f"{expressions[path]} AS c{index}" for index, path in enumerate(paths)),
+        # store_id is NOT NULL, so stores is only joined for its name
+        store_join="JOIN stores s ON i.store_id = s.id" if "product.store" in paths else ""
+    ))
+
+ALERT_PATHS = tuple(path for path, _ in ALERT_COLUMNS)
+ALERTS_QUERY = _alerts_query(ALERT_PATHS)
+
+REFRESH_QUERY = text("SELECT refresh_inventory_expiry_buckets()")
+
+# Whether the stored levels are from before today
+ROLLOVER_DUE_QUERY = text("SELECT computed_on < CURRENT_DATE FROM inventory_expiry_rollover")
+
+class AlertEngine:
+    """Serves expiry alerts from the precomputed expiry buckets"""
+    
+    def __init__(self):
+        self._rollover_lock = asyncio.Lock()
+    
+    async def roll_forward(self, db: AsyncSession) -> int:
+        """Roll the stored alert levels forward to today; returns the buckets whose level changed"""
+        rolled = (await db.execute(REFRESH_QUERY)).scalar() or 0
+        await db.commit()
+        if rolled:
+            logger.info(f"Rolled {rolled} expiry buckets forward")
+        return rolled
+    
+    async def ensure_rolled_over(self, db: AsyncSession) -> None:
+        """Roll the levels forward first if they are from an earlier day"""
+        if not (await db.execute(ROLLOVER_DUE_QUERY)).scalar():
+            return
+        async with self._rollover_lock:
+            # On the primary, as `db` may be a replica session; the function
+            # locks the rollover row, so other workers wait and find it done
+            async with AsyncSessionLocal() as primary:
+                await self.roll_forward(primary)
+    
+    async def get_alerts(
+        self,
+        db: AsyncSession,
+        threshold: int,
+        paths: Tuple[str, ...] = ALERT_PATHS
+    ) -> List[Dict[str, Any]]:
+        """
+        Get inventory items expiring within `threshold` days, soonest first
+        
+        `paths` narrows the query and each alert to a subset of ALERT_COLUMNS
+        (see select_fields()).
+        """
+        results = (await db.execute(_alerts_query(paths), {"threshold": threshold})).fetchall()
+        
+        to_dict = serializer_for_paths(paths).to_dict
+        return [to_dict(row) for row in results]
+
+alert_engine = AlertEngine()
@@ -0,0 +1,308 @@
+from typing import Dict, Optional, Tuple
+import os
+import time
+import threading
+import logging
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from ..database import SessionLocal
+from .db_models import DashboardStat as DBDashboardStat
+from .schemas import DashboardSummary, DashboardHistory, DashboardHistoryPeriod, DashboardMetricChange
+from ..data_versions import DataVersion, get_data_version, get_data_version_async, DASHBOARD_TABLES
+
+logger = logging.getLogger(__name__)
+
+# How often the background refresher brings dashboard_stats up to date
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "30"))
+# Oldest snapshot GET /dashboard will serve before falling back to dashboard_stats
+DASHBOARD_MAX_STALENESS_SECONDS = float(os.getenv("DASHBOARD_MAX_STALENESS_SECONDS", "120"))
+
+# How often the refresher replaces the folded deltas with a full recompute
+DASHBOARD_RECONCILE_SECONDS = float(os.getenv("DASHBOARD_RECONCILE_SECONDS", "3600"))
+
+# Full recompute of today's row (see recompute_dashboard_stats() in db/init.sql)
+RECOMPUTE_STATS_QUERY = text("SELECT recompute_dashboard_stats()")
+
+# Apply the deltas appended by the dashboard triggers to today's row. Deltas
+# are only consumed once today's row exists; on a new day the refresher
+# reconciles first, which creates it.
+FOLD_DELTAS_QUERY = text("""
+    WITH folded AS (
+        DELETE FROM dashboard_stat_deltas
+        WHERE EXISTS (SELECT 1 FROM dashboard_stats WHERE date = CURRENT_DATE)
+        RETURNING total_savings, active_promotions, transferred_products, products_on_alert
+    ),
+    totals AS (
+        SELECT
+            COUNT(*) AS delta_count,
+            COALESCE(SUM(total_savings), 0) AS total_savings,
+            COALESCE(SUM(active_promotions), 0) AS active_promotions,
+            COALESCE(SUM(transferred_products), 0) AS transferred_products,
+            COALESCE(SUM(products_on_alert), 0) AS products_on_alert
+        FROM folded
+    )
+    UPDATE dashboard_stats d
+    SET
+        total_savings = d.total_savings + t.total_savings,
+        active_promotions = d.active_promotions + t.active_promotions,
+        transferred_products = d.transferred_products + t.transferred_products,
+        products_on_alert = d.products_on_alert + t.products_on_alert,
+        updated_at = CURRENT_TIMESTAMP
+    FROM totals t
+    WHERE d.date = CURRENT_DATE AND t.delta_count > 0
+""")
+
+TODAY_STATS_EXISTS_QUERY = text("SELECT EXISTS (SELECT 1 FROM dashboard_stats WHERE date = CURRENT_DATE)")
+
+HISTORY_GRANULARITIES = ("day", "week", "month")
+HISTORY_METRICS = ("total_savings", "active_promotions", "transferred_products", "products_on_alert")
+
+# One row per period holding the last day's stats (they are point-in-time
+# values, not flows) and the change from the previous period. The window
+# reaches one period further back so the first period gets its change too,
+# and the date range is served by the unique index on dashboard_stats.date.
+HISTORY_QUERY_TEMPLATE = """
+    WITH last_days AS (
+        SELECT DISTINCT ON (period_start)
+            period_start,
+            date AS as_of,
+            total_savings,
+            active_promotions,
+            transferred_products,
+            products_on_alert
+        FROM (
+            SELECT date_trunc('{granularity}', date)::date AS period_start, *
+            FROM dashboard_stats
+            WHERE date >= date_trunc('{granularity}', CURRENT_DATE) - CAST(:periods AS INTEGER) * INTERVAL '1 {granularity}'
+        ) s
+        ORDER BY period_start, date DESC
+    ),
+    with_previous AS (
+        SELECT
+            *,
+            LAG(total_savings) OVER w AS prev_total_savings,
+            LAG(active_promotions) OVER w AS prev_active_promotions,
+            LAG(transferred_products) OVER w AS prev_transferred_products,
+            LAG(products_on_alert) OVER w AS prev_products_on_alert
+        FROM last_days
+        WINDOW w AS (ORDER BY period_start)
+    )
+    SELECT
+        period_start,
+        as_of,
+        total_savings,
+        total_savings - prev_total_savings AS total_savings_change,
+        (total_savings - prev_total_savings) * 100.0 / NULLIF(prev_total_savings, 0) AS total_savings_change_pct,
+        active_promotions,
+        active_promotions - prev_active_promotions AS active_promotions_change,
+        (active_promotions - prev_active_promotions) * 100.0 / NULLIF(prev_active_promotions, 0) AS active_promotions_change_pct,
+        transferred_products,
+        transferred_products - prev_transferred_products AS transferred_products_change,
+        (transferred_products - prev_transferred_products) * 100.0 / NULLIF(prev_transferred_products, 0) AS transferred_products_change_pct,
+        products_on_alert,
+        products_on_alert - prev_products_on_alert AS products_on_alert_change,
+        (products_on_alert - prev_products_on_alert) * 100.0 / NULLIF(prev_products_on_alert, 0) AS products_on_alert_change_pct
+    FROM with_previous
+    WHERE period_start > date_trunc('{granularity}', CURRENT_DATE) - CAST(:periods AS INTEGER) * INTERVAL '1 {granularity}'
+    ORDER BY period_start
+"""
+
+HISTORY_QUERIES = {
+    granularity: text(HISTORY_QUERY_TEMPLATE.format(granularity=granularity))
+    for granularity in HISTORY_GRANULARITIES
+}
+
+def _round(value, digits: int = 2) -> Optional[float]:
+    return None if value is None else round(float(value), digits)
+
+def _history_period_from_row(row) -> DashboardHistoryPeriod:
+    mapping = row._mapping
+    metrics = {
+        metric: DashboardMetricChange(
+            value=_round(mapping[metric]) or 0.0,
+            change=_round(mapping[f"{metric}_change"]),
+            change_pct=_round(mapping[f"{metric}_change_pct"], 1)
+        )
+        for metric in HISTORY_METRICS
+    }
+    return DashboardHistoryPeriod(period_start=row.period_start, as_of=row.as_of, **metrics)
+
+EMPTY_SUMMARY = DashboardSummary(
+    total_savings=0,
+    active_promotions=0,
+    transferred_products=0,
+    products_on_alert=0
+)
+
+def _summary_from_stats(stats: Optional[DBDashboardStat]) -> DashboardSummary:
+    if not stats:
+        return EMPTY_SUMMARY
+    return DashboardSummary(
+        total_savings=float(stats.total_savings),
+        active_promotions=stats.active_promotions,
+        transferred_products=stats.transferred_products,
+        products_on_alert=stats.products_on_alert
+    )
+
+class DashboardSnapshotService:
+    """
+    Keeps an in-process snapshot of the dashboard summary
+
+    A background thread folds the trigger-recorded deltas into dashboard_stats
+    (with a full reconcile on a new day or every DASHBOARD_RECONCILE_SECONDS)
+    and swaps in a new snapshot, so GET /dashboard is a read of process memory
+    and never aggregates or writes to dashboard_stats itself.
+    """
+
+    def __init__(
+        self,
+        refresh_seconds: float = DASHBOARD_REFRESH_SECONDS,
+        max_staleness_seconds: float = DASHBOARD_MAX_STALENESS_SECONDS,
+        reconcile_seconds: float = DASHBOARD_RECONCILE_SECONDS
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.max_staleness_seconds = max_staleness_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self._reconciled_at: Optional[float] = None
+        self._snapshot: Optional[DashboardSummary] = None
+        self._snapshot_version: Optional[DataVersion] = None
+        self._refreshed_at = 0.0
+        # History responses keyed by (granularity, periods), valid for one refresh
+        self._history_cache: Dict[Tuple[str, int], DashboardHistory] = {}
+        self._generation = 0
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def snapshot(self) -> Optional[DashboardSummary]:
+        """The latest snapshot, or None before the first refresh"""
+        return self._snapshot
+
+    @property
+    def snapshot_age(self) -> Optional[float]:
+        """Seconds since the current snapshot was taken, or None without one"""
+        if self._snapshot is None:
+            return None
+        return time.monotonic() - self._refreshed_at
+
+    def reconcile(self, db: Session) -> None:
+        """Recompute today's row from scratch, discarding the deltas it already covers"""
+        # One snapshot for both statements: deltas committed after it are not
+        # part of the recompute and stay queued for the next fold
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        db.execute(text("DELETE FROM dashboard_stat_deltas"))
+        db.execute(RECOMPUTE_STATS_QUERY)
+        db.commit()
+        self._reconciled_at = time.monotonic()
+
+    def fold_deltas(self, db: Session) -> None:
+        """Apply pending trigger deltas to today's row"""
+        db.execute(FOLD_DELTAS_QUERY)
+        db.commit()
+
+    def _needs_reconcile(self, db: Session) -> bool:
+        if self._reconciled_at is None:
+            return True
+        if time.monotonic() - self._reconciled_at >= self.reconcile_seconds:
+            return True
+        return not db.execute(TODAY_STATS_EXISTS_QUERY).scalar()
+
+    def refresh(self) -> DashboardSummary:
+        """Bring today's dashboard_stats row up to date, then swap the snapshot"""
+        with self._refresh_lock:
+            db = SessionLocal()
+            try:
+                if self._needs_reconcile(db):
+                    db.rollback()
+                    self.reconcile(db)
+                else:
+                    self.fold_deltas(db)
+
+                # Version first, so it can only be older than the row it tags
+                version = get_data_version(db, DASHBOARD_TABLES)
+                stats = db.query(DBDashboardStat).order_by(DBDashboardStat.date.desc()).first()
+                summary = _summary_from_stats(stats)
+            finally:
+                db.close()
+
+            self._snapshot, self._snapshot_version = summary, version
+            self._refreshed_at = time.monotonic()
+            self._generation += 1
+            self._history_cache = {}
+            return summary
+
+    def rollup(self) -> DashboardSummary:
+        """Recompute today's row from scratch (instead of folding deltas), then swap the snapshot"""
+        self._reconciled_at = None
+        return self.refresh()
+
+    async def get_summary(self, db: AsyncSession) -> DashboardSummary:
+        """Get the dashboard summary, served from the snapshot when fresh enough"""
+        summary, _ = await self.get_versioned_summary(db)
+        return summary
+
+    async def get_versioned_summary(self, db: AsyncSession) -> Tuple[DashboardSummary, DataVersion]:
+        """Get the dashboard summary along with the data version it reflects"""
+        snapshot, version = self._snapshot, self._snapshot_version
+        age = self.snapshot_age
+        if snapshot is not None and age is not None and age <= self.max_staleness_seconds:
+            return snapshot, version
+
+        # No usable snapshot (refresher not started yet or falling behind):
+        # serve the last persisted row, which is a plain read
+        version = await get_data_version_async(db, DASHBOARD_TABLES)
+        result = await db.execute(
+            select(DBDashboardStat).order_by(DBDashboardStat.date.desc()).limit(1)
+        )
+        return _summary_from_stats(result.scalars().first()), version
+
+    async def get_history(self, db: AsyncSession, granularity: str, periods: int) -> DashboardHistory:
+        """Get the last `periods` days/weeks/months of stats with period-over-period changes"""
+        # dashboard_stats only changes when the refresher runs, so a cached
+        # history is good until the next refresh
+        age = self.snapshot_age
+        cacheable = age is not None and age <= self.max_staleness_seconds
+        key = (granularity, periods)
+        if cacheable:
+            cached = self._history_cache.get(key)
+            if cached is not None:
+                return cached
+
+        generation = self._generation
+        result = await db.execute(HISTORY_QUERIES[granularity], {"periods": periods})
+        history = DashboardHistory(
+            granularity=granularity,
+            periods=periods,
+            history=[_history_period_from_row(row) for row in result]
+        )
+        # Don't cache a result that may predate a refresh that happened meanwhile
+        if cacheable and generation == self._generation:
+            self._history_cache[key] = history
+        return history
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing dashboard snapshot: {e}")
+            self._stop_event.wait(self.refresh_seconds)
+
+    def start(self) -> None:
+        """Start the background refresher thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="dashboard-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresher thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+dashboard_service = DashboardSnapshotService()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Date, ForeignKey, DateTime, Text, Numeric
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, ForeignKey, DateTime, Text, Numeric, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
@@ -68,6 +68,25 @@ class InventoryItem(Base):
     transfers = relationship("Transfer", back_populates="inventory_item")
     promotion_items = relationship("PromotionItem", back_populates="inventory_item")
     recommendation_items = relationship("RecommendationItem", back_populates="inventory_item")
+    
+    # Expiry lookups; kept in sync with db/init.sql
+    __table_args__ = (
+        Index("idx_inventory_items_expiration_date", "expiration_date"),
+        Index("idx_inventory_items_store_expiration", "store_id", "expiration_date"),
+        Index("idx_inventory_items_product_store", "product_id", "store_id", "expiration_date"),
+    )
+
+class InventoryExpiryBucket(Base):
+    __tablename__ = "inventory_expiry_buckets"
+    
+    # Maintained by triggers in db/init.sql; see app/models/alert_engine.py
+    inventory_item_id = Column(Integer, ForeignKey("inventory_items.id", ondelete="CASCADE"), primary_key=True)
+    expiration_date = Column(Date, nullable=False)
+    alert_level = Column(String, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_inventory_expiry_buckets_expiration", "expiration_date", "inventory_item_id"),
+    )
 
 class Transfer(Base):
     __tablename__ = "transfers"
@@ -134,6 +153,13 @@ class Recommendation(Base):
     
     # Relationships
     recommendation_items = relationship("RecommendationItem", back_populates="recommendation")
+    
+    # Listing and keyset pagination; kept in sync with db/init.sql
+    __table_args__ = (
+        Index("idx_recommendations_created", created_at.desc(), id.desc()),
+        Index("idx_recommendations_impact_created", "impact", created_at.desc(), id.desc()),
+        Index("idx_recommendations_acted_upon_created", "acted_upon", "created_at", "id"),
+    )
 
 class RecommendationItem(Base):
     __tablename__ = "recommendation_items"
@@ -0,0 +1,304 @@
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from collections import defaultdict
+from datetime import datetime, timezone
+import asyncio
+import os
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from ..database import AsyncSessionLocal
+from ..serialization import dumps_json
+from .schemas import FeedbackRate, FeedbackStats
+
+logger = logging.getLogger(__name__)
+
+# How long feedback waits in the buffer for more events to share its commit
+FEEDBACK_FLUSH_INTERVAL_MS = float(os.getenv("FEEDBACK_FLUSH_INTERVAL_MS", "50"))
+# Buffered events that trigger a commit without waiting for the interval
+FEEDBACK_MAX_BATCH = int(os.getenv("FEEDBACK_MAX_BATCH", "1000"))
+# Buffered events beyond which new feedback is refused until the buffer drains
+FEEDBACK_MAX_PENDING = int(os.getenv("FEEDBACK_MAX_PENDING", "50000"))
+
+EXPORT_BATCH_SIZE = 1000
+
+# (recommendation id, is_useful, received at)
+PendingEvent = Tuple[int, bool, datetime]
+
+# Recommendations of a batch with their latest feedback and scope, locked in id
+# order so concurrent flushes from several workers can't deadlock
+LOCK_RECOMMENDATIONS_QUERY = text("""
+    SELECT r.id, r.is_useful, r.recommendation_type, scope.store_id, scope.category_id
+    FROM recommendations r
+    LEFT JOIN LATERAL (
+        SELECT
+            CASE WHEN COUNT(DISTINCT i.store_id) = 1 THEN MIN(i.store_id) END AS store_id,
+            CASE WHEN COUNT(DISTINCT p.category_id) = 1 THEN MIN(p.category_id) END AS category_id
+        FROM recommendation_items ri
+            JOIN inventory_items i ON ri.inventory_item_id = i.id
+            JOIN products p ON i.product_id = p.id
+        WHERE ri.recommendation_id = r.id
+    ) scope ON TRUE
+    WHERE r.id = ANY(CAST(:ids AS INTEGER[]))
+    ORDER BY r.id
+    FOR UPDATE OF r
+""")
+
+INSERT_FEEDBACK_QUERY = text("""
+    INSERT INTO recommendation_feedback
+        (recommendation_id, is_useful, recommendation_type, store_id, category_id, received_at)
+    SELECT * FROM unnest(
+        CAST(:recommendation_ids AS INTEGER[]),
+        CAST(:is_useful AS BOOLEAN[]),
+        CAST(:recommendation_types AS TEXT[]),
+        CAST(:store_ids AS INTEGER[]),
+        CAST(:category_ids AS INTEGER[]),
+        CAST(:received_at AS TIMESTAMPTZ[])
+    )
+""")
+
+UPDATE_LATEST_QUERY = text("""
+    UPDATE recommendations r
+    SET is_useful = latest.is_useful
+    FROM unnest(CAST(:ids AS INTEGER[]), CAST(:is_useful AS BOOLEAN[])) AS latest(id, is_useful)
+    WHERE r.id = latest.id
+""")
+
+APPLY_STATS_QUERY = text("""
+    INSERT INTO recommendation_feedback_stats AS s (dimension, key, useful, not_useful)
+    SELECT * FROM unnest(
+        CAST(:dimensions AS TEXT[]),
+        CAST(:keys AS TEXT[]),
+        CAST(:useful AS INTEGER[]),
+        CAST(:not_useful AS INTEGER[])
+    )
+    ON CONFLICT (dimension, key) DO UPDATE
+    SET
+        useful = s.useful + EXCLUDED.useful,
+        not_useful = s.not_useful + EXCLUDED.not_useful,
+        updated_at = CURRENT_TIMESTAMP
+""")
+
+STATS_QUERY = text("""
+    SELECT s.dimension, s.key, s.useful, s.not_useful, COALESCE(st.name, c.name, s.key) AS name
+    FROM recommendation_feedback_stats s
+    LEFT JOIN stores st ON s.dimension = 'store' AND st.id::text = s.key
+    LEFT JOIN categories c ON s.dimension = 'category' AND c.id::text = s.key
+    ORDER BY s.dimension, s.key
+""")
+
+EXPORT_QUERY = text("""
+    SELECT
+        f.id, f.recommendation_id, f.is_useful, f.received_at,
+        f.recommendation_type, r.impact, r.title, r.created_at AS recommendation_created_at,
+        f.store_id, st.name AS store_name, f.category_id, c.name AS category_name
+    FROM recommendation_feedback f
+        JOIN recommendations r ON f.recommendation_id = r.id
+        LEFT JOIN stores st ON f.store_id = st.id
+        LEFT JOIN categories c ON f.category_id = c.id
+    WHERE f.id > :after_id
+    ORDER BY f.id
+""")
+
+class FeedbackBufferFull(Exception):
+    """More feedback is waiting to be written than FEEDBACK_MAX_PENDING"""
+
+def _scope_keys(recommendation) -> List[Tuple[str, str]]:
+    keys = [("all", ""), ("recommendation_type", recommendation.recommendation_type)]
+    if recommendation.store_id is not None:
+        keys.append(("store", str(recommendation.store_id)))
+    if recommendation.category_id is not None:
+        keys.append(("category", str(recommendation.category_id)))
+    return keys
+
+def _copy_outcome(source: asyncio.Future, target: asyncio.Future) -> None:
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+def _rate(key: str, name: str, useful: int, not_useful: int) -> FeedbackRate:
+    total = useful + not_useful
+    return FeedbackRate(
+        key=key,
+        name=name,
+        useful=useful,
+        not_useful=not_useful,
+        usefulness_rate=round(useful / total, 4) if total else None
+    )
+
+class FeedbackIngestor:
+    """
+    Buffers recommendation feedback and writes it with group commits
+
+    Callers wait for the commit that includes their events, so an
+    acknowledged click is durable, but all the clicks arriving within
+    FEEDBACK_FLUSH_INTERVAL_MS share one transaction: one append to the
+    feedback log, one update of the latest value per recommendation and
+    one upsert of the aggregated counts.
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: float = FEEDBACK_FLUSH_INTERVAL_MS,
+        max_batch: int = FEEDBACK_MAX_BATCH,
+        max_pending: int = FEEDBACK_MAX_PENDING
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._pending: List[PendingEvent] = []
+        self._batch_written: Optional[asyncio.Future] = None
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, events: List[Tuple[int, bool]]) -> Set[int]:
+        """Write the (recommendation id, is_useful) events; returns the ids that don't exist"""
+        received_at = datetime.now(timezone.utc)
+        batch = [(recommendation_id, is_useful, received_at) for recommendation_id, is_useful in events]
+        if self._task is None:
+            # Not running in the API (e.g. scripts): write right away
+            return await self._write(batch)
+
+        if len(self._pending) + len(batch) > self.max_pending:
+            raise FeedbackBufferFull()
+        if self._batch_written is None:
+            self._batch_written = asyncio.get_running_loop().create_future()
+        written = self._batch_written
+        self._pending.extend(batch)
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch:
+            self._batch_full.set()
+
+        # Shielded: a client going away must not cancel the shared commit
+        unknown = await asyncio.shield(written)
+        return {recommendation_id for recommendation_id, _ in events if recommendation_id in unknown}
+
+    async def _write(self, batch: List[PendingEvent]) -> Set[int]:
+        async with AsyncSessionLocal() as db:
+            ids = sorted({recommendation_id for recommendation_id, _, _ in batch})
+            recommendations = {
+                row.id: row for row in await db.execute(LOCK_RECOMMENDATIONS_QUERY, {"ids": ids})
+            }
+
+            log = defaultdict(list)
+            latest: Dict[int, bool] = {}
+            for recommendation_id, is_useful, received_at in batch:
+                recommendation = recommendations.get(recommendation_id)
+                if recommendation is None:
+                    continue
+                log["recommendation_ids"].append(recommendation_id)
+                log["is_useful"].append(is_useful)
+                log["recommendation_types"].append(recommendation.recommendation_type)
+                log["store_ids"].append(recommendation.store_id)
+                log["category_ids"].append(recommendation.category_id)
+                log["received_at"].append(received_at)
+                latest[recommendation_id] = is_useful
+
+            # Each recommendation counts once, with its latest feedback
+            deltas: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+            for recommendation_id, is_useful in latest.items():
+                recommendation = recommendations[recommendation_id]
+                if recommendation.is_useful == is_useful:
+                    continue
+                for key in _scope_keys(recommendation):
+                    if recommendation.is_useful is not None:
+                        deltas[key][0 if recommendation.is_useful else 1] -= 1
+                    deltas[key][0 if is_useful else 1] += 1
+
+            if latest:
+                await db.execute(INSERT_FEEDBACK_QUERY, dict(log))
+                await db.execute(UPDATE_LATEST_QUERY, {
+                    "ids": list(latest), "is_useful": list(latest.values())
+                })
+            if deltas:
+                # Sorted, so stats rows are locked in the same order by every flush
+                keys = sorted(deltas)
+                await db.execute(APPLY_STATS_QUERY, {
+                    "dimensions": [dimension for dimension, _ in keys],
+                    "keys": [key for _, key in keys],
+                    "useful": [deltas[key][0] for key in keys],
+                    "not_useful": [deltas[key][1] for key in keys],
+                })
+            await db.commit()
+
+        unknown = set(ids) - set(recommendations)
+        if unknown:
+            logger.warning(f"Dropped feedback for unknown recommendations: {sorted(unknown)[:20]}")
+        return unknown
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            await self._has_pending.wait()
+            if not self._stopping:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush()
+
+    async def _flush(self) -> None:
+        batch, written = self._pending, self._batch_written
+        self._pending, self._batch_written = [], None
+        self._has_pending.clear()
+        self._batch_full.clear()
+        if not batch:
+            return
+        try:
+            unknown = await self._write(batch)
+        except asyncio.CancelledError:
+            # Not written: put the batch back so the next flush (stop() ends
+            # with one) writes it, and answers these waiters along with it
+            self._pending[:0] = batch
+            if self._batch_written is None:
+                self._batch_written = written
+            else:
+                self._batch_written.add_done_callback(lambda done: _copy_outcome(done, written))
+            self._has_pending.set()
+            raise
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} feedback events: {e}")
+            written.set_exception(e)
+        else:
+            written.set_result(unknown)
+
+    async def get_stats(self, db: AsyncSession) -> FeedbackStats:
+        """Usefulness rates overall and per recommendation type, store and category"""
+        groups: Dict[str, List[FeedbackRate]] = defaultdict(list)
+        for row in await db.execute(STATS_QUERY):
+            groups[row.dimension].append(_rate(row.key, row.name, row.useful, row.not_useful))
+        overall = groups["all"][0] if groups["all"] else _rate("", "", 0, 0)
+        return FeedbackStats(
+            overall=overall,
+            by_recommendation_type=groups["recommendation_type"],
+            by_store=groups["store"],
+            by_category=groups["category"]
+        )
+
+    async def export_ndjson(self, db: AsyncSession, after_id: int = 0) -> AsyncIterator[bytes]:
+        """Feedback events after `after_id` with their recommendation, one JSON object per line"""
+        rows = await db.stream(EXPORT_QUERY.execution_options(yield_per=EXPORT_BATCH_SIZE), {"after_id": after_id})
+        async for row in rows:
+            yield dumps_json(dict(row._mapping)) + b"\n"
+
+    def start(self) -> None:
+        """Start the flusher on the running loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="feedback-flusher")
+
+    async def stop(self) -> None:
+        """Let the write in progress finish, write what is still buffered, then stop flushing"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._has_pending.set()
+        self._batch_full.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._stopping = False
+        await self._flush()
+
+feedback_ingestor = FeedbackIngestor()
@@ -0,0 +1,145 @@
+from typing import Optional, Tuple
+from collections import OrderedDict
+import os
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, tuple_, Select
+from .db_models import (
+    Product as DBProduct,
+    Category as DBCategory,
+    Store as DBStore,
+    InventoryItem as DBInventoryItem
+)
+from .schemas import FacetCounts, InventoryFacet, InventoryFacets
+from ..data_versions import DataVersion
+
+logger = logging.getLogger(__name__)
+
+# Filter combinations whose facets are kept in memory
+INVENTORY_FACETS_CACHE_SIZE = int(os.getenv("INVENTORY_FACETS_CACHE_SIZE", "256"))
+
+# Alert levels whose stock counts towards at_risk_value
+AT_RISK_LEVELS = ("high", "medium")
+
+def apply_inventory_filters(
+    query: Select,
+    category: Optional[str] = None,
+    store: Optional[str] = None,
+    days_until_expiry: Optional[int] = None
+) -> Select:
+    """The /products filters, for queries joining inventory, category and store"""
+    if category:
+        query = query.where(DBCategory.name == category)
+
+    if store:
+        query = query.where(DBStore.name == store)
+
+    if days_until_expiry is not None:
+        # Filter items that will expire within the specified number of days
+        query = query.where(DBInventoryItem.expiration_date <= func.current_date() + days_until_expiry)
+
+    return query
+
+def _build_facets_query(category: Optional[str], store: Optional[str], days_until_expiry: Optional[int]) -> Select:
+    """One pass over the filtered inventory, aggregated per cell, per dimension and in total"""
+    store_name = DBStore.name
+    category_name = DBCategory.name
+    # Same levels as the alert endpoints (expiry_alert_level() in db/init.sql)
+    alert_level = func.expiry_alert_level(DBInventoryItem.expiration_date - func.current_date())
+    value = DBInventoryItem.quantity * func.coalesce(DBInventoryItem.unit_price, 0)
+
+    query = (
+        select(
+            func.grouping(store_name, category_name, alert_level).label("grouping"),
+            store_name.label("store"),
+            category_name.label("category"),
+            alert_level.label("alert_level"),
+            func.count().label("items"),
+            func.coalesce(func.sum(DBInventoryItem.quantity), 0).label("quantity"),
+            func.coalesce(func.sum(value), 0).label("inventory_value"),
+            func.coalesce(
+                func.sum(value).filter(alert_level.in_(AT_RISK_LEVELS)), 0
+            ).label("at_risk_value"),
+        )
+        .select_from(DBInventoryItem)
+        .join(DBProduct, DBInventoryItem.product_id == DBProduct.id)
+        .join(DBCategory, DBProduct.category_id == DBCategory.id)
+        .join(DBStore, DBInventoryItem.store_id == DBStore.id)
+    )
+    query = apply_inventory_filters(query, category, store, days_until_expiry)
+
+    return query.group_by(func.grouping_sets(
+        tuple_(store_name, category_name, alert_level),
+        tuple_(store_name),
+        tuple_(category_name),
+        tuple_(alert_level),
+        tuple_(),
+    )).order_by(store_name, category_name, alert_level)
+
+# GROUPING() bits, most significant first: store, category, alert level
+_CELL, _BY_STORE, _BY_CATEGORY, _BY_ALERT_LEVEL, _TOTAL = 0b000, 0b011, 0b101, 0b110, 0b111
+
+def _facets_from_rows(rows) -> InventoryFacets:
+    facets = InventoryFacets(
+        total=FacetCounts(items=0, quantity=0, inventory_value=0.0, at_risk_value=0.0),
+        by_store=[], by_category=[], by_alert_level=[], cells=[]
+    )
+    groups = {
+        _CELL: facets.cells,
+        _BY_STORE: facets.by_store,
+        _BY_CATEGORY: facets.by_category,
+        _BY_ALERT_LEVEL: facets.by_alert_level,
+    }
+    for row in rows:
+        counts = {
+            "items": row.items,
+            "quantity": row.quantity,
+            "inventory_value": round(float(row.inventory_value), 2),
+            "at_risk_value": round(float(row.at_risk_value), 2),
+        }
+        if row.grouping == _TOTAL:
+            facets.total = FacetCounts(**counts)
+        else:
+            groups[row.grouping].append(InventoryFacet(
+                store=row.store, category=row.category, alert_level=row.alert_level, **counts
+            ))
+    return facets
+
+class InventoryFacetService:
+    """
+    Counts, quantities and value per store, category and alert level
+
+    Results are cached per filter combination together with the data version
+    they were computed at, so a cached entry is reused until inventory,
+    products, categories or stores change (or the date does).
+    """
+
+    def __init__(self, cache_size: int = INVENTORY_FACETS_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, Tuple[str, InventoryFacets]]" = OrderedDict()
+
+    async def get_facets(
+        self,
+        db: AsyncSession,
+        version: DataVersion,
+        category: Optional[str] = None,
+        store: Optional[str] = None,
+        days_until_expiry: Optional[int] = None
+    ) -> InventoryFacets:
+        """Get the facets for the filters at `version` (from INVENTORY_TABLES)"""
+        key = (category, store, days_until_expiry)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == version.etag:
+            self._cache.move_to_end(key)
+            return cached[1]
+
+        rows = (await db.execute(_build_facets_query(category, store, days_until_expiry))).all()
+        facets = _facets_from_rows(rows)
+
+        self._cache[key] = (version.etag, facets)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return facets
+
+inventory_facets = InventoryFacetService()
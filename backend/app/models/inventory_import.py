@@ -0,0 +1,300 @@
+from typing import Dict, List, Any, Optional, Iterator, AsyncIterator, Tuple, BinaryIO
+from datetime import date
+from decimal import Decimal, InvalidOperation
+import asyncio
+import csv
+import io
+import os
+import time
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Parquet support is optional (pip install pyarrow)
+try:
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Rows parsed per hop to the worker thread and per Parquet record batch
+INVENTORY_IMPORT_BATCH_SIZE = int(os.getenv("INVENTORY_IMPORT_BATCH_SIZE", "10000"))
+
+# Rejected rows listed in the import result; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+# unit_price is DECIMAL(10, 2)
+MAX_UNIT_PRICE = Decimal("1e8")
+
+REQUIRED_COLUMNS = ["product_name", "store_name", "quantity", "expiration_date"]
+OPTIONAL_COLUMNS = ["manufacturing_date", "purchase_date", "batch_number", "unit_price"]
+
+STAGING_COLUMNS = [
+    "line_no", "product_id", "store_id", "quantity", "manufacturing_date",
+    "expiration_date", "purchase_date", "batch_number", "unit_price"
+]
+
+# Serializes imports so concurrent uploads can't both insert the same batch
+IMPORT_LOCK_QUERY = text("SELECT pg_advisory_xact_lock(hashtext('inventory_import'))")
+
+CREATE_STAGING_QUERY = text("""
+    CREATE TEMP TABLE inventory_import_staging (
+        line_no BIGINT NOT NULL,
+        product_id INTEGER NOT NULL,
+        store_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        manufacturing_date DATE,
+        expiration_date DATE NOT NULL,
+        purchase_date DATE,
+        batch_number VARCHAR(100),
+        unit_price DECIMAL(10, 2)
+    ) ON COMMIT DROP
+""")
+
+# A staged row updates the inventory items with the same product, store,
+# expiration date and batch number, and is inserted when there are none.
+# When the file repeats a batch, its last occurrence wins.
+MERGE_STAGING_QUERY = text("""
+    WITH latest AS (
+        SELECT DISTINCT ON (product_id, store_id, expiration_date, batch_number) *
+        FROM inventory_import_staging
+        ORDER BY product_id, store_id, expiration_date, batch_number, line_no DESC
+    ),
+    updated AS (
+        UPDATE inventory_items i
+        SET
+            quantity = l.quantity,
+            manufacturing_date = COALESCE(l.manufacturing_date, i.manufacturing_date),
+            purchase_date = COALESCE(l.purchase_date, i.purchase_date),
+            unit_price = COALESCE(l.unit_price, i.unit_price),
+            updated_at = CURRENT_TIMESTAMP
+        FROM latest l
+        WHERE i.product_id = l.product_id
+          AND i.store_id = l.store_id
+          AND i.expiration_date = l.expiration_date
+          AND i.batch_number IS NOT DISTINCT FROM l.batch_number
+        RETURNING l.product_id, l.store_id, l.expiration_date, l.batch_number
+    ),
+    inserted AS (
+        INSERT INTO inventory_items (
+            product_id, store_id, quantity, manufacturing_date,
+            expiration_date, purchase_date, batch_number, unit_price
+        )
+        SELECT
+            l.product_id, l.store_id, l.quantity, l.manufacturing_date,
+            l.expiration_date, l.purchase_date, l.batch_number, l.unit_price
+        FROM latest l
+        WHERE NOT EXISTS (
+            SELECT 1 FROM updated u
+            WHERE u.product_id = l.product_id
+              AND u.store_id = l.store_id
+              AND u.expiration_date = l.expiration_date
+              AND u.batch_number IS NOT DISTINCT FROM l.batch_number
+        )
+        RETURNING 1
+    )
+    SELECT
+        (SELECT COUNT(*) FROM updated) AS updated,
+        (SELECT COUNT(*) FROM inserted) AS inserted
+""")
+
+class InventoryImportError(ValueError):
+    """The uploaded file can't be imported at all (as opposed to bad rows)"""
+
+def _normalize_name(name: Any) -> str:
+    return str(name).strip().casefold()
+
+def _optional(value: Any) -> Any:
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    return value
+
+def _parse_date(value: Any) -> Optional[date]:
+    value = _optional(value)
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+def _parse_decimal(value: Any) -> Optional[Decimal]:
+    value = _optional(value)
+    if value is None:
+        return None
+    return Decimal(str(value).strip())
+
+class InventoryImporter:
+    """
+    Bulk-loads inventory batches from CSV or Parquet
+
+    Rows are parsed in a worker thread a batch at a time, product and store
+    names are resolved through in-memory lookups, and the resolved rows are
+    streamed with COPY into a temporary staging table that is then merged into
+    inventory_items with a single statement, all in one transaction.
+    """
+
+    async def _load_lookup(self, db: AsyncSession, table: str) -> Dict[str, int]:
+        # Lowest id wins when names repeat
+        result = await db.execute(text(f"SELECT id, name FROM {table} ORDER BY id DESC"))
+        return {_normalize_name(name): id for id, name in result}
+
+    def _csv_rows(self, source: BinaryIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        reader = csv.DictReader(io.TextIOWrapper(source, encoding="utf-8-sig", newline=""))
+        self._check_columns(reader.fieldnames or [])
+        for row in reader:
+            # Header is line 1; multi-line quoted fields make this approximate
+            yield reader.line_num, row
+
+    def _parquet_rows(self, source: BinaryIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        if not PARQUET_AVAILABLE:
+            raise InventoryImportError("Parquet import requires pyarrow to be installed")
+        parquet_file = pq.ParquetFile(source)
+        present = [
+            column for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+            if column in parquet_file.schema_arrow.names
+        ]
+        self._check_columns(present)
+        line_no = 0
+        for batch in parquet_file.iter_batches(batch_size=INVENTORY_IMPORT_BATCH_SIZE, columns=present):
+            for row in batch.to_pylist():
+                line_no += 1
+                yield line_no, row
+
+    def _check_columns(self, columns: List[str]) -> None:
+        missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise InventoryImportError(f"Missing required columns: {', '.join(missing)}")
+
+    def _resolve_row(
+        self,
+        line_no: int,
+        row: Dict[str, Any],
+        products: Dict[str, int],
+        stores: Dict[str, int]
+    ) -> tuple:
+        """Turn a file row into a staging record; raises ValueError for bad rows"""
+        product_id = products.get(_normalize_name(row.get("product_name") or ""))
+        if product_id is None:
+            raise ValueError(f"unknown product {row.get('product_name')!r}")
+        store_id = stores.get(_normalize_name(row.get("store_name") or ""))
+        if store_id is None:
+            raise ValueError(f"unknown store {row.get('store_name')!r}")
+
+        quantity = _optional(row.get("quantity"))
+        if quantity is None:
+            raise ValueError("quantity is required")
+        quantity = int(quantity)
+        if not -2**31 <= quantity < 2**31:
+            raise ValueError("quantity is out of range")
+        expiration_date = _parse_date(row.get("expiration_date"))
+        if expiration_date is None:
+            raise ValueError("expiration_date is required")
+
+        batch_number = _optional(row.get("batch_number"))
+        if batch_number is not None:
+            batch_number = str(batch_number).strip()
+            if len(batch_number) > 100:
+                raise ValueError("batch_number is longer than 100 characters")
+
+        unit_price = _parse_decimal(row.get("unit_price"))
+        if unit_price is not None and not abs(unit_price) < MAX_UNIT_PRICE:
+            raise ValueError("unit_price is out of range")
+
+        return (
+            line_no,
+            product_id,
+            store_id,
+            quantity,
+            _parse_date(row.get("manufacturing_date")),
+            expiration_date,
+            _parse_date(row.get("purchase_date")),
+            batch_number,
+            unit_price
+        )
+
+    def _record_batches(
+        self,
+        rows: Iterator[Tuple[int, Dict[str, Any]]],
+        products: Dict[str, int],
+        stores: Dict[str, int],
+        result: Dict[str, Any]
+    ) -> Iterator[List[tuple]]:
+        batch = []
+        for line_no, row in rows:
+            result["rows_received"] += 1
+            try:
+                batch.append(self._resolve_row(line_no, row, products, stores))
+            except (ValueError, InvalidOperation) as e:
+                result["rows_rejected"] += 1
+                if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                    result["errors"].append(f"line {line_no}: {e}")
+                continue
+            if len(batch) >= INVENTORY_IMPORT_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def _records(self, batches: Iterator[List[tuple]]) -> AsyncIterator[tuple]:
+        # Parsing happens off the event loop, one batch at a time
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                return
+            for record in batch:
+                yield record
+
+    async def import_file(self, db: AsyncSession, source: BinaryIO, file_format: str) -> Dict[str, Any]:
+        """Stage and merge an inventory file; returns row counts and throughput"""
+        start = time.perf_counter()
+        result = {
+            "rows_received": 0,
+            "rows_staged": 0,
+            "rows_rejected": 0,
+            "inserted": 0,
+            "updated": 0,
+            "errors": []
+        }
+
+        if file_format == "parquet":
+            rows = self._parquet_rows(source)
+        else:
+            rows = self._csv_rows(source)
+
+        try:
+            await db.execute(IMPORT_LOCK_QUERY)
+            products = await self._load_lookup(db, "products")
+            stores = await self._load_lookup(db, "stores")
+            await db.execute(CREATE_STAGING_QUERY)
+
+            connection = await db.connection()
+            raw_connection = await connection.get_raw_connection()
+            batches = self._record_batches(rows, products, stores, result)
+            status = await raw_connection.driver_connection.copy_records_to_table(
+                "inventory_import_staging",
+                records=self._records(batches),
+                columns=STAGING_COLUMNS
+            )
+            result["rows_staged"] = int(status.split()[-1])
+
+            await db.execute(text("ANALYZE inventory_import_staging"))
+            merged = (await db.execute(MERGE_STAGING_QUERY)).one()
+            result["updated"] = merged.updated
+            result["inserted"] = merged.inserted
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        seconds = time.perf_counter() - start
+        result["seconds"] = round(seconds, 3)
+        result["rows_per_second"] = round(result["rows_received"] / seconds, 1) if seconds > 0 else 0.0
+        logger.info(
+            f"Imported {result['rows_staged']} inventory rows "
+            f"({result['inserted']} inserted, {result['updated']} updated, "
+            f"{result['rows_rejected']} rejected) in {seconds:.2f}s "
+            f"({result['rows_per_second']:.0f} rows/s)"
+        )
+        return result
+
+inventory_importer = InventoryImporter()
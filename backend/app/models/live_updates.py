@@ -0,0 +1,222 @@
+from typing import Any, Dict, List, Optional, Set
+from datetime import date, datetime, timezone
+import asyncio
+import os
+import logging
+import asyncpg
+from sqlalchemy.engine import make_url
+from ..database import ASYNC_DATABASE_URL, AsyncSessionLocal
+from ..serialization import dumps_json
+from .alert_engine import alert_engine
+from .dashboard import dashboard_service
+
+logger = logging.getLogger(__name__)
+
+# Channel the notify_inventory_change() triggers in db/init.sql publish on
+NOTIFY_CHANNEL = "inventory_changes"
+
+# Notifications arriving within this window are handled as one change
+LIVE_UPDATES_DEBOUNCE_SECONDS = float(os.getenv("LIVE_UPDATES_DEBOUNCE_SECONDS", "1"))
+# Alert threshold of the pushed alert list (same default as /product-alerts)
+LIVE_UPDATES_ALERT_THRESHOLD = int(os.getenv("LIVE_UPDATES_ALERT_THRESHOLD", "15"))
+# Events buffered per client; a client that falls further behind is dropped
+# and resynchronizes when its EventSource reconnects
+LIVE_UPDATES_QUEUE_SIZE = int(os.getenv("LIVE_UPDATES_QUEUE_SIZE", "100"))
+
+# How often idle state is rechecked (dashboard snapshot swaps, day rollover)
+TICK_SECONDS = 5.0
+MAX_RECONNECT_SECONDS = 30.0
+
+# asyncpg wants a plain libpq-style URL
+LISTEN_DSN = make_url(ASYNC_DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+
+def format_event(event: str, data: Any) -> bytes:
+    """Encode one server-sent event"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps_json(data) + b"\n\n"
+
+def _alerts_by_id(alerts: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    return {alert["product"]["id"]: alert for alert in alerts}
+
+class LiveUpdateBroadcaster:
+    """
+    Pushes alert and dashboard changes to server-sent event clients
+
+    Each worker holds one LISTEN connection. A notification (debounced) makes
+    the worker refresh the dashboard snapshot and re-read the alert list once,
+    diff both against what it last pushed and hand the same encoded events to
+    every connected client, so database work doesn't grow with the number of
+    viewers. With no clients connected, changes only mark the state stale.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._alerts: Dict[int, Dict[str, Any]] = {}
+        self._dashboard: Optional[Dict[str, Any]] = None
+        self._alerts_day: Optional[date] = None
+        self._snapshot_event: Optional[bytes] = None
+        self._state_valid = False
+        self._state_lock = asyncio.Lock()
+        self._changed = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        self._changed.set()
+
+    async def _listen(self) -> None:
+        delay = 1.0
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(LISTEN_DSN)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                logger.info(f"Listening for {NOTIFY_CHANNEL} notifications")
+                delay = 1.0
+                # Changes may have been missed while disconnected
+                self._changed.set()
+                await lost.wait()
+                logger.warning("Lost the LISTEN connection, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error listening for {NOTIFY_CHANNEL}: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_SECONDS)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+
+    async def _load_alerts(self) -> Dict[int, Dict[str, Any]]:
+        async with AsyncSessionLocal() as db:
+            alerts = await alert_engine.get_alerts(db, LIVE_UPDATES_ALERT_THRESHOLD)
+        self._alerts_day = datetime.now(timezone.utc).date()
+        return _alerts_by_id(alerts)
+
+    async def _rebuild_state(self) -> None:
+        summary = dashboard_service.snapshot or await asyncio.to_thread(dashboard_service.refresh)
+        self._dashboard = summary.model_dump()
+        self._alerts = await self._load_alerts()
+        self._snapshot_event = None
+        self._state_valid = True
+
+    def _publish(self, events: List[bytes]) -> None:
+        for queue in list(self._subscribers):
+            for event in events:
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # Make room for the end-of-stream marker and drop the client
+                    self._subscribers.discard(queue)
+                    queue.get_nowait()
+                    queue.put_nowait(None)
+                    break
+
+    def _dashboard_event(self, dashboard: Dict[str, Any]) -> Optional[bytes]:
+        previous = self._dashboard or {}
+        changed = {key: value for key, value in dashboard.items() if previous.get(key) != value}
+        self._dashboard = dashboard
+        return format_event("dashboard", changed) if changed else None
+
+    def _alerts_event(self, alerts: Dict[int, Dict[str, Any]]) -> Optional[bytes]:
+        upserted = [alert for id, alert in alerts.items() if self._alerts.get(id) != alert]
+        removed = [id for id in self._alerts if id not in alerts]
+        self._alerts = alerts
+        if not upserted and not removed:
+            return None
+        return format_event("alerts", {"upserted": upserted, "removed": removed})
+
+    async def _push_changes(self, reload_dashboard: bool, reload_alerts: bool) -> None:
+        async with self._state_lock:
+            if not self._subscribers:
+                self._state_valid = False
+                return
+            if not self._state_valid:
+                # Nobody was connected; the next subscriber rebuilds from scratch
+                return
+
+            events = []
+            if reload_dashboard:
+                summary = await asyncio.to_thread(dashboard_service.refresh)
+            else:
+                summary = dashboard_service.snapshot
+            if summary is not None:
+                event = self._dashboard_event(summary.model_dump())
+                if event:
+                    events.append(event)
+            if reload_alerts:
+                event = self._alerts_event(await self._load_alerts())
+                if event:
+                    events.append(event)
+
+            if events:
+                self._snapshot_event = None
+                self._publish(events)
+
+    async def _process(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=TICK_SECONDS)
+            except asyncio.TimeoutError:
+                # Pick up snapshots taken by the dashboard refresher, and the
+                # alert levels moving on when the day changes
+                new_day = self._alerts_day != datetime.now(timezone.utc).date()
+                await self._run_safely(reload_dashboard=False, reload_alerts=new_day)
+                continue
+
+            await asyncio.sleep(LIVE_UPDATES_DEBOUNCE_SECONDS)
+            self._changed.clear()
+            await self._run_safely(reload_dashboard=True, reload_alerts=True)
+
+    async def _run_safely(self, reload_dashboard: bool, reload_alerts: bool) -> None:
+        try:
+            await self._push_changes(reload_dashboard, reload_alerts)
+        except Exception as e:
+            logger.error(f"Error pushing live updates: {e}")
+
+    async def subscribe(self) -> asyncio.Queue:
+        """Register a client; its queue starts with a full snapshot event"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_UPDATES_QUEUE_SIZE)
+        async with self._state_lock:
+            if not self._state_valid:
+                await self._rebuild_state()
+            if self._snapshot_event is None:
+                # Encoded once and shared by every client that connects until the next change
+                self._snapshot_event = format_event("snapshot", {
+                    "dashboard": self._dashboard,
+                    "alerts": list(self._alerts.values())
+                })
+            queue.put_nowait(self._snapshot_event)
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def start(self) -> None:
+        """Start the LISTEN connection and the change processor on the running loop"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._listen(), name="live-updates-listen"),
+            asyncio.create_task(self._process(), name="live-updates-process"),
+        ]
+
+    async def stop(self) -> None:
+        """Stop listening and end all client streams"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in list(self._subscribers):
+            self._subscribers.discard(queue)
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        self._state_valid = False
+
+live_updates = LiveUpdateBroadcaster()
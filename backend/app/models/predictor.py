@@ -4,6 +4,7 @@ import joblib
 import os
 from pathlib import Path
 import logging
+from ..metrics import predictor_inference_duration_seconds
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -105,6 +106,10 @@ class PredictorService:
         Process a chat query and return relevant prediction data
         This method will be used by the chat API to provide AI-powered responses
         """
+        with predictor_inference_duration_seconds.time("chat_query"):
+            return self._query_models(message)
+    
+    def _query_models(self, message: str) -> Dict[str, Any]:
         lower_message = message.lower()
         response_data = {"prediction_available": self.is_loaded}
         
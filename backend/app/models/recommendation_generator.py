@@ -0,0 +1,232 @@
+from typing import Any, Dict, List
+from itertools import groupby
+import time
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from .schemas import BulkRecommendationResult
+
+logger = logging.getLogger(__name__)
+
+# Same window and sizes as POST /recommendations/generate
+EXPIRY_HORIZON_DAYS = 15
+EXPIRING_ITEMS_PER_PAIR = 5
+LINKED_ITEMS_PER_PAIR = 3
+
+RECOMMENDATION_TEMPLATES = [
+    "Aplicar desconto de {discount}% em produtos de {category} na loja {store}",
+    "Transferir produtos de {category} da loja {store} para outras unidades com maior demanda",
+    "Realizar campanha específica para {category} na loja {store}",
+    "Treinar equipe da loja {store} para sugerir ativamente produtos de {category}",
+    "Reposicionar produtos de {category} em áreas de maior visibilidade na loja {store}"
+]
+
+MODEL_BASED_TEMPLATE = (
+    "Com base em análise preditiva, recomendamos {action} para produtos de {category} "
+    "na loja {store} para reduzir o risco de perdas em {risk_reduction}%"
+)
+
+ACTIONS = ["redução de preço", "transferência", "campanha específica"]
+RECOMMENDATION_TYPES = ["promotion", "transfer", "display", "training"]
+
+# Serializes bulk runs so two of them can't interleave their inserts
+BULK_GENERATE_LOCK_QUERY = text("SELECT pg_advisory_xact_lock(hashtext('recommendations_bulk_generate'))")
+
+# The EXPIRING_ITEMS_PER_PAIR soonest-expiring items of every store and
+# category with stock expiring within the horizon, in a single pass
+RANKED_EXPIRING_QUERY = text("""
+    SELECT store_id, store_name, category_id, category_name, inventory_item_id, days_until_expiry
+    FROM (
+        SELECT
+            i.store_id,
+            s.name AS store_name,
+            p.category_id,
+            c.name AS category_name,
+            i.id AS inventory_item_id,
+            (i.expiration_date - CURRENT_DATE) AS days_until_expiry,
+            row_number() OVER (
+                PARTITION BY i.store_id, p.category_id
+                ORDER BY i.expiration_date, i.id
+            ) AS rank
+        FROM
+            inventory_items i
+            JOIN products p ON i.product_id = p.id
+            JOIN categories c ON p.category_id = c.id
+            JOIN stores s ON i.store_id = s.id
+        WHERE
+            i.expiration_date <= CURRENT_DATE + CAST(:horizon_days AS INTEGER)
+    ) ranked
+    WHERE rank <= :items_per_pair
+    ORDER BY store_id, category_id, rank
+""")
+
+ALLOCATE_IDS_QUERY = text("""
+    SELECT nextval(pg_get_serial_sequence('recommendations', 'id')) AS id
+    FROM generate_series(1, :count)
+""")
+
+INSERT_RECOMMENDATIONS_QUERY = text("""
+    INSERT INTO recommendations (id, title, description, recommendation_type, impact, is_useful, acted_upon)
+    SELECT id, title, description, recommendation_type, impact, NULL, FALSE
+    FROM unnest(
+        CAST(:ids AS INTEGER[]),
+        CAST(:titles AS TEXT[]),
+        CAST(:descriptions AS TEXT[]),
+        CAST(:recommendation_types AS TEXT[]),
+        CAST(:impacts AS TEXT[])
+    ) AS r(id, title, description, recommendation_type, impact)
+""")
+
+INSERT_ITEMS_QUERY = text("""
+    INSERT INTO recommendation_items (recommendation_id, inventory_item_id)
+    SELECT * FROM unnest(CAST(:recommendation_ids AS INTEGER[]), CAST(:inventory_item_ids AS INTEGER[]))
+""")
+
+def compose_recommendation(
+    days_until_expiry: List[int],
+    category: str,
+    store: str,
+    model_based: bool
+) -> Dict[str, Any]:
+    """
+    Title, description, type and impact of a recommendation
+
+    `days_until_expiry` lists the soonest-expiring items it is about, soonest
+    first; an empty list gives the generic campaign recommendation.
+    """
+    templates = RECOMMENDATION_TEMPLATES + ([MODEL_BASED_TEMPLATE] if model_based else [])
+
+    template = templates[0]
+    discount = 15
+    if days_until_expiry:
+        days_left = days_until_expiry[0]
+        if days_left <= 7:
+            discount = 30
+            template = templates[0]
+        elif days_left <= 10:
+            discount = 20
+            template = templates[0]
+        elif days_left <= 15:
+            discount = 15
+            template = templates[3]
+
+        if len(days_until_expiry) > 2:
+            template = templates[1]
+    else:
+        template = templates[min(len(templates) - 1, 2)]
+
+    if days_until_expiry:
+        avg_days = sum(days_until_expiry) / len(days_until_expiry)
+        risk_reduction = min(round(100 - (avg_days * 5)), 45)
+    else:
+        risk_reduction = 20
+
+    action_index = 0
+    if days_until_expiry:
+        if any(days <= 7 for days in days_until_expiry):
+            action_index = 0
+        elif len(days_until_expiry) > 2 and all(days > 10 for days in days_until_expiry):
+            action_index = 1
+        else:
+            action_index = 2
+
+    description = template.format(
+        category=category,
+        store=store,
+        discount=discount,
+        action=ACTIONS[action_index],
+        risk_reduction=risk_reduction
+    )
+
+    if risk_reduction > 30:
+        impact = "high"
+    elif risk_reduction > 15:
+        impact = "medium"
+    else:
+        impact = "low"
+
+    return {
+        "title": f"{'[ML] ' if model_based else ''}Nova Recomendação para {category}",
+        "description": description,
+        "recommendation_type": RECOMMENDATION_TYPES[min(action_index, 3)],
+        "impact": impact,
+    }
+
+async def insert_recommendations(
+    db: AsyncSession,
+    recommendations: List[Dict[str, Any]],
+    linked_items: List[List[int]]
+) -> int:
+    """
+    Insert recommendations (as built by compose_recommendation) and link each
+    one to its inventory items with one multi-row insert per table, in the
+    caller's transaction; returns the number of items linked
+    """
+    if not recommendations:
+        return 0
+
+    ids = (await db.execute(ALLOCATE_IDS_QUERY, {"count": len(recommendations)})).scalars().all()
+    await db.execute(INSERT_RECOMMENDATIONS_QUERY, {
+        "ids": ids,
+        "titles": [r["title"] for r in recommendations],
+        "descriptions": [r["description"] for r in recommendations],
+        "recommendation_types": [r["recommendation_type"] for r in recommendations],
+        "impacts": [r["impact"] for r in recommendations],
+    })
+
+    recommendation_ids = []
+    inventory_item_ids = []
+    for recommendation_id, item_ids in zip(ids, linked_items):
+        recommendation_ids.extend([recommendation_id] * len(item_ids))
+        inventory_item_ids.extend(item_ids)
+    await db.execute(INSERT_ITEMS_QUERY, {
+        "recommendation_ids": recommendation_ids,
+        "inventory_item_ids": inventory_item_ids
+    })
+    return len(inventory_item_ids)
+
+class RecommendationGenerator:
+    """
+    Generates recommendations for every store and category at once
+
+    The candidates of all pairs come from one window-function query, and the
+    recommendations and their items are written with one multi-row insert
+    each, in the caller's transaction.
+    """
+
+    async def generate_all(self, db: AsyncSession, model_based: bool) -> BulkRecommendationResult:
+        """Create one recommendation per store and category with stock expiring soon"""
+        start_time = time.perf_counter()
+        await db.execute(BULK_GENERATE_LOCK_QUERY)
+
+        rows = (await db.execute(RANKED_EXPIRING_QUERY, {
+            "horizon_days": EXPIRY_HORIZON_DAYS,
+            "items_per_pair": EXPIRING_ITEMS_PER_PAIR
+        })).all()
+
+        recommendations = []
+        linked_items = []
+        for _, pair_rows in groupby(rows, key=lambda row: (row.store_id, row.category_id)):
+            pair_rows = list(pair_rows)
+            recommendations.append(compose_recommendation(
+                [row.days_until_expiry for row in pair_rows],
+                pair_rows[0].category_name,
+                pair_rows[0].store_name,
+                model_based
+            ))
+            linked_items.append([row.inventory_item_id for row in pair_rows[:LINKED_ITEMS_PER_PAIR]])
+
+        item_count = await insert_recommendations(db, recommendations, linked_items)
+        await db.commit()
+
+        seconds = time.perf_counter() - start_time
+        logger.info(
+            f"Generated {len(recommendations)} recommendations with {item_count} items in {seconds:.2f}s"
+        )
+        return BulkRecommendationResult(
+            recommendations_created=len(recommendations),
+            items_linked=item_count,
+            seconds=round(seconds, 3)
+        )
+
+recommendation_generator = RecommendationGenerator()
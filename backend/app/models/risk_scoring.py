@@ -0,0 +1,280 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import io
+import os
+import time
+import logging
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from ..metrics import predictor_inference_duration_seconds
+from .predictor import predictor_service
+from .recommendation_generator import BULK_GENERATE_LOCK_QUERY, LINKED_ITEMS_PER_PAIR, insert_recommendations
+from .schemas import RiskScoringResult
+
+logger = logging.getLogger(__name__)
+
+# Inventory rows parsed and scored per predict_proba call
+SCORING_BATCH_SIZE = int(os.getenv("SCORING_BATCH_SIZE", "50000"))
+
+# Columns of FEATURES_QUERY, in order
+ITEM_ID, STORE_ID, CATEGORY_ID, QUANTITY, UNIT_PRICE, DAYS_UNTIL_EXPIRY, SHELF_LIFE_DAYS, DAYS_IN_STOCK, UNITS_MOVED_90D = range(9)
+
+# Every in-stock item with the risk model's inputs. There is no sales table:
+# units transferred out of the batch in the last 90 days stand in for sales
+FEATURES_QUERY = text("""
+    SELECT
+        i.id,
+        i.store_id,
+        p.category_id,
+        i.quantity,
+        COALESCE(CAST(i.unit_price AS DOUBLE PRECISION), 0),
+        i.expiration_date - CURRENT_DATE,
+        i.expiration_date - COALESCE(i.manufacturing_date, i.purchase_date, CAST(i.created_at AS DATE), CURRENT_DATE),
+        CURRENT_DATE - COALESCE(i.purchase_date, CAST(i.created_at AS DATE), CURRENT_DATE),
+        COALESCE(moved.units, 0)
+    FROM
+        inventory_items i
+        JOIN products p ON i.product_id = p.id
+        JOIN categories c ON p.category_id = c.id
+        LEFT JOIN (
+            SELECT inventory_item_id, SUM(quantity) AS units
+            FROM transfers
+            WHERE status = 'completed' AND transfer_date >= CURRENT_DATE - 90
+            GROUP BY inventory_item_id
+        ) moved ON moved.inventory_item_id = i.id
+    WHERE i.quantity > 0
+""")
+
+NAMES_QUERY = text("""
+    SELECT 'store' AS kind, id, name FROM stores
+    UNION ALL
+    SELECT 'category', id, name FROM categories
+""")
+
+# Model input name -> FEATURES_QUERY column (None: not tracked, always 0).
+# Covers the features of predictor/scripts/train_models.py and of the
+# predictor package's risk classifier; encoded stores and sections use the ids.
+FEATURE_SOURCES = {
+    "vida_util_subsecao": SHELF_LIFE_DAYS,
+    "vida_util_estimada": SHELF_LIFE_DAYS,
+    "dias_em_estoque": DAYS_IN_STOCK,
+    "unidades_vendidas_90dias": UNITS_MOVED_90D,
+    "estoque_atual": QUANTITY,
+    "preco": UNIT_PRICE,
+    "eh_sazonal": None,
+    "cd_subsecao": CATEGORY_ID,
+    "secao_encoded": CATEGORY_ID,
+    "cd_loja": STORE_ID,
+    "loja_encoded": STORE_ID,
+}
+
+# Input order of models trained by predictor/scripts/train_models.py, for
+# models fitted without feature names
+DEFAULT_RISK_FEATURES = [
+    "vida_util_subsecao", "unidades_vendidas_90dias", "estoque_atual",
+    "secao_encoded", "cd_subsecao", "loja_encoded", "eh_sazonal", "preco"
+]
+
+# Class of train_models.py's three-class model ("alto", "baixo", "medio" as
+# category codes) meaning low risk; binary models predict "vai_vencer" directly
+LOW_RISK_CLASS = 1
+
+# Actions of determinar_acao (predictor/src/models/recommender.py), most
+# urgent first: (description, recommendation_type, impact)
+ACTION_EXPIRED, ACTION_MARKDOWN, ACTION_PLAN_PROMOTION, ACTION_WEEKLY_PROMOTION, ACTION_MONITOR = range(5)
+ACTIONS = [
+    ("Retirar da venda e descartar os lotes já vencidos", "disposal", "high"),
+    ("Aplicar redução imediata de preço de 50% ou mais", "promotion", "high"),
+    ("Planejar promoção nos próximos 7 dias", "promotion", "medium"),
+    ("Incluir na promoção semanal", "promotion", "low"),
+]
+# Weekly promotions of pairs whose mean probability is at least this are medium impact
+HIGH_PROBABILITY = 0.75
+
+def _expiry_probability(model, probabilities: np.ndarray) -> np.ndarray:
+    """Probability of the item expiring before it sells, from predict_proba"""
+    classes = list(model.classes_)
+    if len(classes) == 2:
+        return probabilities[:, 1]
+    return 1.0 - probabilities[:, classes.index(LOW_RISK_CLASS)]
+
+def determine_actions(days_until_expiry: np.ndarray, probability: np.ndarray) -> np.ndarray:
+    """determinar_acao over whole arrays: the ACTION_* code of every item"""
+    return np.select(
+        [
+            days_until_expiry <= 0,
+            days_until_expiry <= 30,
+            days_until_expiry <= 40,
+            (days_until_expiry < 100) & (probability > 0.5),
+        ],
+        [ACTION_EXPIRED, ACTION_MARKDOWN, ACTION_PLAN_PROMOTION, ACTION_WEEKLY_PROMOTION],
+        default=ACTION_MONITOR
+    )
+
+def compose_scored_recommendation(
+    action: int,
+    category: str,
+    store: str,
+    items: int,
+    units: int,
+    mean_probability: float
+) -> Dict[str, Any]:
+    """Title, description, type and impact of the recommendation for one store and category"""
+    description, recommendation_type, impact = ACTIONS[action]
+    if action == ACTION_WEEKLY_PROMOTION and mean_probability >= HIGH_PROBABILITY:
+        impact = "medium"
+    return {
+        "title": f"[ML] Risco de vencimento em {category}",
+        "description": (
+            f"{description} para {items} lote(s) ({units} unidades) de {category} na loja {store}: "
+            f"probabilidade média de vencimento de {mean_probability:.0%}"
+        ),
+        "recommendation_type": recommendation_type,
+        "impact": impact,
+    }
+
+class RiskScoringService:
+    """
+    Scores the risk of every in-stock item expiring with the loaded risk model
+
+    Features are streamed out of Postgres with COPY, which skips building a
+    row object per item, and cut into SCORING_BATCH_SIZE batches; each batch
+    is parsed and scored with one vectorized predict_proba call in a worker
+    thread while the next one arrives.
+    The items determinar_acao would act on become one recommendation per
+    store and category, with the most urgent action of the pair.
+    """
+
+    def __init__(self, batch_size: int = SCORING_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def model_ready(self) -> bool:
+        """Whether a fitted risk model is loaded"""
+        return hasattr(predictor_service.risk_model, "classes_")
+
+    def _score_batch(self, model, feature_names: Sequence[str], csv: bytes) -> np.ndarray:
+        """Score FEATURES_QUERY rows in CSV; returns the items to act on (see _compose for the columns)"""
+        data = pd.read_csv(io.BytesIO(csv), header=None, dtype=np.float64).to_numpy()
+        features = np.column_stack([
+            data[:, FEATURE_SOURCES[name]] if FEATURE_SOURCES[name] is not None else np.zeros(len(data))
+            for name in feature_names
+        ])
+        if hasattr(model, "feature_names_in_"):
+            features = pd.DataFrame(features, columns=feature_names)
+
+        with predictor_inference_duration_seconds.time("risk_scoring"):
+            probability = _expiry_probability(model, model.predict_proba(features))
+
+        actions = determine_actions(data[:, DAYS_UNTIL_EXPIRY], probability)
+        flagged = actions != ACTION_MONITOR
+        return np.column_stack([
+            data[flagged][:, [ITEM_ID, STORE_ID, CATEGORY_ID, QUANTITY, DAYS_UNTIL_EXPIRY]],
+            probability[flagged],
+            actions[flagged],
+        ])
+
+    async def _score_inventory(self, db: AsyncSession, model) -> Tuple[int, np.ndarray]:
+        feature_names = list(getattr(model, "feature_names_in_", DEFAULT_RISK_FEATURES))
+        flagged = []
+        scoring: Optional[asyncio.Future] = None
+        buffered: List[bytes] = []
+        buffered_rows = 0
+        items_scored = 0
+
+        async def score(csv: bytes) -> None:
+            nonlocal scoring
+            if scoring is not None:
+                flagged.append(await scoring)
+            scoring = asyncio.ensure_future(asyncio.to_thread(self._score_batch, model, feature_names, csv))
+
+        async def receive(chunk: bytes) -> None:
+            nonlocal buffered_rows, items_scored
+            buffered.append(chunk)
+            buffered_rows += chunk.count(b"\n")
+            if buffered_rows >= self.batch_size:
+                # Hand over the complete lines, keep the partial last one
+                data = b"".join(buffered)
+                cut = data.rindex(b"\n") + 1
+                buffered[:] = [data[cut:]]
+                items_scored += buffered_rows
+                buffered_rows = 0
+                await score(data[:cut])
+
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_from_query(FEATURES_QUERY.text, output=receive, format="csv")
+
+        if buffered_rows:
+            items_scored += buffered_rows
+            await score(b"".join(buffered))
+        if scoring is not None:
+            flagged.append(await scoring)
+
+        return items_scored, np.concatenate(flagged) if flagged else np.empty((0, 7))
+
+    def _compose(self, flagged: np.ndarray, names: Dict[Tuple[str, int], str]) -> Tuple[List[Dict[str, Any]], List[List[int]]]:
+        items = pd.DataFrame(flagged, columns=[
+            "item_id", "store_id", "category_id", "quantity", "days_until_expiry", "probability", "action"
+        ]).astype({"item_id": int, "store_id": int, "category_id": int, "quantity": int, "action": int})
+        # Most urgent and likeliest first, so each pair's head is what it links to
+        items = items.sort_values(
+            ["store_id", "category_id", "action", "probability", "days_until_expiry"],
+            ascending=[True, True, True, False, True]
+        )
+        pairs = items.groupby(["store_id", "category_id"], sort=False)
+        summary = pairs.agg(
+            action=("action", "first"),
+            items=("item_id", "size"),
+            units=("quantity", "sum"),
+            mean_probability=("probability", "mean"),
+        )
+        linked = pairs.head(LINKED_ITEMS_PER_PAIR).groupby(["store_id", "category_id"], sort=False)["item_id"].agg(list)
+
+        recommendations = [
+            compose_scored_recommendation(
+                pair.action,
+                names.get(("category", category_id), str(category_id)),
+                names.get(("store", store_id), str(store_id)),
+                pair.items,
+                pair.units,
+                pair.mean_probability
+            )
+            for (store_id, category_id), pair in zip(summary.index, summary.itertuples(index=False))
+        ]
+        return recommendations, [linked[key] for key in summary.index]
+
+    async def generate_recommendations(self, db: AsyncSession) -> RiskScoringResult:
+        """Score the whole inventory and create the recommendations; raises RuntimeError without a fitted model"""
+        model = predictor_service.risk_model
+        if not self.model_ready():
+            raise RuntimeError("No fitted risk model is loaded")
+
+        start_time = time.perf_counter()
+        await db.execute(BULK_GENERATE_LOCK_QUERY)
+        items_scored, flagged = await self._score_inventory(db, model)
+        scoring_seconds = time.perf_counter() - start_time
+
+        names = {(row.kind, row.id): row.name for row in await db.execute(NAMES_QUERY)}
+        recommendations, linked_items = await asyncio.to_thread(self._compose, flagged, names)
+        item_count = await insert_recommendations(db, recommendations, linked_items)
+        await db.commit()
+
+        seconds = time.perf_counter() - start_time
+        items_per_second = items_scored / scoring_seconds if scoring_seconds > 0 else 0.0
+        logger.info(
+            f"Scored {items_scored} items in {scoring_seconds:.2f}s ({items_per_second:.0f} items/s), "
+            f"{len(flagged)} flagged; created {len(recommendations)} recommendations in {seconds:.2f}s"
+        )
+        return RiskScoringResult(
+            items_scored=items_scored,
+            items_flagged=len(flagged),
+            recommendations_created=len(recommendations),
+            items_linked=item_count,
+            scoring_seconds=round(scoring_seconds, 3),
+            seconds=round(seconds, 3),
+            items_per_second=round(items_per_second, 1)
+        )
+
+risk_scorer = RiskScoringService()
@@ -0,0 +1,56 @@
+from typing import Any, Dict
+import asyncio
+import os
+from ..database import AsyncSessionLocal
+from ..scheduler import JobScheduler
+from .alert_engine import alert_engine
+from .dashboard import dashboard_service
+from .predictor import predictor_service
+from .recommendation_generator import recommendation_generator
+from .risk_scoring import risk_scorer
+
+# Cron expressions (UTC) of the built-in jobs
+RECOMMENDATIONS_REFRESH_SCHEDULE = os.getenv("RECOMMENDATIONS_REFRESH_SCHEDULE", "0 6 * * *")
+DASHBOARD_ROLLUP_SCHEDULE = os.getenv("DASHBOARD_ROLLUP_SCHEDULE", "*/30 * * * *")
+MODEL_RELOAD_SCHEDULE = os.getenv("MODEL_RELOAD_SCHEDULE", "0 * * * *")
+MODEL_SCORING_SCHEDULE = os.getenv("MODEL_SCORING_SCHEDULE", "30 6 * * *")
+# A no-op until the date changes, so it runs often to roll over soon after midnight
+EXPIRY_BUCKETS_ROLLOVER_SCHEDULE = os.getenv("EXPIRY_BUCKETS_ROLLOVER_SCHEDULE", "*/5 * * * *")
+
+async def refresh_recommendations() -> Dict[str, Any]:
+    """Bulk-generate recommendations for every store and category"""
+    model_based = predictor_service.get_model_status()["models_loaded"]
+    async with AsyncSessionLocal() as db:
+        result = await recommendation_generator.generate_all(db, model_based)
+    return result.model_dump()
+
+async def roll_over_expiry_buckets() -> Dict[str, Any]:
+    """Move the alert levels of items crossing a level boundary to today's level"""
+    async with AsyncSessionLocal() as db:
+        rolled = await alert_engine.roll_forward(db)
+    return {"buckets_rolled": rolled}
+
+async def roll_up_dashboard_stats() -> Dict[str, Any]:
+    """Recompute today's dashboard_stats row and refresh the snapshot"""
+    summary = await asyncio.to_thread(dashboard_service.rollup)
+    return summary.model_dump()
+
+async def reload_models() -> Dict[str, Any]:
+    """Pick up retrained model files"""
+    await asyncio.to_thread(predictor_service.reload_models)
+    return predictor_service.get_model_status()
+
+async def score_inventory() -> Dict[str, Any]:
+    """Recommend actions from the risk model's scores of the whole inventory"""
+    if not risk_scorer.model_ready():
+        return {"skipped": "no fitted risk model is loaded"}
+    async with AsyncSessionLocal() as db:
+        result = await risk_scorer.generate_recommendations(db)
+    return result.model_dump()
+
+def register_default_jobs(scheduler: JobScheduler) -> None:
+    scheduler.register("recommendations_refresh", RECOMMENDATIONS_REFRESH_SCHEDULE, refresh_recommendations, timeout_seconds=1800)
+    scheduler.register("dashboard_rollup", DASHBOARD_ROLLUP_SCHEDULE, roll_up_dashboard_stats, timeout_seconds=600)
+    scheduler.register("model_reload", MODEL_RELOAD_SCHEDULE, reload_models, timeout_seconds=600)
+    scheduler.register("expiry_buckets_rollover", EXPIRY_BUCKETS_ROLLOVER_SCHEDULE, roll_over_expiry_buckets, timeout_seconds=600)
+    scheduler.register("model_scoring", MODEL_SCORING_SCHEDULE, score_inventory, timeout_seconds=1800)
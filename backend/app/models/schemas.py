@@ -203,4 +203,114 @@ class RecommendedAction(BaseModel):
     title: str
     description: str
     impact: str  # "high", "medium", "low"
-    is_useful: Optional[bool] = None 
\ No newline at end of file
+    is_useful: Optional[bool] = None
+
+class BulkRecommendationResult(BaseModel):
+    recommendations_created: int
+    items_linked: int
+    seconds: float
+
+class RiskScoringResult(BaseModel):
+    items_scored: int
+    items_flagged: int  # items with an action other than monitoring
+    recommendations_created: int
+    items_linked: int
+    scoring_seconds: float  # fetching features and predict_proba
+    seconds: float
+    items_per_second: float  # items scored per second of scoring
+
+class FeedbackEvent(BaseModel):
+    recommendation_id: int
+    is_useful: bool
+
+class FeedbackBatch(BaseModel):
+    events: List[FeedbackEvent] = Field(..., min_length=1, max_length=1000)
+
+class FeedbackBatchResult(BaseModel):
+    accepted: int
+    unknown_recommendation_ids: List[int]
+
+class FeedbackRate(BaseModel):
+    key: str  # recommendation type, store id or category id ("" for the overall rate)
+    name: str
+    useful: int
+    not_useful: int
+    usefulness_rate: Optional[float] = None  # None until there is feedback
+
+class FeedbackStats(BaseModel):
+    overall: FeedbackRate
+    by_recommendation_type: List[FeedbackRate]
+    by_store: List[FeedbackRate]
+    by_category: List[FeedbackRate]
+
+class JobRun(BaseModel):
+    id: int
+    job_name: str
+    trigger: str  # "schedule", "manual"
+    status: str  # "running", "succeeded", "failed", "abandoned"
+    scheduled_for: Optional[datetime] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    worker: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class JobStatus(BaseModel):
+    name: str
+    schedule: str
+    enabled: bool
+    next_run_at: datetime
+    run_requested: bool
+    running: bool
+    last_run: Optional[JobRun] = None
+
+class InventoryImportResult(BaseModel):
+    rows_received: int
+    rows_staged: int
+    rows_rejected: int
+    inserted: int
+    updated: int
+    seconds: float
+    rows_per_second: float
+    errors: List[str] = []
+
+class DashboardMetricChange(BaseModel):
+    value: float
+    change: Optional[float] = None  # vs. the previous period, None for the first one
+    change_pct: Optional[float] = None
+
+class DashboardHistoryPeriod(BaseModel):
+    period_start: date
+    as_of: date  # last day in the period with stats
+    total_savings: DashboardMetricChange
+    active_promotions: DashboardMetricChange
+    transferred_products: DashboardMetricChange
+    products_on_alert: DashboardMetricChange
+
+class DashboardHistory(BaseModel):
+    granularity: str  # "day", "week", "month"
+    periods: int
+    history: List[DashboardHistoryPeriod]
+
+class FacetCounts(BaseModel):
+    items: int
+    quantity: int
+    inventory_value: float
+    at_risk_value: float  # value of the items on high or medium alert
+
+class InventoryFacet(FacetCounts):
+    store: Optional[str] = None
+    category: Optional[str] = None
+    alert_level: Optional[str] = None  # "high", "medium", "low"
+
+class InventoryFacets(BaseModel):
+    total: FacetCounts
+    by_store: List[InventoryFacet]
+    by_category: List[InventoryFacet]
+    by_alert_level: List[InventoryFacet]
+    cells: List[InventoryFacet]  # store x category x alert level
+
+class InventoryItemBatch(BaseModel):
+    items: Dict[str, InventoryItemDetail]  # keyed by inventory item id
+    missing: List[int]
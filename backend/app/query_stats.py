@@ -0,0 +1,158 @@
+from typing import Any, Deque, Dict, Optional
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+import os
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# A statement run this many times in one request (with any parameters) is
+# reported as an N+1 suspect
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "3"))
+# Send the X-SQL-* headers on every response, not only when asked for
+SQL_STATS_HEADERS = os.getenv("SQL_STATS_HEADERS", "false").lower() in ("1", "true", "yes")
+# Requests kept per route for the rolling summary
+SQL_STATS_WINDOW = int(os.getenv("SQL_STATS_WINDOW", "200"))
+
+# Request header that opts a single request into the X-SQL-* headers
+OPT_IN_HEADER = "x-sql-stats"
+MAX_HEADER_STATEMENT_LENGTH = 200
+
+class RequestQueryStats:
+    """Statements executed while serving one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.statements[statement] += 1
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    @property
+    def n_plus_one_suspects(self) -> Dict[str, int]:
+        return {
+            statement: count for statement, count in self.statements.items()
+            if count >= SQL_N_PLUS_ONE_THRESHOLD
+        }
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-SQL-Count": str(self.count),
+            "X-SQL-Time-Ms": f"{self.total_seconds * 1000:.2f}",
+            "X-SQL-Slowest-Ms": f"{self.slowest_seconds * 1000:.2f}",
+            "X-SQL-N-Plus-One": str(len(self.n_plus_one_suspects)),
+        }
+        if self.slowest_statement:
+            # Single line, latin-1 safe and short enough for a header
+            statement = " ".join(self.slowest_statement.split())[:MAX_HEADER_STATEMENT_LENGTH]
+            headers["X-SQL-Slowest"] = statement.encode("latin-1", "replace").decode("latin-1")
+        return headers
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("sql_query_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_stats_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Statements outside a request (background refreshers, scripts) aren't tracked
+    stats = _current_stats.get()
+    start = getattr(context, "_query_stats_start", None)
+    if stats is not None and start is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement run through the engine (for async engines pass .sync_engine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class RouteQueryStats:
+    """Rolling per-route summary of the last SQL_STATS_WINDOW requests"""
+
+    def __init__(self, window: int = SQL_STATS_WINDOW):
+        self.window = window
+        self._requests: Dict[str, Deque[tuple]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._suspects: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, route: str, stats: RequestQueryStats) -> None:
+        suspects = stats.n_plus_one_suspects
+        self._requests[route].append((stats.count, stats.total_seconds, stats.slowest_seconds, bool(suspects)))
+        for statement in suspects:
+            self._suspects[route][statement] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        routes = {}
+        for route, requests in self._requests.items():
+            if not requests:
+                continue
+            counts = sorted(request[0] for request in requests)
+            total = sum(request[1] for request in requests)
+            routes[route] = {
+                "requests": len(requests),
+                "avg_statements": round(sum(counts) / len(requests), 2),
+                "max_statements": counts[-1],
+                "avg_db_ms": round(total / len(requests) * 1000, 2),
+                "max_slowest_ms": round(max(request[2] for request in requests) * 1000, 2),
+                "n_plus_one_requests": sum(1 for request in requests if request[3]),
+                "n_plus_one_statements": [
+                    {"statement": " ".join(statement.split()), "requests": count}
+                    for statement, count in self._suspects[route].most_common(5)
+                ],
+            }
+        return {"window": self.window, "n_plus_one_threshold": SQL_N_PLUS_ONE_THRESHOLD, "routes": routes}
+
+    def reset(self) -> None:
+        self._requests.clear()
+        self._suspects.clear()
+
+route_query_stats = RouteQueryStats()
+
+def _route_key(scope: Scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{scope.get('method', '')} {path}"
+
+class QueryStatsMiddleware:
+    """
+    Collects the SQL statements of each request
+
+    Adds X-SQL-* headers when the request sends "X-SQL-Stats: 1" (or always
+    with SQL_STATS_HEADERS=true) and feeds the per-route summary. Statements
+    a streaming body runs after the headers went out only reach the summary.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+        add_headers = SQL_STATS_HEADERS or Headers(scope=scope).get(OPT_IN_HEADER, "") in ("1", "true")
+
+        async def send_with_stats(message: Message) -> None:
+            if add_headers and message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                for name, value in stats.headers.items():
+                    headers[name] = value
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current_stats.reset(token)
+            route_query_stats.record(_route_key(scope), stats)
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import Dict, Any, List
+import logging
+from ..database import get_async_db, get_pool_stats, replica_router, DB_POOL_SIZE, DB_MAX_OVERFLOW
+from ..query_stats import route_query_stats
+from ..scheduler import job_scheduler
+from ..models.schemas import JobRun, JobStatus
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+@router.get("/admin/pool", response_model=Dict[str, Any])
+async def get_pool(db: AsyncSession = Depends(get_async_db)):
+    """Get connection pool settings and live usage for all engines"""
+    stats = get_pool_stats()
+    stats["replica_health"] = replica_router.status()
+    # Per-process budget: both engines can each open size + overflow connections
+    stats["process_max_connections"] = 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    try:
+        max_connections = (await db.execute(text("SHOW max_connections"))).scalar()
+        stats["server_max_connections"] = int(max_connections)
+    except Exception as e:
+        logger.warning(f"Could not read server max_connections: {e}")
+        stats["server_max_connections"] = None
+    return stats
+
+@router.get("/admin/sql-stats", response_model=Dict[str, Any])
+async def get_sql_stats():
+    """Get statement counts, DB time and N+1 suspects per route over recent requests"""
+    return route_query_stats.summary()
+
+@router.delete("/admin/sql-stats")
+async def reset_sql_stats():
+    """Clear the per-route SQL summary"""
+    route_query_stats.reset()
+    return {"status": "success", "message": "SQL stats cleared"}
+
+def _registered_job(name: str) -> str:
+    if name not in job_scheduler.job_names:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {name}")
+    return name
+
+@router.get("/admin/jobs", response_model=List[JobStatus])
+async def get_jobs(db: AsyncSession = Depends(get_async_db)):
+    """Get the scheduled jobs with their next and latest runs"""
+    return await job_scheduler.list_jobs(db)
+
+@router.get("/admin/jobs/{name}/runs", response_model=List[JobRun])
+async def get_job_runs(
+    name: str,
+    limit: int = Query(20, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the latest runs of a job, newest first"""
+    return await job_scheduler.list_runs(db, _registered_job(name), limit)
+
+@router.post("/admin/jobs/{name}/run", status_code=202)
+async def run_job(name: str, db: AsyncSession = Depends(get_async_db)):
+    """Queue a run of a job outside its schedule"""
+    await job_scheduler.request_run(db, _registered_job(name))
+    return {"status": "success", "message": f"Run of {name} queued"}
+
+@router.patch("/admin/jobs/{name}")
+async def update_job(name: str, enabled: bool = Body(..., embed=True), db: AsyncSession = Depends(get_async_db)):
+    """Pause or resume a job's schedule"""
+    await job_scheduler.set_enabled(db, _registered_job(name), enabled)
+    return {"status": "success", "message": f"Job {name} {'enabled' if enabled else 'disabled'}"}
@@ -0,0 +1,56 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator
+import asyncio
+import os
+import time
+import logging
+from ..models.live_updates import live_updates
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Comment lines sent on idle streams so proxies don't time them out
+KEEPALIVE_SECONDS = 15.0
+# Streams are closed after this long and the client reconnects (after
+# RECONNECT_MILLISECONDS) with a fresh snapshot, which rebalances clients
+# across workers and keeps a graceful shutdown from waiting on them forever
+STREAM_SECONDS = float(os.getenv("LIVE_UPDATES_STREAM_SECONDS", "300"))
+RECONNECT_MILLISECONDS = 1000
+
+async def _event_stream() -> AsyncIterator[bytes]:
+    queue = await live_updates.subscribe()
+    deadline = time.monotonic() + STREAM_SECONDS
+    try:
+        yield f"retry: {RECONNECT_MILLISECONDS}\n\n".encode()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=min(KEEPALIVE_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                # Dropped for falling behind or shutting down; EventSource reconnects
+                return
+            yield event
+    finally:
+        live_updates.unsubscribe(queue)
+
+@router.get("/events")
+async def get_events():
+    """
+    Stream alert and dashboard updates as server-sent events
+    
+    The first event ("snapshot") carries the dashboard counters and the
+    current alerts. After that, "dashboard" events carry only the counters
+    that changed and "alerts" events carry upserted alerts and removed ids.
+    """
+    return StreamingResponse(
+        _event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
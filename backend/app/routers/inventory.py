@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import asyncio
+import tempfile
+import logging
+from ..database import get_async_db
+from ..models.schemas import InventoryImportResult
+from ..models.inventory_import import inventory_importer, InventoryImportError
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Uploads beyond this size are spooled to disk instead of kept in memory
+UPLOAD_SPOOL_BYTES = 8 * 1024 * 1024
+
+PARQUET_CONTENT_TYPES = {"application/vnd.apache.parquet", "application/x-parquet", "application/parquet"}
+
+def _detect_format(request: Request, file_format: Optional[str]) -> str:
+    if file_format:
+        return file_format
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return "parquet" if content_type in PARQUET_CONTENT_TYPES else "csv"
+
+@router.post("/inventory/import", response_model=InventoryImportResult)
+async def import_inventory(
+    request: Request,
+    file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|parquet)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Bulk-load inventory batches from a CSV or Parquet request body"""
+    file_format = _detect_format(request, file_format)
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES) as upload:
+        async for chunk in request.stream():
+            # Past UPLOAD_SPOOL_BYTES this is a disk write; keep it off the loop
+            await asyncio.to_thread(upload.write, chunk)
+        upload.seek(0)
+
+        try:
+            return await inventory_importer.import_file(db, upload, file_format)
+        except InventoryImportError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error importing inventory: {e}")
+            raise HTTPException(status_code=500, detail=f"Error importing inventory: {e}")
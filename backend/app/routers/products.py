@@ -1,354 +1,382 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, Body
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, AsyncIterator, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, text, tuple_, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from datetime import date, datetime, timedelta
-from ..database import get_db
+import base64
+from ..database import get_async_read_db, open_read_session, reads_from_primary
+from ..models.alert_engine import alert_engine, ALERT_COLUMNS
+from ..models.dashboard import dashboard_service
+from ..models.inventory_facets import inventory_facets, apply_inventory_filters
+from ..serialization import RowSerializer, FastJSONResponse, layout_from_paths, select_fields, serializer_for_paths
+from ..data_versions import get_data_version_async, not_modified_response, INVENTORY_TABLES, ALERT_TABLES
 from ..models.db_models import (
     Product as DBProduct,
     Category as DBCategory,
     Store as DBStore,
-    InventoryItem as DBInventoryItem,
-    DashboardStat as DBDashboardStat
+    InventoryItem as DBInventoryItem
 )
 from ..models.schemas import (
     Product,
     InventoryItemDetail,
     ProductAlert,
-    DashboardSummary
+    DashboardSummary,
+    DashboardHistory,
+    InventoryFacets,
+    InventoryItemBatch
 )
 
 router = APIRouter()
 
-@router.get("/products", response_model=List[InventoryItemDetail])
-async def get_products(
-    category: Optional[str] = None, 
+DEFAULT_STREAM_BATCH_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+MAX_HISTORY_PERIODS = 366
+# Most ids one /products/batch request may ask for
+MAX_BATCH_IDS = 1000
+
+def _encode_cursor(expiration_date: date, item_id: int) -> str:
+    """Encode an (expiration_date, id) keyset position as an opaque cursor"""
+    raw = f"{expiration_date.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[date, int]:
+    """Decode a cursor produced by _encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        expiration_str, id_str = raw.split("|", 1)
+        return date.fromisoformat(expiration_str), int(id_str)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Columns behind InventoryItemDetail, keyed by their dotted path in the response
+INVENTORY_DETAIL_COLUMNS = [
+    ("id", DBInventoryItem.id),
+    ("product_id", DBInventoryItem.product_id),
+    ("store_id", DBInventoryItem.store_id),
+    ("quantity", DBInventoryItem.quantity),
+    ("expiration_date", DBInventoryItem.expiration_date),
+    ("manufacturing_date", DBInventoryItem.manufacturing_date),
+    ("purchase_date", DBInventoryItem.purchase_date),
+    ("batch_number", DBInventoryItem.batch_number),
+    ("unit_price", DBInventoryItem.unit_price),
+    ("created_at", DBInventoryItem.created_at),
+    ("updated_at", DBInventoryItem.updated_at),
+    ("product.id", DBProduct.id),
+    ("product.name", DBProduct.name),
+    ("product.category_id", DBCategory.id),
+    ("product.description", DBProduct.description),
+    ("product.created_at", DBProduct.created_at),
+    ("product.updated_at", DBProduct.updated_at),
+    ("product.category.id", DBCategory.id),
+    ("product.category.name", DBCategory.name),
+    ("product.category.description", DBCategory.description),
+    ("product.category.created_at", DBCategory.created_at),
+    ("product.category.updated_at", DBCategory.updated_at),
+    ("store.id", DBStore.id),
+    ("store.name", DBStore.name),
+    ("store.location", DBStore.location),
+    ("store.created_at", DBStore.created_at),
+    ("store.updated_at", DBStore.updated_at),
+    ("days_until_expiry", func.current_date() - DBInventoryItem.expiration_date),
+]
+
+inventory_detail_serializer = RowSerializer(
+    layout_from_paths(path for path, _ in INVENTORY_DETAIL_COLUMNS)
+)
+
+def _detail_columns(fields: Optional[str]) -> List[Tuple[str, object]]:
+    """INVENTORY_DETAIL_COLUMNS narrowed to a `fields=` sparse fieldset"""
+    try:
+        return select_fields(INVENTORY_DETAIL_COLUMNS, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _serializer_for(columns: List[Tuple[str, object]]) -> RowSerializer:
+    if columns is INVENTORY_DETAIL_COLUMNS:
+        return inventory_detail_serializer
+    return serializer_for_paths(tuple(path for path, _ in columns))
+
+def _build_products_query(
+    category: Optional[str] = None,
     store: Optional[str] = None,
     days_until_expiry: Optional[int] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    columns: List[Tuple[str, object]] = INVENTORY_DETAIL_COLUMNS
 ):
-    """Get all products with optional filtering"""
+    """
+    Build the inventory detail projection ordered by the (expiration_date, id) keyset
+    
+    Only plain columns are selected, so rows come back as tuples without
+    hydrating InventoryItem, Product, Category or Store entities. The keyset
+    columns are appended after `columns` for building the next cursor.
+    """
     query = (
-        db.query(
-            DBInventoryItem,
-            DBProduct,
-            DBCategory,
-            DBStore,
-            (func.current_date() - DBInventoryItem.expiration_date).label("days_until_expiry")
+        select(
+            *(column.label(path.replace(".", "__")) for path, column in columns),
+            DBInventoryItem.expiration_date.label("keyset_expiration_date"),
+            DBInventoryItem.id.label("keyset_id")
         )
+        .select_from(DBInventoryItem)
         .join(DBProduct, DBInventoryItem.product_id == DBProduct.id)
         .join(DBCategory, DBProduct.category_id == DBCategory.id)
-        .join(DBStore, DBInventoryItem.store_id == DBStore.id)
     )
+    # store_id is NOT NULL, so the store join only matters for its columns or the filter
+    if store or any(path.startswith("store.") for path, _ in columns):
+        query = query.join(DBStore, DBInventoryItem.store_id == DBStore.id)
+    query = apply_inventory_filters(query, category, store, days_until_expiry)
+    
+    if cursor:
+        # Keyset pagination: resume strictly after the last row of the previous page
+        cursor_date, cursor_id = _decode_cursor(cursor)
+        query = query.where(
+            tuple_(DBInventoryItem.expiration_date, DBInventoryItem.id) > tuple_(cursor_date, cursor_id)
+        )
     
-    if category:
-        query = query.filter(DBCategory.name == category)
-    
-    if store:
-        query = query.filter(DBStore.name == store)
-    
-    if days_until_expiry is not None:
-        # Filter items that will expire within the specified number of days
-        query = query.filter(DBInventoryItem.expiration_date <= func.current_date() + days_until_expiry)
-    
-    results = query.all()
-    
-    # Process results into InventoryItemDetail objects
-    inventory_items = []
-    for item, product, category, store, days in results:
-        # Create a combined object
-        inventory_detail = {
-            "id": item.id,
-            "product_id": product.id,
-            "store_id": store.id,
-            "quantity": item.quantity,
-            "expiration_date": item.expiration_date,
-            "manufacturing_date": item.manufacturing_date,
-            "purchase_date": item.purchase_date,
-            "batch_number": item.batch_number,
-            "unit_price": item.unit_price,
-            "created_at": item.created_at,
-            "updated_at": item.updated_at,
-            "product": {
-                "id": product.id,
-                "name": product.name,
-                "category_id": category.id,
-                "description": product.description,
-                "created_at": product.created_at,
-                "updated_at": product.updated_at,
-                "category": {
-                    "id": category.id,
-                    "name": category.name,
-                    "description": category.description,
-                    "created_at": category.created_at,
-                    "updated_at": category.updated_at
-                }
-            },
-            "store": {
-                "id": store.id,
-                "name": store.name,
-                "location": store.location,
-                "created_at": store.created_at,
-                "updated_at": store.updated_at
-            },
-            "days_until_expiry": days
-        }
-        inventory_items.append(inventory_detail)
-    
-    return inventory_items
+    return query.order_by(DBInventoryItem.expiration_date.asc(), DBInventoryItem.id.asc())
 
-@router.get("/products/{product_id}", response_model=InventoryItemDetail)
-async def get_product_by_id(product_id: int, db: Session = Depends(get_db)):
-    """Get a specific product by ID"""
-    item = (
-        db.query(
-            DBInventoryItem,
-            DBProduct,
-            DBCategory,
-            DBStore,
-            (func.current_date() - DBInventoryItem.expiration_date).label("days_until_expiry")
+async def _stream_products_ndjson(
+    category: Optional[str],
+    store: Optional[str],
+    days_until_expiry: Optional[int],
+    cursor: Optional[str],
+    limit: Optional[int],
+    use_primary: bool,
+    columns: List[Tuple[str, object]]
+) -> AsyncIterator[bytes]:
+    """Yield inventory details as NDJSON lines straight from a server-side cursor"""
+    # The request-scoped session is closed before a streaming body is sent,
+    # so the stream owns a session of its own for its whole lifetime
+    async with await open_read_session(use_primary) as db:
+        query = _build_products_query(category, store, days_until_expiry, cursor, columns)
+        if limit is not None:
+            query = query.limit(limit)
+        rows = await db.stream(query.execution_options(yield_per=DEFAULT_STREAM_BATCH_SIZE))
+        serializer = _serializer_for(columns)
+        
+        async for row in rows:
+            yield serializer.dumps(row) + b"\n"
+
+@router.get("/products", response_model=List[InventoryItemDetail])
+async def get_products(
+    request: Request,
+    category: Optional[str] = None, 
+    store: Optional[str] = None,
+    days_until_expiry: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,quantity,product.name,store.name"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Get all products with optional filtering
+    
+    Results are ordered by (expiration_date, id). Pass `limit` to page through
+    them; the `X-Next-Cursor` header carries the cursor for the following page.
+    With `stream=true` the rows are sent as NDJSON while the database produces them.
+    `fields` narrows both the query and each item to the listed (dotted) fields.
+    """
+    columns = _detail_columns(fields)
+    # Read the version before the rows: a change in between only makes the
+    # ETag older than the body, so the next poll refetches
+    version = await get_data_version_async(db, INVENTORY_TABLES)
+    not_modified = not_modified_response(request, version)
+    if not_modified:
+        return not_modified
+    
+    if stream:
+        if cursor:
+            # Validate up front so a bad cursor is a 400 rather than a broken stream
+            _decode_cursor(cursor)
+        return StreamingResponse(
+            _stream_products_ndjson(
+                category, store, days_until_expiry, cursor, limit, reads_from_primary(request), columns
+            ),
+            media_type="application/x-ndjson",
+            headers=version.headers
         )
-        .join(DBProduct, DBInventoryItem.product_id == DBProduct.id)
-        .join(DBCategory, DBProduct.category_id == DBCategory.id)
-        .join(DBStore, DBInventoryItem.store_id == DBStore.id)
-        .filter(DBInventoryItem.id == product_id)
-        .first()
-    )
     
-    if not item:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    item_obj, product, category, store, days = item
+    query = _build_products_query(category, store, days_until_expiry, cursor, columns)
     
-    # Create a combined object
-    inventory_detail = {
-        "id": item_obj.id,
-        "product_id": product.id,
-        "store_id": store.id,
-        "quantity": item_obj.quantity,
-        "expiration_date": item_obj.expiration_date,
-        "manufacturing_date": item_obj.manufacturing_date,
-        "purchase_date": item_obj.purchase_date,
-        "batch_number": item_obj.batch_number,
-        "unit_price": item_obj.unit_price,
-        "created_at": item_obj.created_at,
-        "updated_at": item_obj.updated_at,
-        "product": {
-            "id": product.id,
-            "name": product.name,
-            "category_id": category.id,
-            "description": product.description,
-            "created_at": product.created_at,
-            "updated_at": product.updated_at,
-            "category": {
-                "id": category.id,
-                "name": category.name,
-                "description": category.description,
-                "created_at": category.created_at,
-                "updated_at": category.updated_at
-            }
-        },
-        "store": {
-            "id": store.id,
-            "name": store.name,
-            "location": store.location,
-            "created_at": store.created_at,
-            "updated_at": store.updated_at
-        },
-        "days_until_expiry": days
-    }
+    headers = version.headers
+    if limit is not None:
+        # Fetch one extra row to know whether another page exists
+        results = (await db.execute(query.limit(limit + 1))).all()
+        if len(results) > limit:
+            results = results[:limit]
+            headers["X-Next-Cursor"] = _encode_cursor(results[-1].keyset_expiration_date, results[-1].keyset_id)
+    else:
+        results = (await db.execute(query)).all()
     
-    return inventory_detail
+    # Rows already match InventoryItemDetail, so skip response_model re-validation
+    return Response(
+        content=_serializer_for(columns).dumps_many(results),
+        media_type="application/json",
+        headers=headers
+    )
 
-@router.get("/products/alerts")
-async def get_product_alerts(threshold_days: str = Query("15"), db: Session = Depends(get_db)):
-    """Get products that will expire soon"""
+def _parse_threshold(threshold_days: str) -> int:
+    """Parse the threshold_days query value, falling back to 15 days"""
     try:
         # Convert threshold_days to integer
-        threshold = int(threshold_days)
+        return int(threshold_days)
     except ValueError:
-        threshold = 15  # Default value
-    
-    # Use a simpler SQL query
-    alerts_query = text("""
-        SELECT 
-            i.id as inventory_id,
-            p.id as product_id,
-            p.name as product_name,
-            c.name as category_name,
-            s.name as store_name,
-            i.quantity,
-            i.expiration_date,
-            i.unit_price,
-            (i.expiration_date - CURRENT_DATE) as days_until_expiry,
-            CASE
-                WHEN (i.expiration_date - CURRENT_DATE) <= 7 THEN 'high'
-                WHEN (i.expiration_date - CURRENT_DATE) <= 15 THEN 'medium'
-                ELSE 'low'
-            END as alert_level,
-            CASE
-                WHEN (i.expiration_date - CURRENT_DATE) <= 7 THEN 'Aplicar desconto de 30% ou transferir para loja com maior demanda'
-                WHEN (i.expiration_date - CURRENT_DATE) <= 15 THEN 'Monitorar e considerar promoção'
-                ELSE 'Nenhuma ação necessária'
-            END as recommended_action
-        FROM 
-            inventory_items i
-            JOIN products p ON i.product_id = p.id
-            JOIN categories c ON p.category_id = c.id
-            JOIN stores s ON i.store_id = s.id
-        WHERE 
-            (i.expiration_date - CURRENT_DATE) <= :threshold
-        ORDER BY
-            days_until_expiry ASC
-    """)
-    
-    results = db.execute(alerts_query, {"threshold": threshold}).fetchall()
-    
-    # Convert to a simple list of dictionaries
-    alerts = []
-    for row in results:
-        row_dict = dict(row._mapping)
-        
-        # Format dates for JSON serialization
-        expiration_date = row_dict["expiration_date"].isoformat() if row_dict["expiration_date"] else None
-        
-        alerts.append({
-            "product": {
-                "id": row_dict["inventory_id"],
-                "product_id": row_dict["product_id"],
-                "name": row_dict["product_name"],
-                "category": row_dict["category_name"],
-                "store": row_dict["store_name"],
-                "quantity": row_dict["quantity"],
-                "expiration_date": expiration_date,
-                "days_until_expiry": row_dict["days_until_expiry"]
-            },
-            "alert_level": row_dict["alert_level"],
-            "recommended_action": row_dict["recommended_action"]
-        })
-    
-    return alerts
+        return 15  # Default value
 
-@router.get("/product-alerts")
-async def get_product_alerts_v2(threshold_days: str = Query("15"), db: Session = Depends(get_db)):
-    """Get products that will expire soon (alternative endpoint)"""
+async def _get_alerts_if_modified(
+    request: Request,
+    db: AsyncSession,
+    threshold_days: str,
+    fields: Optional[str]
+) -> Response:
     try:
-        # Convert threshold_days to integer
-        threshold = int(threshold_days)
+        paths = tuple(path for path, _ in select_fields(ALERT_COLUMNS, fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Before the version, so a rollover's bump is part of this ETag
+    await alert_engine.ensure_rolled_over(db)
+    version = await get_data_version_async(db, ALERT_TABLES)
+    not_modified = not_modified_response(request, version)
+    if not_modified:
+        return not_modified
+    alerts = await alert_engine.get_alerts(db, _parse_threshold(threshold_days), paths)
+    return FastJSONResponse(content=alerts, headers=version.headers)
+
+ALERT_FIELDS_DESCRIPTION = "Comma-separated fields to return, e.g. product.name,product.store,alert_level"
+
+@router.get("/products/facets", response_model=InventoryFacets)
+async def get_product_facets(
+    request: Request,
+    response: Response,
+    category: Optional[str] = None,
+    store: Optional[str] = None,
+    days_until_expiry: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get item counts, quantities and at-risk value per store, category and alert level"""
+    version = await get_data_version_async(db, INVENTORY_TABLES)
+    not_modified = not_modified_response(request, version)
+    if not_modified:
+        return not_modified
+    response.headers.update(version.headers)
+    return await inventory_facets.get_facets(db, version, category, store, days_until_expiry)
+
+def _parse_batch_ids(values: List[str]) -> List[int]:
+    """Parse ids given as repeated and/or comma-separated values"""
+    try:
+        return [int(part) for value in values for part in value.split(",") if part.strip()]
     except ValueError:
-        threshold = 15  # Default value
-    
-    # Use a simpler SQL query
-    alerts_query = text("""
-        SELECT 
-            i.id as inventory_id,
-            p.id as product_id,
-            p.name as product_name,
-            c.name as category_name,
-            s.name as store_name,
-            i.quantity,
-            i.expiration_date,
-            i.unit_price,
-            (i.expiration_date - CURRENT_DATE) as days_until_expiry,
-            CASE
-                WHEN (i.expiration_date - CURRENT_DATE) <= 7 THEN 'high'
-                WHEN (i.expiration_date - CURRENT_DATE) <= 15 THEN 'medium'
-                ELSE 'low'
-            END as alert_level,
-            CASE
-                WHEN (i.expiration_date - CURRENT_DATE) <= 7 THEN 'Aplicar desconto de 30% ou transferir para loja com maior demanda'
-                WHEN (i.expiration_date - CURRENT_DATE) <= 15 THEN 'Monitorar e considerar promoção'
-                ELSE 'Nenhuma ação necessária'
-            END as recommended_action
-        FROM 
-            inventory_items i
-            JOIN products p ON i.product_id = p.id
-            JOIN categories c ON p.category_id = c.id
-            JOIN stores s ON i.store_id = s.id
-        WHERE 
-            (i.expiration_date - CURRENT_DATE) <= :threshold
-        ORDER BY
-            days_until_expiry ASC
-    """)
-    
-    results = db.execute(alerts_query, {"threshold": threshold}).fetchall()
-    
-    # Convert to a simple list of dictionaries
-    alerts = []
-    for row in results:
-        row_dict = dict(row._mapping)
-        
-        # Format dates for JSON serialization
-        expiration_date = row_dict["expiration_date"].isoformat() if row_dict["expiration_date"] else None
-        
-        alerts.append({
-            "product": {
-                "id": row_dict["inventory_id"],
-                "product_id": row_dict["product_id"],
-                "name": row_dict["product_name"],
-                "category": row_dict["category_name"],
-                "store": row_dict["store_name"],
-                "quantity": row_dict["quantity"],
-                "expiration_date": expiration_date,
-                "days_until_expiry": row_dict["days_until_expiry"]
-            },
-            "alert_level": row_dict["alert_level"],
-            "recommended_action": row_dict["recommended_action"]
-        })
-    
-    return alerts
+        raise HTTPException(status_code=400, detail="ids must be integers")
 
-@router.get("/dashboard", response_model=DashboardSummary)
-async def get_dashboard_summary(db: Session = Depends(get_db)):
-    """Get a summary for the dashboard"""
-    # Update dashboard stats manually instead of calling the trigger function
-    # The error occurs because trigger functions can only be called by triggers
-    update_stats_query = text("""
-    INSERT INTO dashboard_stats (date, total_savings, active_promotions, transferred_products, products_on_alert)
-    VALUES (
-        CURRENT_DATE,
-        (SELECT COALESCE(SUM(i.quantity * i.unit_price * (p.discount_percentage / 100)), 0)
-         FROM promotion_items pi
-         JOIN inventory_items i ON pi.inventory_item_id = i.id
-         JOIN promotions p ON pi.promotion_id = p.id
-         WHERE p.active = TRUE),
-        (SELECT COUNT(*) FROM promotions WHERE active = TRUE),
-        (SELECT COUNT(*) FROM transfers WHERE status = 'completed'),
-        (SELECT COUNT(*) FROM vw_products_on_alert)
+async def _get_products_batch(db: AsyncSession, ids: List[int], headers: Optional[dict] = None) -> Response:
+    """Fetch the requested inventory items in one query, keyed by id"""
+    # Deduplicated, first occurrence order
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    
+    # One array parameter, so every batch size shares the same statement
+    query = _build_products_query().where(
+        DBInventoryItem.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+    ).order_by(None)
+    to_dict = inventory_detail_serializer.to_dict
+    items = {str(row.id): to_dict(row) for row in (await db.execute(query)).all()}
+    
+    return FastJSONResponse(
+        content={"items": items, "missing": [id for id in ids if str(id) not in items]},
+        headers=headers
     )
-    ON CONFLICT (date) DO UPDATE
-    SET 
-        total_savings = EXCLUDED.total_savings,
-        active_promotions = EXCLUDED.active_promotions,
-        transferred_products = EXCLUDED.transferred_products,
-        products_on_alert = EXCLUDED.products_on_alert,
-        updated_at = CURRENT_TIMESTAMP
-    """)
-    
-    db.execute(update_stats_query)
-    db.commit()
+
+@router.get("/products/batch", response_model=InventoryItemBatch)
+async def get_products_batch(
+    request: Request,
+    ids: List[str] = Query(..., description="Inventory item ids, comma-separated and/or repeated"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get several inventory items by id; ids that don't exist are listed in `missing`"""
+    version = await get_data_version_async(db, INVENTORY_TABLES)
+    not_modified = not_modified_response(request, version)
+    if not_modified:
+        return not_modified
+    return await _get_products_batch(db, _parse_batch_ids(ids), version.headers)
+
+@router.post("/products/batch", response_model=InventoryItemBatch)
+async def post_products_batch(
+    ids: List[int] = Body(..., embed=True),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get several inventory items by id, for id lists too long for a query string"""
+    return await _get_products_batch(db, ids)
+
+@router.get("/products/alerts")
+async def get_product_alerts(
+    request: Request,
+    threshold_days: str = Query("15"),
+    fields: Optional[str] = Query(None, description=ALERT_FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get products that will expire soon"""
+    return await _get_alerts_if_modified(request, db, threshold_days, fields)
+
+@router.get("/product-alerts")
+async def get_product_alerts_v2(
+    request: Request,
+    threshold_days: str = Query("15"),
+    fields: Optional[str] = Query(None, description=ALERT_FIELDS_DESCRIPTION),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get products that will expire soon (alternative endpoint)"""
+    return await _get_alerts_if_modified(request, db, threshold_days, fields)
+
+# Declared after the fixed /products/... routes so it doesn't shadow them
+@router.get("/products/{product_id}", response_model=InventoryItemDetail)
+async def get_product_by_id(product_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    """Get a specific product by ID"""
+    version = await get_data_version_async(db, INVENTORY_TABLES)
+    not_modified = not_modified_response(request, version)
+    if not_modified:
+        return not_modified
     
-    # Get the latest dashboard stats from the database
-    stats = db.query(DBDashboardStat).order_by(DBDashboardStat.date.desc()).first()
+    result = await db.execute(_build_products_query().where(DBInventoryItem.id == product_id))
+    item = result.first()
     
-    if not stats:
-        # If still no stats, return default values
-        return DashboardSummary(
-            total_savings=0,
-            active_promotions=0,
-            transferred_products=0,
-            products_on_alert=0
-        )
+    if not item:
+        raise HTTPException(status_code=404, detail="Product not found")
     
-    return DashboardSummary(
-        total_savings=float(stats.total_savings),
-        active_promotions=stats.active_promotions,
-        transferred_products=stats.transferred_products,
-        products_on_alert=stats.products_on_alert
+    return Response(
+        content=inventory_detail_serializer.dumps(item),
+        media_type="application/json",
+        headers=version.headers
     )
 
+@router.get("/dashboard", response_model=DashboardSummary)
+async def get_dashboard_summary(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db)):
+    """Get a summary for the dashboard"""
+    # Served from the in-process snapshot kept current by the background refresher,
+    # tagged with the dashboard_stats version it was built from
+    summary, version = await dashboard_service.get_versioned_summary(db)
+    not_modified = not_modified_response(request, version)
+    if not_modified:
+        return not_modified
+    response.headers.update(version.headers)
+    return summary
+
+@router.get("/dashboard/history", response_model=DashboardHistory)
+async def get_dashboard_history(
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    periods: int = Query(30, ge=1, le=MAX_HISTORY_PERIODS),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get dashboard metrics per day, week or month with period-over-period changes"""
+    return await dashboard_service.get_history(db, granularity, periods)
+
 @router.get("/dashboard/trends")
-async def get_dashboard_trends(db: Session = Depends(get_db)):
+async def get_dashboard_trends(db: AsyncSession = Depends(get_async_read_db)):
     """Get trend data for dashboard metrics compared to previous period"""
     
     # Use SQL to get the current and previous month's dashboard stats
@@ -373,7 +401,7 @@ async def get_dashboard_trends(db: Session = Depends(get_db)):
         LEFT JOIN prev_stats p ON 1=1
     """)
     
-    result = db.execute(trends_query).first()
+    result = (await db.execute(trends_query)).first()
     
     # If no previous stats or database error, use default values
     if not result:
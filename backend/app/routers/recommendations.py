@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException, Body, Depends
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Body, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional, Dict, Any, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_
 from datetime import datetime
-from ..database import get_db
+import base64
+from ..database import get_async_db, get_async_read_db, open_read_session, reads_from_primary
+from ..data_versions import get_data_version_async, not_modified_response, RECOMMENDATION_TABLES
 from ..models.db_models import (  
     Recommendation as DBRecommendation,
     RecommendationItem as DBRecommendationItem,
@@ -11,24 +15,109 @@ from ..models.db_models import (
     Category as DBCategory,
     Store as DBStore
 )
-from ..models.schemas import RecommendedAction
+from ..models.schemas import RecommendedAction, BulkRecommendationResult, RiskScoringResult, FeedbackBatch, FeedbackBatchResult, FeedbackStats
+from ..models.feedback import feedback_ingestor, FeedbackBufferFull
 from ..models.predictor import predictor_service
+from ..models.recommendation_generator import recommendation_generator, compose_recommendation
+from ..models.risk_scoring import risk_scorer
 import random
 from sqlalchemy.sql import text
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def _encode_cursor(created_at: datetime, recommendation_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{recommendation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by _encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at_str, id_str = raw.split("|", 1)
+        return datetime.fromisoformat(created_at_str), int(id_str)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _submit_feedback(events: List[Tuple[int, bool]]) -> Set[int]:
+    """Queue feedback for the next group commit; returns the unknown recommendation ids"""
+    try:
+        return await feedback_ingestor.submit(events)
+    except FeedbackBufferFull:
+        raise HTTPException(status_code=503, detail="Too much feedback pending, retry shortly")
+
+async def _stream_feedback_ndjson(after_id: int, use_primary: bool) -> AsyncIterator[bytes]:
+    """Yield feedback events as NDJSON lines straight from a server-side cursor"""
+    # The stream outlives the request-scoped session, so it owns one
+    async with await open_read_session(use_primary) as db:
+        async for line in feedback_ingestor.export_ndjson(db, after_id):
+            yield line
+
 @router.get("/recommendations", response_model=List[RecommendedAction])
-async def get_recommendations(impact: Optional[str] = None, db: Session = Depends(get_db)):
-    """Get AI-generated recommendations for store management"""
+async def get_recommendations(
+    request: Request,
+    response: Response,
+    impact: Optional[str] = None,
+    recommendation_type: Optional[str] = None,
+    acted_upon: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Get AI-generated recommendations for store management
+    
+    Newest first, `limit` per page; the `X-Next-Cursor` header carries the
+    cursor for the following page. `created_after` is inclusive and
+    `created_before` exclusive.
+    """
     model_status = predictor_service.get_model_status()
     
-    query = db.query(DBRecommendation)
+    # Descriptions depend on whether the models are loaded, so that is part of the version
+    version = await get_data_version_async(db, RECOMMENDATION_TABLES, f"models_loaded={model_status['models_loaded']}")
+    not_modified = not_modified_response(request, version)
+    if not_modified:
+        return not_modified
+    response.headers.update(version.headers)
+    
+    query = select(DBRecommendation)
     
     if impact:
-        query = query.filter(DBRecommendation.impact == impact)
+        query = query.where(DBRecommendation.impact == impact)
+    
+    if recommendation_type:
+        query = query.where(DBRecommendation.recommendation_type == recommendation_type)
+    
+    if acted_upon is not None:
+        query = query.where(DBRecommendation.acted_upon == acted_upon)
     
-    recommendations = query.order_by(DBRecommendation.created_at.desc()).all()
+    if created_after:
+        query = query.where(DBRecommendation.created_at >= created_after)
+    
+    if created_before:
+        query = query.where(DBRecommendation.created_at < created_before)
+    
+    if cursor:
+        # Keyset pagination: continue after the last (created_at, id) of the previous page
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        query = query.where(
+            tuple_(DBRecommendation.created_at, DBRecommendation.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    
+    query = query.order_by(DBRecommendation.created_at.desc(), DBRecommendation.id.desc())
+    
+    # Fetch one extra row to know whether another page exists
+    recommendations = (await db.execute(query.limit(limit + 1))).scalars().all()
+    if len(recommendations) > limit:
+        recommendations = recommendations[:limit]
+        last = recommendations[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last.created_at, last.id)
     
     result = []
     for rec in recommendations:
@@ -48,23 +137,48 @@ async def get_recommendations(impact: Optional[str] = None, db: Session = Depend
     return result
 
 @router.post("/recommendations/{recommendation_id}/feedback")
-async def provide_feedback(recommendation_id: int, is_useful: bool = Body(..., embed=True), db: Session = Depends(get_db)):
+async def provide_feedback(recommendation_id: int, is_useful: bool = Body(..., embed=True)):
     """Provide feedback on a recommendation"""
-    recommendation = db.query(DBRecommendation).filter(DBRecommendation.id == recommendation_id).first()
+    unknown = await _submit_feedback([(recommendation_id, is_useful)])
     
-    if not recommendation:
+    if unknown:
         raise HTTPException(status_code=404, detail="Recommendation not found")
     
-    recommendation.is_useful = is_useful
-    db.commit()
-    
     return {"status": "success", "message": "Feedback received"}
 
+@router.post("/recommendations/feedback", response_model=FeedbackBatchResult)
+async def provide_feedback_batch(batch: FeedbackBatch):
+    """Provide feedback on several recommendations at once"""
+    events = [(event.recommendation_id, event.is_useful) for event in batch.events]
+    unknown = await _submit_feedback(events)
+    return FeedbackBatchResult(
+        accepted=sum(1 for recommendation_id, _ in events if recommendation_id not in unknown),
+        unknown_recommendation_ids=sorted(unknown)
+    )
+
+@router.get("/recommendations/feedback/stats", response_model=FeedbackStats)
+async def get_feedback_stats(db: AsyncSession = Depends(get_async_read_db)):
+    """Usefulness rates overall and per recommendation type, store and category"""
+    return await feedback_ingestor.get_stats(db)
+
+@router.get("/recommendations/feedback/export")
+async def export_feedback(request: Request, after_id: int = Query(0, ge=0)):
+    """
+    Export the feedback log as NDJSON, oldest first
+    
+    Each line is one feedback event with its recommendation and scope; pass
+    the last exported `id` as `after_id` to fetch only newer events.
+    """
+    return StreamingResponse(
+        _stream_feedback_ndjson(after_id, reads_from_primary(request)),
+        media_type="application/x-ndjson"
+    )
+
 @router.post("/recommendations/generate", response_model=RecommendedAction)
 async def generate_recommendation(
     category: Optional[str] = Body(None), 
     store: Optional[str] = Body(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Generate a new recommendation based on product category and store"""
     model_status = predictor_service.get_model_status()
@@ -73,7 +187,7 @@ async def generate_recommendation(
     category_id = None
     category_value = "todas categorias"
     if category:
-        category_obj = db.query(DBCategory).filter(DBCategory.name == category).first()
+        category_obj = (await db.execute(select(DBCategory).where(DBCategory.name == category))).scalars().first()
         if category_obj:
             category_id = category_obj.id
             category_value = category_obj.name
@@ -81,7 +195,7 @@ async def generate_recommendation(
     store_id = None
     store_value = "todas lojas"
     if store:
-        store_obj = db.query(DBStore).filter(DBStore.name == store).first()
+        store_obj = (await db.execute(select(DBStore).where(DBStore.name == store))).scalars().first()
         if store_obj:
             store_id = store_obj.id
             store_value = store_obj.name
@@ -99,7 +213,7 @@ async def generate_recommendation(
             JOIN categories c ON p.category_id = c.id
             JOIN stores s ON i.store_id = s.id
         WHERE 
-            (i.expiration_date - CURRENT_DATE) <= 15
+            i.expiration_date <= CURRENT_DATE + 15
     """
     
     params = {}
@@ -111,102 +225,30 @@ async def generate_recommendation(
         expiring_products_query += " AND i.store_id = :store_id"
         params["store_id"] = store_id
     
-    expiring_products_query += " ORDER BY days_until_expiry ASC LIMIT 5"
-    
-    expiring_products = db.execute(text(expiring_products_query), params).fetchall()
+    expiring_products_query += " ORDER BY i.expiration_date ASC LIMIT 5"
     
-    recommendation_templates = [
-        "Aplicar desconto de {discount}% em produtos de {category} na loja {store}",
-        "Transferir produtos de {category} da loja {store} para outras unidades com maior demanda",
-        "Realizar campanha específica para {category} na loja {store}",
-        "Treinar equipe da loja {store} para sugerir ativamente produtos de {category}",
-        "Reposicionar produtos de {category} em áreas de maior visibilidade na loja {store}"
-    ]
+    expiring_products = (await db.execute(text(expiring_products_query), params)).fetchall()
     
-    if model_based:
-        recommendation_templates.append(
-            "Com base em análise preditiva, recomendamos {action} para produtos de {category} "
-            "na loja {store} para reduzir o risco de perdas em {risk_reduction}%"
-        )
-    
-    template = recommendation_templates[0]
-    
-    if expiring_products:
-        first_product = dict(expiring_products[0]._mapping)
-        days_left = first_product["days_until_expiry"]
-        product_name = first_product["product_name"]
-        
-        if days_left <= 7:
-            discount = 30
-            template = recommendation_templates[0]
-        elif days_left <= 10:
-            discount = 20
-            template = recommendation_templates[0]
-        elif days_left <= 15:
-            discount = 15
-            template = recommendation_templates[3]
-        
-        if len(expiring_products) > 2:
-            template = recommendation_templates[1]
-    else:
-        discount = 15
-        template_index = min(len(recommendation_templates) - 1, 2)
-        template = recommendation_templates[template_index]
-    
-    risk_reduction = 0
-    if expiring_products:
-        total_days = sum(dict(p._mapping)["days_until_expiry"] for p in expiring_products)
-        avg_days = total_days / len(expiring_products)
-        risk_reduction = min(round(100 - (avg_days * 5)), 45)
-    else:
-        risk_reduction = 20
-    
-    actions = ["redução de preço", "transferência", "campanha específica"]
-    action_index = 0
-    
-    if expiring_products:
-        if any(dict(p._mapping)["days_until_expiry"] <= 7 for p in expiring_products):
-            action_index = 0
-        elif len(expiring_products) > 2 and all(dict(p._mapping)["days_until_expiry"] > 10 for p in expiring_products):
-            action_index = 1
-        else:
-            action_index = 2
-    
-    template_vars = {
-        "category": category_value,
-        "store": store_value,
-        "discount": discount,
-        "action": actions[action_index],
-        "risk_reduction": risk_reduction
-    }
-    
-    description = template.format(**template_vars)
-    
-    recommendation_type = ["promotion", "transfer", "display", "training"][min(action_index, 3)]
-    
-    if risk_reduction > 30:
-        impact = "high"
-    elif risk_reduction > 15:
-        impact = "medium"
-    else:
-        impact = "low"
+    recommendation = compose_recommendation(
+        [dict(p._mapping)["days_until_expiry"] for p in expiring_products],
+        category_value,
+        store_value,
+        model_based
+    )
     
     new_recommendation = DBRecommendation(
-        title=f"{'[ML] ' if model_based else ''}Nova Recomendação para {category_value}",
-        description=description,
-        recommendation_type=recommendation_type,
-        impact=impact,
+        **recommendation,
         is_useful=None,
         acted_upon=False
     )
     
     db.add(new_recommendation)
-    db.commit()
-    db.refresh(new_recommendation)
+    await db.commit()
+    await db.refresh(new_recommendation)
     
     if expiring_products and (category_id or store_id):
         inventory_query = (
-            db.query(DBInventoryItem)
+            select(DBInventoryItem)
             .join(DBProduct, DBInventoryItem.product_id == DBProduct.id)
         )
         
@@ -217,9 +259,9 @@ async def generate_recommendation(
             conditions.append(DBInventoryItem.store_id == store_id)
         
         if conditions:
-            inventory_query = inventory_query.filter(*conditions)
+            inventory_query = inventory_query.where(*conditions)
         
-        inventory_items = inventory_query.limit(3).all()
+        inventory_items = (await db.execute(inventory_query.limit(3))).scalars().all()
         
         for item in inventory_items:
             recommendation_item = DBRecommendationItem(
@@ -228,7 +270,7 @@ async def generate_recommendation(
             )
             db.add(recommendation_item)
         
-        db.commit()
+        await db.commit()
     
     return RecommendedAction(
         id=new_recommendation.id,
@@ -238,6 +280,19 @@ async def generate_recommendation(
         is_useful=new_recommendation.is_useful
     )
 
+@router.post("/recommendations/generate/bulk", response_model=BulkRecommendationResult)
+async def generate_recommendations_bulk(db: AsyncSession = Depends(get_async_db)):
+    """Generate recommendations for every store and category with stock expiring soon"""
+    model_based = predictor_service.get_model_status()["models_loaded"]
+    return await recommendation_generator.generate_all(db, model_based)
+
+@router.post("/recommendations/generate/ml", response_model=RiskScoringResult)
+async def generate_recommendations_ml(db: AsyncSession = Depends(get_async_db)):
+    """Score the expiry risk of the whole inventory with the risk model and recommend actions"""
+    if not risk_scorer.model_ready():
+        raise HTTPException(status_code=503, detail="No fitted risk model is loaded")
+    return await risk_scorer.generate_recommendations(db)
+
 @router.get("/recommendations/model-status")
 async def get_model_status():
     """Get the status of the recommendation model"""
@@ -0,0 +1,431 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta, timezone
+import asyncio
+import json
+import os
+import socket
+import time
+import logging
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal
+from .metrics import job_duration_seconds, jobs_in_progress
+from .serialization import dumps_json
+
+logger = logging.getLogger(__name__)
+
+# Run scheduled jobs in this process (turn off for e.g. one-off script workers)
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Job runs executing at the same time in one worker
+JOBS_MAX_CONCURRENCY = int(os.getenv("JOBS_MAX_CONCURRENCY", "2"))
+# How often the job table is checked for due jobs
+JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", "15"))
+# Runs still marked running after this long belonged to a worker that died
+JOBS_RUN_TIMEOUT_SECONDS = float(os.getenv("JOBS_RUN_TIMEOUT_SECONDS", "3600"))
+# Finished runs older than this are deleted
+JOB_RUNS_RETENTION_DAYS = int(os.getenv("JOB_RUNS_RETENTION_DAYS", "30"))
+
+# Time running jobs get to finish on shutdown before they are cancelled
+SHUTDOWN_GRACE_SECONDS = 10.0
+MAX_ERROR_LENGTH = 2000
+
+JobFunction = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+# minute, hour, day of month, month, day of week (0 or 7 = Sunday)
+CRON_FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    values = set()
+    for part in field.split(","):
+        spec, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if spec == "*":
+            start, end = low, high
+        elif "-" in spec:
+            start, end = (int(bound) for bound in spec.split("-", 1))
+        else:
+            start = int(spec)
+            end = high if step_text else start
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"Invalid cron field {field!r} (allowed {low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronSchedule:
+    """
+    Five-field cron expression (minute hour day-of-month month day-of-week)
+
+    Supports *, lists, ranges, steps and the @hourly/@daily/@weekly/@monthly
+    aliases. Times are UTC. As in cron, when both day fields are restricted
+    a day matching either of them fires.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression, expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression {expression!r} needs 5 fields")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_cron_field(field, low, high)
+            for field, (low, high) in zip(fields, CRON_FIELD_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """The first time after `moment` (aware) the schedule fires"""
+        candidate = moment.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Skip whole months, days and hours that can't match; leap days need up to 8 years
+        limit = candidate + timedelta(days=366 * 8)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                month_start = candidate.replace(day=1, hour=0, minute=0)
+                candidate = (month_start + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+def classify_claim(schedule: CronSchedule, row, now: datetime) -> Tuple[str, datetime, datetime]:
+    """
+    (trigger, scheduled_for, next_run_at) for a claimed scheduled_jobs row
+
+    A pending manual request makes the run manual, even when the job is also
+    due. The schedule only advances when an enabled job's time has come, so
+    running a disabled job by hand leaves its next_run_at alone.
+    """
+    due = row.enabled and row.next_run_at <= now
+    next_run_at = schedule.next_after(now) if due else row.next_run_at
+    if row.run_requested_at is not None:
+        return "manual", row.run_requested_at, next_run_at
+    return "schedule", row.next_run_at, next_run_at
+
+class ScheduledJob:
+    """A named coroutine function run on a cron schedule"""
+
+    def __init__(self, name: str, schedule: str, run: JobFunction, timeout_seconds: float):
+        self.name = name
+        self.schedule = CronSchedule(schedule)
+        self.run = run
+        self.timeout_seconds = timeout_seconds
+
+UPSERT_JOB_QUERY = text("""
+    INSERT INTO scheduled_jobs (name, schedule, next_run_at)
+    VALUES (:name, :schedule, :next_run_at)
+    ON CONFLICT (name) DO UPDATE
+    SET schedule = EXCLUDED.schedule, next_run_at = EXCLUDED.next_run_at, updated_at = CURRENT_TIMESTAMP
+    WHERE scheduled_jobs.schedule <> EXCLUDED.schedule
+""")
+
+ABANDON_STALE_RUNS_QUERY = text("""
+    UPDATE job_runs
+    SET status = 'abandoned', finished_at = CURRENT_TIMESTAMP, error = 'Worker stopped before the run finished'
+    WHERE status = 'running'
+      AND started_at < CURRENT_TIMESTAMP - make_interval(secs => :timeout_seconds)
+""")
+
+# Due jobs with no run in progress; rows another worker is claiming are skipped
+CLAIM_DUE_JOBS_QUERY = text("""
+    SELECT name, enabled, next_run_at, run_requested_at
+    FROM scheduled_jobs s
+    WHERE name = ANY(CAST(:names AS TEXT[]))
+      AND ((enabled AND next_run_at <= CURRENT_TIMESTAMP) OR run_requested_at IS NOT NULL)
+      AND NOT EXISTS (
+          SELECT 1 FROM job_runs r WHERE r.job_name = s.name AND r.status = 'running'
+      )
+    ORDER BY COALESCE(run_requested_at, next_run_at)
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+""")
+
+ADVANCE_JOB_QUERY = text("""
+    UPDATE scheduled_jobs
+    SET next_run_at = :next_run_at, run_requested_at = NULL
+    WHERE name = :name
+""")
+
+START_RUN_QUERY = text("""
+    INSERT INTO job_runs (job_name, trigger, status, scheduled_for, worker)
+    VALUES (:job_name, :trigger, 'running', :scheduled_for, :worker)
+    RETURNING id
+""")
+
+FINISH_RUN_QUERY = text("""
+    UPDATE job_runs
+    SET status = :status,
+        finished_at = CURRENT_TIMESTAMP,
+        duration_seconds = :duration_seconds,
+        result = CAST(:result AS JSONB),
+        error = :error
+    WHERE id = :id
+""")
+
+PRUNE_RUNS_QUERY = text("""
+    DELETE FROM job_runs
+    WHERE job_name = :job_name
+      AND status <> 'running'
+      AND started_at < CURRENT_TIMESTAMP - make_interval(days => :retention_days)
+""")
+
+JOB_RUN_COLUMNS = """
+    id, job_name, trigger, status, scheduled_for, started_at,
+    finished_at, duration_seconds, worker, result, error
+"""
+
+LIST_JOBS_QUERY = text(f"""
+    SELECT
+        s.name, s.schedule, s.enabled, s.next_run_at,
+        s.run_requested_at IS NOT NULL AS run_requested,
+        last_run.*
+    FROM scheduled_jobs s
+    LEFT JOIN LATERAL (
+        SELECT {JOB_RUN_COLUMNS}
+        FROM job_runs r
+        WHERE r.job_name = s.name
+        ORDER BY r.started_at DESC
+        LIMIT 1
+    ) last_run ON TRUE
+    WHERE s.name = ANY(CAST(:names AS TEXT[]))
+    ORDER BY s.name
+""")
+
+LIST_RUNS_QUERY = text(f"""
+    SELECT {JOB_RUN_COLUMNS}
+    FROM job_runs
+    WHERE job_name = :job_name
+    ORDER BY started_at DESC
+    LIMIT :limit
+""")
+
+REQUEST_RUN_QUERY = text("""
+    UPDATE scheduled_jobs
+    SET run_requested_at = COALESCE(run_requested_at, CURRENT_TIMESTAMP)
+    WHERE name = :name
+""")
+
+SET_ENABLED_QUERY = text("""
+    UPDATE scheduled_jobs
+    SET enabled = :enabled, next_run_at = :next_run_at, updated_at = CURRENT_TIMESTAMP
+    WHERE name = :name
+""")
+
+def _run_from_row(row) -> Optional[Dict[str, Any]]:
+    if row.id is None:
+        return None
+    result = row.result
+    if isinstance(result, str):
+        result = json.loads(result)
+    return {
+        "id": row.id,
+        "job_name": row.job_name,
+        "trigger": row.trigger,
+        "status": row.status,
+        "scheduled_for": row.scheduled_for,
+        "started_at": row.started_at,
+        "finished_at": row.finished_at,
+        "duration_seconds": row.duration_seconds,
+        "worker": row.worker,
+        "result": result,
+        "error": row.error,
+    }
+
+class JobScheduler:
+    """
+    Runs registered jobs on cron schedules, off the request path
+
+    Every worker polls the scheduled_jobs table and claims due rows with
+    FOR UPDATE SKIP LOCKED, so a run happens in exactly one worker, and a
+    job never overlaps with its own previous run. Each worker runs at most
+    max_concurrency jobs at a time. Missed runs (e.g. while the API was
+    down) are not caught up; the job runs once and moves on to its next time.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = JOBS_MAX_CONCURRENCY,
+        poll_seconds: float = JOBS_POLL_SECONDS
+    ):
+        self.max_concurrency = max_concurrency
+        self.poll_seconds = poll_seconds
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._running: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def job_names(self) -> List[str]:
+        return list(self._jobs)
+
+    def register(self, name: str, schedule: str, run: JobFunction, timeout_seconds: float = JOBS_RUN_TIMEOUT_SECONDS) -> None:
+        """Add a job; `run` returns an optional JSON-able result stored with the run"""
+        if name in self._jobs:
+            raise ValueError(f"Job {name} is already registered")
+        self._jobs[name] = ScheduledJob(name, schedule, run, min(timeout_seconds, JOBS_RUN_TIMEOUT_SECONDS))
+
+    async def _sync_jobs(self) -> None:
+        # New jobs get their first run time; a changed schedule restarts from now
+        now = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            for job in self._jobs.values():
+                await db.execute(UPSERT_JOB_QUERY, {
+                    "name": job.name,
+                    "schedule": job.schedule.expression,
+                    "next_run_at": job.schedule.next_after(now)
+                })
+            await db.commit()
+
+    async def _claim_due(self, limit: int) -> List[Tuple[int, ScheduledJob, str]]:
+        claimed = []
+        async with AsyncSessionLocal() as db:
+            await db.execute(ABANDON_STALE_RUNS_QUERY, {"timeout_seconds": JOBS_RUN_TIMEOUT_SECONDS})
+            rows = (await db.execute(CLAIM_DUE_JOBS_QUERY, {"names": self.job_names, "limit": limit})).all()
+            now = datetime.now(timezone.utc)
+            for row in rows:
+                job = self._jobs[row.name]
+                trigger, scheduled_for, next_run_at = classify_claim(job.schedule, row, now)
+                await db.execute(ADVANCE_JOB_QUERY, {"name": job.name, "next_run_at": next_run_at})
+                run_id = (await db.execute(START_RUN_QUERY, {
+                    "job_name": job.name,
+                    "trigger": trigger,
+                    "scheduled_for": scheduled_for,
+                    "worker": self.worker
+                })).scalar()
+                claimed.append((run_id, job, trigger))
+            await db.commit()
+        return claimed
+
+    async def _execute(self, run_id: int, job: ScheduledJob, trigger: str) -> None:
+        logger.info(f"Starting job {job.name} (run {run_id}, {trigger})")
+        status, result, error = "succeeded", None, None
+        start_time = time.perf_counter()
+        jobs_in_progress.inc(job.name)
+        try:
+            result = await asyncio.wait_for(job.run(), timeout=job.timeout_seconds)
+        except asyncio.TimeoutError:
+            status, error = "failed", f"Timed out after {job.timeout_seconds:.0f}s"
+        except asyncio.CancelledError:
+            status, error = "failed", "Cancelled on shutdown"
+        except Exception as e:
+            logger.error(f"Job {job.name} failed: {e}", exc_info=True)
+            status, error = "failed", f"{type(e).__name__}: {e}"[:MAX_ERROR_LENGTH]
+        finally:
+            jobs_in_progress.dec(job.name)
+
+        duration = time.perf_counter() - start_time
+        job_duration_seconds.observe(duration, job.name, status)
+        logger.info(f"Job {job.name} {status} in {duration:.2f}s")
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(FINISH_RUN_QUERY, {
+                    "id": run_id,
+                    "status": status,
+                    "duration_seconds": duration,
+                    "result": dumps_json(result).decode() if result is not None else None,
+                    "error": error
+                })
+                await db.execute(PRUNE_RUNS_QUERY, {"job_name": job.name, "retention_days": JOB_RUNS_RETENTION_DAYS})
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Could not record the result of job {job.name} run {run_id}: {e}")
+
+    def _on_run_done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        # A slot is free; there may be due jobs waiting for it
+        self._wakeup.set()
+
+    async def _loop(self) -> None:
+        synced = False
+        while True:
+            try:
+                if not synced:
+                    await self._sync_jobs()
+                    synced = True
+                free_slots = self.max_concurrency - len(self._running)
+                if free_slots > 0:
+                    for run_id, job, trigger in await self._claim_due(free_slots):
+                        task = asyncio.create_task(self._execute(run_id, job, trigger), name=f"job-{job.name}")
+                        self._running.add(task)
+                        task.add_done_callback(self._on_run_done)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error polling scheduled jobs: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def list_jobs(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        """Registered jobs with their schedule, next run and latest run"""
+        rows = (await db.execute(LIST_JOBS_QUERY, {"names": self.job_names})).all()
+        return [{
+            "name": row.name,
+            "schedule": row.schedule,
+            "enabled": row.enabled,
+            "next_run_at": row.next_run_at,
+            "run_requested": row.run_requested,
+            "running": row.status == "running",
+            "last_run": _run_from_row(row),
+        } for row in rows]
+
+    async def list_runs(self, db: AsyncSession, name: str, limit: int) -> List[Dict[str, Any]]:
+        """The latest runs of a job, newest first"""
+        rows = (await db.execute(LIST_RUNS_QUERY, {"job_name": name, "limit": limit})).all()
+        return [_run_from_row(row) for row in rows]
+
+    async def request_run(self, db: AsyncSession, name: str) -> None:
+        """Queue a run of the job as soon as a worker has a free slot (even when disabled)"""
+        await db.execute(REQUEST_RUN_QUERY, {"name": name})
+        await db.commit()
+        self._wakeup.set()
+
+    async def set_enabled(self, db: AsyncSession, name: str, enabled: bool) -> None:
+        """Pause or resume a job's schedule; resuming continues from now"""
+        next_run_at = self._jobs[name].schedule.next_after(datetime.now(timezone.utc))
+        await db.execute(SET_ENABLED_QUERY, {"name": name, "enabled": enabled, "next_run_at": next_run_at})
+        await db.commit()
+
+    def start(self) -> None:
+        """Start polling for due jobs on the running loop"""
+        if self._task or not self._jobs:
+            return
+        self._task = asyncio.create_task(self._loop(), name="job-scheduler")
+
+    async def stop(self) -> None:
+        """Stop polling and give running jobs a moment to finish"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._running:
+            running = list(self._running)
+            _, pending = await asyncio.wait(running, timeout=SHUTDOWN_GRACE_SECONDS)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+job_scheduler = JobScheduler()
@@ -0,0 +1,127 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from operator import itemgetter
+import json
+from fastapi.responses import JSONResponse
+
+# orjson is the fast path; the stdlib encoder produces the same JSON
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# A layout maps output keys either to a column position in a result row or
+# to a nested layout, e.g. {"id": 0, "store": {"id": 5, "name": 6}}
+RowLayout = Dict[str, Union[int, "RowLayout"]]
+
+def json_default(value: Any) -> Any:
+    """Fallback encoder for values the json module can't handle natively"""
+    if isinstance(value, datetime) and value.utcoffset() == timedelta(0):
+        # UTC as "Z", like Pydantic's JSON output
+        return value.isoformat()[:-len("+00:00")] + "Z"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # Match the string form Pydantic uses for Decimal fields
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+_stdlib_encoder = json.JSONEncoder(default=json_default, ensure_ascii=False, separators=(",", ":"))
+
+def dumps_json_stdlib(value: Any) -> bytes:
+    """Encode a value as compact UTF-8 JSON with the json module"""
+    return _stdlib_encoder.encode(value).encode()
+
+if ORJSON_AVAILABLE:
+    def dumps_json(value: Any) -> bytes:
+        """Encode a value as compact UTF-8 JSON (dates as ISO strings, UTC as "Z", Decimals as strings)"""
+        # orjson handles dates natively and only calls back for Decimals
+        return orjson.dumps(value, default=json_default, option=orjson.OPT_UTC_Z)
+else:
+    dumps_json = dumps_json_stdlib
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with dumps_json
+
+    Return it directly from routes that build plain dicts/lists: FastAPI then
+    skips its jsonable_encoder walk, which dominates on large payloads.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+def _compile_layout(layout: RowLayout) -> Callable[[tuple], Dict[str, Any]]:
+    """Turn a layout into a function building the nested dict for one row"""
+    getters = [
+        (key, _compile_layout(value) if isinstance(value, dict) else itemgetter(value))
+        for key, value in layout.items()
+    ]
+
+    def build(row: tuple) -> Dict[str, Any]:
+        return {key: getter(row) for key, getter in getters}
+
+    return build
+
+class RowSerializer:
+    """
+    Serializes plain result tuples straight to JSON
+
+    The layout is compiled once into itemgetter-based builders, so each row
+    costs a handful of tuple lookups plus the native JSON encoder, with no
+    ORM objects or Pydantic validation in between.
+    """
+
+    def __init__(self, layout: RowLayout):
+        self.layout = layout
+        self.to_dict = _compile_layout(layout)
+
+    def dumps(self, row: tuple) -> bytes:
+        """Encode a single row as a JSON object"""
+        return dumps_json(self.to_dict(row))
+
+    def dumps_many(self, rows: Iterable[tuple]) -> bytes:
+        """Encode rows as a JSON array"""
+        to_dict = self.to_dict
+        return dumps_json([to_dict(row) for row in rows])
+
+def layout_from_paths(paths: Iterable[str]) -> RowLayout:
+    """Build a nested layout from dotted paths listed in column order"""
+    layout: RowLayout = {}
+    for index, path in enumerate(paths):
+        *parents, leaf = path.split(".")
+        node = layout
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = index
+    return layout
+
+@lru_cache(maxsize=256)
+def serializer_for_paths(paths: Tuple[str, ...]) -> RowSerializer:
+    """Cached serializer for rows whose leading columns are `paths`, in order"""
+    return RowSerializer(layout_from_paths(paths))
+
+def _selects(path: str, field: str) -> bool:
+    return path == field or path.startswith(field + ".")
+
+def select_fields(columns: Sequence[Tuple[str, Any]], fields: Optional[str]) -> List[Tuple[str, Any]]:
+    """
+    Narrow (path, column) pairs to a comma-separated sparse fieldset
+
+    A field selects its path and everything nested below it, so "store"
+    keeps every store.* column. Column order is preserved. Raises
+    ValueError for fields that match no column.
+    """
+    if not fields:
+        return list(columns)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if not any(_selects(path, field) for path, _ in columns)]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [
+        (path, column) for path, column in columns
+        if any(_selects(path, field) for field in requested)
+    ]
@@ -106,6 +106,36 @@ CREATE TABLE IF NOT EXISTS recommendation_items (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Append-only log of feedback on recommendations, written in batches by the
+-- backend (app/models/feedback.py). recommendations.is_useful keeps the latest
+-- value; the scope columns are resolved from the recommendation's items when
+-- the event is written, so exports need no joins
+CREATE TABLE IF NOT EXISTS recommendation_feedback (
+    id BIGSERIAL PRIMARY KEY,
+    recommendation_id INTEGER NOT NULL REFERENCES recommendations(id),
+    is_useful BOOLEAN NOT NULL,
+    recommendation_type VARCHAR(50),
+    store_id INTEGER, -- NULL when the items span several stores (or there are none)
+    category_id INTEGER, -- likewise for categories
+    received_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_recommendation_feedback_recommendation
+    ON recommendation_feedback (recommendation_id);
+
+-- Current useful / not useful counts per recommendation type, store and
+-- category (dimension 'all' holds the totals). Each recommendation counts once,
+-- with its latest feedback; maintained together with the log above.
+CREATE TABLE IF NOT EXISTS recommendation_feedback_stats (
+    dimension VARCHAR(20) NOT NULL, -- all, recommendation_type, store, category
+    key VARCHAR(100) NOT NULL, -- type name, store id or category id ('' for all)
+    useful INTEGER NOT NULL DEFAULT 0,
+    not_useful INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (dimension, key)
+);
+
 -- Statistics for dashboard
 CREATE TABLE IF NOT EXISTS dashboard_stats (
     id SERIAL PRIMARY KEY,
@@ -117,6 +147,178 @@ CREATE TABLE IF NOT EXISTS dashboard_stats (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Pending changes to dashboard_stats, one row per modifying statement
+-- Triggers only append here, so writers never contend on the dashboard_stats
+-- row; the backend folds these into today's row in the background
+CREATE TABLE IF NOT EXISTS dashboard_stat_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    total_savings NUMERIC NOT NULL DEFAULT 0,
+    active_promotions INTEGER NOT NULL DEFAULT 0,
+    transferred_products INTEGER NOT NULL DEFAULT 0,
+    products_on_alert INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Change counters for conditional GETs
+-- One row per table, bumped by the data_version triggers below whenever a
+-- statement changes rows of that table. The API derives ETag/Last-Modified
+-- from these, so a poll that hasn't missed a change is answered with 304
+-- after a primary key lookup here. Bumps are transactional, so a counter
+-- never becomes visible before the rows it covers.
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Indexes for expiry lookups
+-- Queries must compare expiration_date against a bound (e.g.
+-- expiration_date <= CURRENT_DATE + 15) rather than filtering on
+-- (expiration_date - CURRENT_DATE) for these to be usable
+CREATE INDEX IF NOT EXISTS idx_inventory_items_expiration_date
+    ON inventory_items (expiration_date);
+CREATE INDEX IF NOT EXISTS idx_inventory_items_store_expiration
+    ON inventory_items (store_id, expiration_date);
+-- Also the match key of POST /inventory/import (plus batch_number)
+CREATE INDEX IF NOT EXISTS idx_inventory_items_product_store
+    ON inventory_items (product_id, store_id, expiration_date);
+
+-- Recommendation listing, newest first, keyset-paginated on (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_recommendations_created
+    ON recommendations (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_recommendations_impact_created
+    ON recommendations (impact, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_recommendations_acted_upon_created
+    ON recommendations (acted_upon, created_at, id);
+
+-- Lookups used by the dashboard delta triggers
+CREATE INDEX IF NOT EXISTS idx_promotion_items_inventory_item
+    ON promotion_items (inventory_item_id);
+CREATE INDEX IF NOT EXISTS idx_promotion_items_promotion
+    ON promotion_items (promotion_id);
+
+-- Alert engine: precomputed expiry buckets per inventory item
+-- Rows are kept current by the sync_expiry_bucket_on_inventory_* triggers when
+-- inventory items change and rolled forward by refresh_inventory_expiry_buckets()
+-- when the date changes. Days until expiry are computed on read from
+-- expiration_date, so only the alert level depends on the date.
+CREATE TABLE IF NOT EXISTS inventory_expiry_buckets (
+    inventory_item_id INTEGER PRIMARY KEY REFERENCES inventory_items(id) ON DELETE CASCADE,
+    expiration_date DATE NOT NULL,
+    alert_level VARCHAR(10) NOT NULL -- high, medium, low
+);
+
+CREATE INDEX IF NOT EXISTS idx_inventory_expiry_buckets_expiration
+    ON inventory_expiry_buckets (expiration_date, inventory_item_id);
+
+-- Date the stored alert levels were last rolled forward to (a single row)
+CREATE TABLE IF NOT EXISTS inventory_expiry_rollover (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    computed_on DATE NOT NULL
+);
+
+INSERT INTO inventory_expiry_rollover (computed_on) VALUES (CURRENT_DATE)
+ON CONFLICT DO NOTHING;
+
+-- Alert level for a number of days until expiry
+CREATE OR REPLACE FUNCTION expiry_alert_level(days INTEGER)
+RETURNS VARCHAR AS $$
+    SELECT CASE
+        WHEN days <= 7 THEN 'high'
+        WHEN days <= 15 THEN 'medium'
+        ELSE 'low'
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Recommended action for an alert level
+CREATE OR REPLACE FUNCTION expiry_recommended_action(level VARCHAR)
+RETURNS VARCHAR AS $$
+    SELECT CASE level
+        WHEN 'high' THEN 'Aplicar desconto de 30% ou transferir para loja com maior demanda'
+        WHEN 'medium' THEN 'Monitorar e considerar promoção'
+        ELSE 'Nenhuma ação necessária'
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Keep the buckets of the inventory items a statement changed in sync with
+-- their expiration dates: one set-based upsert per statement. Transition
+-- tables can't be combined with a column list, so updates skip the rows
+-- whose expiration date didn't change.
+CREATE OR REPLACE FUNCTION sync_inventory_expiry_buckets()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO inventory_expiry_buckets (inventory_item_id, expiration_date, alert_level)
+        SELECT n.id, n.expiration_date, expiry_alert_level(n.expiration_date - CURRENT_DATE)
+        FROM new_rows n
+        ON CONFLICT (inventory_item_id) DO UPDATE
+        SET
+            expiration_date = EXCLUDED.expiration_date,
+            alert_level = EXCLUDED.alert_level;
+    ELSE
+        INSERT INTO inventory_expiry_buckets (inventory_item_id, expiration_date, alert_level)
+        SELECT n.id, n.expiration_date, expiry_alert_level(n.expiration_date - CURRENT_DATE)
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE o.expiration_date IS DISTINCT FROM n.expiration_date
+        ON CONFLICT (inventory_item_id) DO UPDATE
+        SET
+            expiration_date = EXCLUDED.expiration_date,
+            alert_level = EXCLUDED.alert_level;
+    END IF;
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER sync_expiry_bucket_on_inventory_insert
+AFTER INSERT ON inventory_items REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sync_inventory_expiry_buckets();
+
+CREATE TRIGGER sync_expiry_bucket_on_inventory_update
+AFTER UPDATE ON inventory_items REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION sync_inventory_expiry_buckets();
+
+-- Roll the stored alert levels forward to today. Levels only change where
+-- days until expiry cross 7 or 15, so going from day L to day D only touches
+-- items expiring in (L + 7, D + 7] or (L + 15, D + 15], through the
+-- expiration_date index. Run by the expiry_buckets_rollover job; returns the
+-- number of buckets whose level changed.
+CREATE OR REPLACE FUNCTION refresh_inventory_expiry_buckets()
+RETURNS INTEGER AS $$
+DECLARE
+    last_computed_on DATE;
+    rolled INTEGER;
+BEGIN
+    SELECT computed_on INTO last_computed_on FROM inventory_expiry_rollover FOR UPDATE;
+    IF last_computed_on >= CURRENT_DATE THEN
+        RETURN 0;
+    END IF;
+    
+    UPDATE inventory_expiry_buckets
+    SET alert_level = expiry_alert_level(expiration_date - CURRENT_DATE)
+    WHERE
+        (
+            (expiration_date > last_computed_on + 7 AND expiration_date <= CURRENT_DATE + 7)
+            OR (expiration_date > last_computed_on + 15 AND expiration_date <= CURRENT_DATE + 15)
+        )
+        AND alert_level <> expiry_alert_level(expiration_date - CURRENT_DATE);
+    GET DIAGNOSTICS rolled = ROW_COUNT;
+    
+    UPDATE inventory_expiry_rollover SET computed_on = CURRENT_DATE;
+    
+    -- The buckets have no data_version triggers (they change with every
+    -- inventory write), so alert ETags pick up the rollover here
+    IF rolled > 0 THEN
+        UPDATE data_versions
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE table_name = 'inventory_expiry_buckets';
+    END IF;
+    
+    RETURN rolled;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Sample data insertion
 
 -- Insert store locations
@@ -229,27 +431,35 @@ FROM
     JOIN stores s ON i.store_id = s.id;
 
 -- View for products on alert (close to expiration)
+-- Reads levels from the alert engine's expiry buckets
 CREATE OR REPLACE VIEW vw_products_on_alert AS
 SELECT 
-    *,
-    CASE
-        WHEN days_until_expiry <= 7 THEN 'high'
-        WHEN days_until_expiry <= 15 THEN 'medium'
-        ELSE 'low'
-    END as alert_level,
-    CASE
-        WHEN days_until_expiry <= 7 THEN 'Aplicar desconto de 30% ou transferir para loja com maior demanda'
-        WHEN days_until_expiry <= 15 THEN 'Monitorar e considerar promoção'
-        ELSE 'Nenhuma ação necessária'
-    END as recommended_action
+    i.id as inventory_id,
+    p.id as product_id,
+    p.name as product_name,
+    c.name as category,
+    s.name as store,
+    i.quantity,
+    i.expiration_date,
+    i.unit_price,
+    (b.expiration_date - CURRENT_DATE) as days_until_expiry,
+    -- From the date rather than the stored level, which only moves to a
+    -- new day with the rollover
+    expiry_alert_level(b.expiration_date - CURRENT_DATE) as alert_level,
+    expiry_recommended_action(expiry_alert_level(b.expiration_date - CURRENT_DATE)) as recommended_action
 FROM 
-    vw_products_expiration
+    inventory_expiry_buckets b
+    JOIN inventory_items i ON b.inventory_item_id = i.id
+    JOIN products p ON i.product_id = p.id
+    JOIN categories c ON p.category_id = c.id
+    JOIN stores s ON i.store_id = s.id
 WHERE 
-    days_until_expiry <= 15;
+    b.expiration_date <= CURRENT_DATE + 15;
 
--- Function to update dashboard stats
-CREATE OR REPLACE FUNCTION update_dashboard_stats()
-RETURNS TRIGGER AS $$
+-- Full recompute of today's dashboard stats
+-- Used at initialization and by the backend's periodic reconciliation
+CREATE OR REPLACE FUNCTION recompute_dashboard_stats()
+RETURNS VOID AS $$
 BEGIN
     -- Insert or update dashboard stats for today
     INSERT INTO dashboard_stats (date, total_savings, active_promotions, transferred_products, products_on_alert)
@@ -271,45 +481,335 @@ BEGIN
         transferred_products = EXCLUDED.transferred_products,
         products_on_alert = EXCLUDED.products_on_alert,
         updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Append a dashboard delta unless it is a no-op
+CREATE OR REPLACE FUNCTION record_dashboard_delta(
+    d_savings NUMERIC,
+    d_promotions INTEGER,
+    d_transfers INTEGER,
+    d_alerts INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    IF COALESCE(d_savings, 0) <> 0 OR d_promotions <> 0 OR d_transfers <> 0 OR d_alerts <> 0 THEN
+        INSERT INTO dashboard_stat_deltas (total_savings, active_promotions, transferred_products, products_on_alert)
+        VALUES (COALESCE(d_savings, 0), d_promotions, d_transfers, d_alerts);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Delta triggers
+-- Each fires once per statement and only reads the statement's transition
+-- tables (plus index lookups for the rows they touch), so cost is
+-- proportional to the rows changed rather than to the size of the tables.
+-- Transition tables are only allowed on single-event triggers, hence one
+-- trigger per event below sharing a function per table.
+
+CREATE OR REPLACE FUNCTION dashboard_delta_inventory()
+RETURNS TRIGGER AS $$
+DECLARE
+    d_savings NUMERIC := 0;
+    d_alerts INTEGER := 0;
+    part_savings NUMERIC;
+    part_alerts INTEGER;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT COALESCE(SUM(n.quantity * n.unit_price * (p.discount_percentage / 100)), 0)
+        INTO part_savings
+        FROM new_rows n
+        JOIN promotion_items pi ON pi.inventory_item_id = n.id
+        JOIN promotions p ON pi.promotion_id = p.id
+        WHERE p.active = TRUE;
+        
+        SELECT COUNT(*) INTO part_alerts FROM new_rows n WHERE n.expiration_date <= CURRENT_DATE + 15;
+        
+        d_savings := d_savings + part_savings;
+        d_alerts := d_alerts + part_alerts;
+    END IF;
+    
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT COALESCE(SUM(o.quantity * o.unit_price * (p.discount_percentage / 100)), 0)
+        INTO part_savings
+        FROM old_rows o
+        JOIN promotion_items pi ON pi.inventory_item_id = o.id
+        JOIN promotions p ON pi.promotion_id = p.id
+        WHERE p.active = TRUE;
+        
+        SELECT COUNT(*) INTO part_alerts FROM old_rows o WHERE o.expiration_date <= CURRENT_DATE + 15;
+        
+        d_savings := d_savings - part_savings;
+        d_alerts := d_alerts - part_alerts;
+    END IF;
+    
+    PERFORM record_dashboard_delta(d_savings, 0, 0, d_alerts);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dashboard_delta_promotions()
+RETURNS TRIGGER AS $$
+DECLARE
+    d_savings NUMERIC := 0;
+    d_promotions INTEGER := 0;
+    part_savings NUMERIC;
+    part_promotions INTEGER;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT COALESCE(SUM(i.quantity * i.unit_price * (n.discount_percentage / 100)), 0)
+        INTO part_savings
+        FROM new_rows n
+        JOIN promotion_items pi ON pi.promotion_id = n.id
+        JOIN inventory_items i ON pi.inventory_item_id = i.id
+        WHERE n.active = TRUE;
+        
+        SELECT COUNT(*) INTO part_promotions FROM new_rows n WHERE n.active = TRUE;
+        
+        d_savings := d_savings + part_savings;
+        d_promotions := d_promotions + part_promotions;
+    END IF;
+    
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT COALESCE(SUM(i.quantity * i.unit_price * (o.discount_percentage / 100)), 0)
+        INTO part_savings
+        FROM old_rows o
+        JOIN promotion_items pi ON pi.promotion_id = o.id
+        JOIN inventory_items i ON pi.inventory_item_id = i.id
+        WHERE o.active = TRUE;
+        
+        SELECT COUNT(*) INTO part_promotions FROM old_rows o WHERE o.active = TRUE;
+        
+        d_savings := d_savings - part_savings;
+        d_promotions := d_promotions - part_promotions;
+    END IF;
+    
+    PERFORM record_dashboard_delta(d_savings, d_promotions, 0, 0);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dashboard_delta_promotion_items()
+RETURNS TRIGGER AS $$
+DECLARE
+    d_savings NUMERIC := 0;
+    part_savings NUMERIC;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT COALESCE(SUM(i.quantity * i.unit_price * (p.discount_percentage / 100)), 0)
+        INTO part_savings
+        FROM new_rows n
+        JOIN inventory_items i ON n.inventory_item_id = i.id
+        JOIN promotions p ON n.promotion_id = p.id
+        WHERE p.active = TRUE;
+        
+        d_savings := d_savings + part_savings;
+    END IF;
+    
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT COALESCE(SUM(i.quantity * i.unit_price * (p.discount_percentage / 100)), 0)
+        INTO part_savings
+        FROM old_rows o
+        JOIN inventory_items i ON o.inventory_item_id = i.id
+        JOIN promotions p ON o.promotion_id = p.id
+        WHERE p.active = TRUE;
+        
+        d_savings := d_savings - part_savings;
+    END IF;
+    
+    PERFORM record_dashboard_delta(d_savings, 0, 0, 0);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dashboard_delta_transfers()
+RETURNS TRIGGER AS $$
+DECLARE
+    d_transfers INTEGER := 0;
+    part_transfers INTEGER;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT COUNT(*) INTO part_transfers FROM new_rows n WHERE n.status = 'completed';
+        d_transfers := d_transfers + part_transfers;
+    END IF;
     
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT COUNT(*) INTO part_transfers FROM old_rows o WHERE o.status = 'completed';
+        d_transfers := d_transfers - part_transfers;
+    END IF;
+    
+    PERFORM record_dashboard_delta(0, 0, d_transfers, 0);
     RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- Create triggers to update dashboard stats
-CREATE TRIGGER update_dashboard_on_promotion
+-- Create triggers to record dashboard deltas
+CREATE TRIGGER dashboard_delta_on_inventory_insert
+AFTER INSERT ON inventory_items REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_inventory();
+
+CREATE TRIGGER dashboard_delta_on_inventory_update
+AFTER UPDATE ON inventory_items REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_inventory();
+
+CREATE TRIGGER dashboard_delta_on_inventory_delete
+AFTER DELETE ON inventory_items REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_inventory();
+
+CREATE TRIGGER dashboard_delta_on_promotion_insert
+AFTER INSERT ON promotions REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_promotions();
+
+CREATE TRIGGER dashboard_delta_on_promotion_update
+AFTER UPDATE ON promotions REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_promotions();
+
+CREATE TRIGGER dashboard_delta_on_promotion_delete
+AFTER DELETE ON promotions REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_promotions();
+
+CREATE TRIGGER dashboard_delta_on_promotion_items_insert
+AFTER INSERT ON promotion_items REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_promotion_items();
+
+CREATE TRIGGER dashboard_delta_on_promotion_items_update
+AFTER UPDATE ON promotion_items REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_promotion_items();
+
+CREATE TRIGGER dashboard_delta_on_promotion_items_delete
+AFTER DELETE ON promotion_items REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_promotion_items();
+
+CREATE TRIGGER dashboard_delta_on_transfer_insert
+AFTER INSERT ON transfers REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_transfers();
+
+CREATE TRIGGER dashboard_delta_on_transfer_update
+AFTER UPDATE ON transfers REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_transfers();
+
+CREATE TRIGGER dashboard_delta_on_transfer_delete
+AFTER DELETE ON transfers REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_delta_transfers();
+
+-- Data version triggers
+-- Statement-level, and skipped when the statement changed no rows (e.g. the
+-- periodic dashboard fold when there are no deltas), so clients don't
+-- refetch unchanged data
+CREATE OR REPLACE FUNCTION bump_data_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM changed_rows) THEN
+        UPDATE data_versions
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE table_name = TG_TABLE_NAME;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+INSERT INTO data_versions (table_name) VALUES
+    ('stores'),
+    ('categories'),
+    ('products'),
+    ('inventory_items'),
+    ('recommendations'),
+    ('dashboard_stats')
+ON CONFLICT DO NOTHING;
+
+DO $$
+DECLARE
+    versioned_table VARCHAR;
+BEGIN
+    FOR versioned_table IN SELECT table_name FROM data_versions LOOP
+        EXECUTE format(
+            'CREATE TRIGGER data_version_on_%1$s_insert AFTER INSERT ON %1$I '
+            'REFERENCING NEW TABLE AS changed_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()',
+            versioned_table
+        );
+        EXECUTE format(
+            'CREATE TRIGGER data_version_on_%1$s_update AFTER UPDATE ON %1$I '
+            'REFERENCING NEW TABLE AS changed_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()',
+            versioned_table
+        );
+        EXECUTE format(
+            'CREATE TRIGGER data_version_on_%1$s_delete AFTER DELETE ON %1$I '
+            'REFERENCING OLD TABLE AS changed_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version()',
+            versioned_table
+        );
+    END LOOP;
+END;
+$$;
+
+-- No triggers for the expiry buckets: they change with every inventory_items
+-- write (already versioned), and firing a bump per bucket statement inside
+-- bulk loads is needlessly slow. refresh_inventory_expiry_buckets() bumps this
+-- row once when the day rollover changes levels.
+INSERT INTO data_versions (table_name) VALUES ('inventory_expiry_buckets')
+ON CONFLICT DO NOTHING;
+
+-- Change notifications for live updates
+-- One NOTIFY per modifying statement; Postgres delivers it at commit and
+-- folds identical notifications of a transaction into one. Each API worker
+-- LISTENs on a single connection and pushes diffs to its SSE clients.
+CREATE OR REPLACE FUNCTION notify_inventory_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('inventory_changes', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER notify_change_on_inventory
+AFTER INSERT OR UPDATE OR DELETE ON inventory_items
+FOR EACH STATEMENT EXECUTE FUNCTION notify_inventory_change();
+
+CREATE TRIGGER notify_change_on_promotions
 AFTER INSERT OR UPDATE OR DELETE ON promotions
-FOR EACH STATEMENT EXECUTE FUNCTION update_dashboard_stats();
+FOR EACH STATEMENT EXECUTE FUNCTION notify_inventory_change();
 
-CREATE TRIGGER update_dashboard_on_promotion_items
+CREATE TRIGGER notify_change_on_promotion_items
 AFTER INSERT OR UPDATE OR DELETE ON promotion_items
-FOR EACH STATEMENT EXECUTE FUNCTION update_dashboard_stats();
+FOR EACH STATEMENT EXECUTE FUNCTION notify_inventory_change();
 
-CREATE TRIGGER update_dashboard_on_transfer
+CREATE TRIGGER notify_change_on_transfers
 AFTER INSERT OR UPDATE OR DELETE ON transfers
-FOR EACH STATEMENT EXECUTE FUNCTION update_dashboard_stats();
+FOR EACH STATEMENT EXECUTE FUNCTION notify_inventory_change();
+
+-- Background jobs run by the in-process scheduler (app/scheduler.py)
+-- One row per registered job. The API worker that claims a due row (FOR
+-- UPDATE SKIP LOCKED) moves next_run_at on and records the run in job_runs,
+-- so with several workers each scheduled run still happens once.
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    name VARCHAR(100) PRIMARY KEY,
+    schedule VARCHAR(100) NOT NULL, -- cron expression, UTC
+    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    next_run_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    run_requested_at TIMESTAMP WITH TIME ZONE, -- manual run pending
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
 
-CREATE TRIGGER update_dashboard_on_inventory
-AFTER INSERT OR UPDATE OR DELETE ON inventory_items
-FOR EACH STATEMENT EXECUTE FUNCTION update_dashboard_stats();
-
--- Initial initialization of dashboard stats (using a proper INSERT statement instead of calling the trigger function)
-INSERT INTO dashboard_stats (date, total_savings, active_promotions, transferred_products, products_on_alert)
-VALUES (
-    CURRENT_DATE,
-    (SELECT COALESCE(SUM(i.quantity * i.unit_price * (p.discount_percentage / 100)), 0)
-     FROM promotion_items pi
-     JOIN inventory_items i ON pi.inventory_item_id = i.id
-     JOIN promotions p ON pi.promotion_id = p.id
-     WHERE p.active = TRUE),
-    (SELECT COUNT(*) FROM promotions WHERE active = TRUE),
-    (SELECT COUNT(*) FROM transfers WHERE status = 'completed'),
-    (SELECT COUNT(*) FROM vw_products_on_alert)
-)
-ON CONFLICT (date) DO UPDATE
-SET 
-    total_savings = EXCLUDED.total_savings,
-    active_promotions = EXCLUDED.active_promotions,
-    transferred_products = EXCLUDED.transferred_products,
-    products_on_alert = EXCLUDED.products_on_alert,
-    updated_at = CURRENT_TIMESTAMP; 
\ No newline at end of file
+CREATE TABLE IF NOT EXISTS job_runs (
+    id BIGSERIAL PRIMARY KEY,
+    job_name VARCHAR(100) NOT NULL REFERENCES scheduled_jobs(name) ON DELETE CASCADE,
+    trigger VARCHAR(20) NOT NULL, -- schedule, manual
+    status VARCHAR(20) NOT NULL, -- running, succeeded, failed, abandoned
+    scheduled_for TIMESTAMP WITH TIME ZONE,
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    duration_seconds DOUBLE PRECISION,
+    worker VARCHAR(100),
+    result JSONB,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_runs_job_started
+    ON job_runs (job_name, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_job_runs_running
+    ON job_runs (job_name) WHERE status = 'running';
+
+-- Initial initialization of dashboard stats
+SELECT recompute_dashboard_stats();
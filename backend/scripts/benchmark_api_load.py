@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+"""
+Reproducible API load test against a freshly seeded database
+
+Creates a throwaway database, loads db/init.sql and seeds it with --rows
+inventory items (10k to 5M) generated deterministically in SQL. It then
+starts the API with uvicorn and a fake OpenAI-compatible LLM, and drives
+each workload in turn at a fixed number of parallel clients. Every workload
+reports throughput, p50/p95/p99 latency and errors.
+
+By default the database lives in a disposable local Postgres instance
+(pip install pgserver) that is deleted afterwards. With --database-url the
+harness creates the database on that server instead, dropping any previous
+benchmark database of the same name.
+
+Results are compared against the baseline stored for the same rows/clients
+profile. The run fails when a workload's p50 or p95 grows, or its
+throughput drops, by more than --tolerance. --save-baseline records the
+current results as the new baseline.
+
+Usage: python scripts/benchmark_api_load.py [--rows 100000] [--clients 16] [--duration 10] [--save-baseline]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import httpx
+import psycopg2
+import uvicorn
+from fastapi import FastAPI, Request
+from sqlalchemy.engine import make_url
+
+from benchmark_concurrency import percentile
+
+# Disposable Postgres without Docker; only needed without --database-url
+try:
+    import pgserver
+    PGSERVER_AVAILABLE = True
+except ImportError:
+    PGSERVER_AVAILABLE = False
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+# One line per request would drown the results
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+INIT_SQL = BACKEND_DIR / "db" / "init.sql"
+DEFAULT_BASELINES = Path(__file__).resolve().parent / "benchmark_baselines.json"
+
+BENCH_DATABASE = "smartshelf_bench"
+MIN_ROWS, MAX_ROWS = 10_000, 5_000_000
+SEED_BATCH_ROWS = 250_000
+SEED_STORES = 50
+SEED_CATEGORIES = 20
+SEED_PRODUCTS = 5_000
+
+class Workload(NamedTuple):
+    name: str
+    method: str
+    path: str
+    body: Optional[Dict[str, Any]] = None
+
+WORKLOADS = [
+    Workload("products", "GET", "/products?limit=100"),
+    Workload("product_alerts", "GET", "/product-alerts"),
+    Workload("dashboard", "GET", "/dashboard"),
+    Workload("recommendations_generate", "POST", "/recommendations/generate", {}),
+    Workload("chat", "POST", "/chat", {"message": "Quais produtos vencem esta semana?"}),
+]
+
+# Metrics compared against the baseline: (result key, higher is worse)
+BASELINE_METRICS = [("p50_ms", True), ("p95_ms", True), ("requests_per_second", False)]
+
+# Seed data is derived from the row number, so every run with the same
+# --rows produces the same inventory (relative to the current date)
+SEED_DIMENSIONS_SQL = f"""
+    INSERT INTO stores (name, location)
+    SELECT 'Bench Store ' || g, 'Benchmark'
+    FROM generate_series(1, {SEED_STORES}) g
+    ON CONFLICT DO NOTHING;
+
+    INSERT INTO categories (name, description)
+    SELECT 'Bench Category ' || g, 'Seeded by benchmark_api_load'
+    FROM generate_series(1, {SEED_CATEGORIES}) g
+    ON CONFLICT DO NOTHING;
+
+    INSERT INTO products (name, category_id, description)
+    SELECT 'Bench Product ' || g, c.ids[1 + g % array_length(c.ids, 1)], 'Seeded by benchmark_api_load'
+    FROM generate_series(1, {SEED_PRODUCTS}) g,
+        (SELECT array_agg(id ORDER BY id) AS ids FROM categories) c;
+"""
+
+SEED_INVENTORY_SQL = """
+    INSERT INTO inventory_items (product_id, store_id, quantity, expiration_date, batch_number, unit_price)
+    SELECT
+        p.ids[CAST(1 + (g * 7919) %% array_length(p.ids, 1) AS INTEGER)],
+        s.ids[CAST(1 + (g * 104729) %% array_length(s.ids, 1) AS INTEGER)],
+        1 + (g * 31) %% 90,
+        CURRENT_DATE + CAST((g * 37) %% 730 - 5 AS INTEGER),
+        'BENCH-' || g,
+        round(((g * 13) %% 50000) / 100.0 + 1, 2)
+    FROM generate_series(CAST(%(start)s AS BIGINT), %(end)s) g,
+        (SELECT array_agg(id ORDER BY id) AS ids FROM products) p,
+        (SELECT array_agg(id ORDER BY id) AS ids FROM stores) s
+"""
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def create_database(server_url: str) -> str:
+    """(Re)create the benchmark database on the server and return its URL"""
+    admin_url = make_url(server_url).set(database="postgres")
+    connection = psycopg2.connect(admin_url.set(drivername="postgresql").render_as_string(hide_password=False))
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DATABASE} WITH (FORCE)")
+        cursor.execute(f"CREATE DATABASE {BENCH_DATABASE} ENCODING 'UTF8' TEMPLATE template0")
+    connection.close()
+    return make_url(server_url).set(database=BENCH_DATABASE).render_as_string(hide_password=False)
+
+def seed_database(database_url: str, rows: int) -> None:
+    """Load the schema and insert `rows` deterministic inventory items"""
+    connection = psycopg2.connect(database_url)
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        schema = INIT_SQL.read_text()
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'uuid-ossp'")
+        if cursor.fetchone() is None:
+            # Not bundled with pgserver, and nothing in the schema uses it
+            schema = schema.replace('CREATE EXTENSION IF NOT EXISTS "uuid-ossp";', "")
+        cursor.execute(schema)
+        cursor.execute(SEED_DIMENSIONS_SQL)
+
+        start_time = time.perf_counter()
+        # Through the same triggers as production writes, so a slow write
+        # path shows up here as slow seeding
+        for start in range(1, rows + 1, SEED_BATCH_ROWS):
+            end = min(start + SEED_BATCH_ROWS - 1, rows)
+            cursor.execute(SEED_INVENTORY_SQL, {"start": start, "end": end})
+            logger.info(f"Seeded {end:,}/{rows:,} inventory items")
+        cursor.execute("ANALYZE")
+        logger.info(f"Seeding took {time.perf_counter() - start_time:.1f}s")
+    connection.close()
+
+def create_fake_llm_app(latency: float) -> FastAPI:
+    """
+    OpenAI-compatible chat completions endpoint
+
+    The first call of a chat asks for the get_inventory_summary tool, the
+    follow-up with the tool result gets a short answer, each after `latency`.
+    """
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        wants_tool = body.get("tools") and not any(m.get("role") == "tool" for m in body["messages"])
+        if wants_tool:
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": "call_bench",
+                    "type": "function",
+                    "function": {"name": "get_inventory_summary", "arguments": "{}"}
+                }]
+            }
+            finish_reason = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": "Resumo do estoque gerado para o benchmark."}
+            finish_reason = "stop"
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}
+        }
+
+    return app
+
+def start_fake_llm(port: int, latency: float) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(
+        create_fake_llm_app(latency), host="127.0.0.1", port=port, log_level="warning"
+    ))
+    threading.Thread(target=server.run, name="fake-llm", daemon=True).start()
+    return server
+
+def start_api(database_url: str, port: int, workers: int, llm_url: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        OPENAI_API_KEY="benchmark",
+        OPENAI_BASE_URL=llm_url,
+        # Pure API latency: no response compression in the numbers
+        COMPRESSION_MINIMUM_SIZE=str(2 ** 62),
+    )
+    env.pop("ASYNC_DATABASE_URL", None)
+    env.pop("DATABASE_REPLICA_URLS", None)
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+def stop_api(process: subprocess.Popen) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+async def wait_until_ready(base_url: str, timeout: float = 120) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    # Let the dashboard refresher take its first snapshot
+                    await asyncio.sleep(2)
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"API at {base_url} did not become ready within {timeout}s")
+
+async def client_loop(
+    client: httpx.AsyncClient,
+    workload: Workload,
+    deadline: float,
+    latencies: List[float],
+    errors: Dict[str, int]
+) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.request(workload.method, workload.path, json=workload.body)
+            if response.status_code >= 400:
+                errors[str(response.status_code)] += 1
+                continue
+        except httpx.HTTPError as e:
+            errors[type(e).__name__] += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+async def run_workload(base_url: str, workload: Workload, clients: int, warmup: float, duration: float) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for phase_seconds, measured in ((warmup, False), (duration, True)):
+            latencies: List[float] = []
+            errors: Dict[str, int] = defaultdict(int)
+            deadline = time.perf_counter() + phase_seconds
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                client_loop(client, workload, deadline, latencies, errors) for _ in range(clients)
+            ))
+            elapsed = time.perf_counter() - started
+
+    result = {
+        "requests": len(latencies),
+        "errors": dict(errors),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+    }
+    if latencies:
+        result.update({
+            "p50_ms": round(statistics.median(latencies) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        })
+    return result
+
+def print_results(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'workload':<26} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, result in results.items():
+        print(
+            f"{name:<26} {result['requests_per_second']:>9.1f} "
+            f"{result.get('p50_ms', float('nan')):>9.1f} "
+            f"{result.get('p95_ms', float('nan')):>9.1f} "
+            f"{result.get('p99_ms', float('nan')):>9.1f} "
+            f"{sum(result['errors'].values()):>7}"
+        )
+
+def compare_to_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (e.g. 0.25 = 25%) as readable lines"""
+    regressions = []
+    for name, expected in baseline.items():
+        actual = results.get(name)
+        if actual is None:
+            continue
+        if actual["errors"]:
+            regressions.append(f"{name}: {sum(actual['errors'].values())} failed requests")
+        for metric, higher_is_worse in BASELINE_METRICS:
+            if metric not in expected or metric not in actual:
+                continue
+            limit = expected[metric] * (1 + tolerance if higher_is_worse else 1 - tolerance)
+            if (actual[metric] > limit) if higher_is_worse else (actual[metric] < limit):
+                regressions.append(
+                    f"{name}: {metric} {actual[metric]} vs baseline {expected[metric]} (limit {limit:.1f})"
+                )
+    return regressions
+
+async def run_benchmark(args: argparse.Namespace, database_url: str) -> Dict[str, Dict[str, Any]]:
+    api_port, llm_port = free_port(), free_port()
+    base_url = f"http://127.0.0.1:{api_port}"
+    llm_server = start_fake_llm(llm_port, args.llm_latency)
+    api = start_api(database_url, api_port, args.workers, f"http://127.0.0.1:{llm_port}/v1")
+    try:
+        await wait_until_ready(base_url)
+        results = {}
+        for workload in WORKLOADS:
+            if args.workloads and workload.name not in args.workloads:
+                continue
+            logger.info(f"Running {workload.name}: {args.clients} clients for {args.duration}s")
+            results[workload.name] = await run_workload(
+                base_url, workload, args.clients, args.warmup, args.duration
+            )
+        return results
+    finally:
+        stop_api(api)
+        llm_server.should_exit = True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help=f"inventory items to seed ({MIN_ROWS:,} to {MAX_ROWS:,})")
+    parser.add_argument("--clients", type=int, default=16, help="parallel clients per workload")
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per workload")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before each workload")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds the fake LLM takes per call")
+    parser.add_argument("--workload", action="append", dest="workloads", choices=[w.name for w in WORKLOADS],
+                        help="workload to run (repeatable, default all)")
+    parser.add_argument("--database-url", help="Postgres server to create the benchmark database on (default: disposable pgserver instance)")
+    parser.add_argument("--baselines", type=Path, default=DEFAULT_BASELINES)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression vs. baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    if not MIN_ROWS <= args.rows <= MAX_ROWS:
+        parser.error(f"--rows must be between {MIN_ROWS:,} and {MAX_ROWS:,}")
+
+    with tempfile.TemporaryDirectory(prefix="smartshelf-bench-") as pgdata:
+        if args.database_url:
+            server_url = args.database_url
+        elif PGSERVER_AVAILABLE:
+            server_url = pgserver.get_server(pgdata, cleanup_mode="delete").get_uri()
+        else:
+            logger.error("pgserver is not installed (pip install pgserver); pass --database-url instead")
+            return 2
+
+        database_url = create_database(server_url)
+        logger.info(f"Seeding {args.rows:,} inventory items into {BENCH_DATABASE}")
+        seed_database(database_url, args.rows)
+        results = asyncio.run(run_benchmark(args, database_url))
+
+    print_results(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    profile = f"rows={args.rows},clients={args.clients},workers={args.workers}"
+    baselines = json.loads(args.baselines.read_text()) if args.baselines.exists() else {}
+    if args.save_baseline:
+        baselines[profile] = results
+        args.baselines.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        logger.info(f"Saved baseline for {profile} to {args.baselines}")
+        return 0
+
+    if profile not in baselines:
+        logger.warning(f"No baseline for {profile} in {args.baselines}; run with --save-baseline to record one")
+        return 1 if any(result["errors"] for result in results.values()) else 0
+
+    regressions = compare_to_baseline(results, baselines[profile], args.tolerance)
+    for regression in regressions:
+        logger.error(f"Regression: {regression}")
+    if not regressions:
+        logger.info(f"No regressions against the {profile} baseline")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Measure API throughput and latency under many parallel clients
+
+Each client loops over the given endpoints for the duration of the run,
+waiting for a response before sending its next request. Point it at a
+running server, e.g. `uvicorn app.main:app --workers 1`.
+
+Usage: python scripts/benchmark_concurrency.py --base-url http://localhost:8000 [--clients 128] [--duration 20]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENDPOINTS = [
+    "/products?limit=100",
+    "/product-alerts",
+    "/dashboard",
+    "/recommendations",
+]
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def client_loop(
+    client: httpx.AsyncClient,
+    endpoints: List[str],
+    deadline: float,
+    offset: int,
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int]
+) -> None:
+    i = offset
+    while time.perf_counter() < deadline:
+        path = endpoints[i % len(endpoints)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors[path] += 1
+                continue
+        except httpx.HTTPError:
+            errors[path] += 1
+            continue
+        latencies[path].append(time.perf_counter() - start)
+
+async def run(base_url: str, endpoints: List[str], clients: int, duration: float) -> int:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, endpoints, deadline, n, latencies, errors) for n in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    print(f"{'endpoint':<32} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    total = 0
+    for path in endpoints:
+        samples = latencies[path]
+        total += len(samples)
+        if not samples:
+            print(f"{path:<32} {0:>9.1f} {'-':>9} {'-':>9} {'-':>9} {errors[path]:>7}")
+            continue
+        print(
+            f"{path:<32} {len(samples) / elapsed:>9.1f} "
+            f"{statistics.median(samples) * 1000:>9.1f} "
+            f"{percentile(samples, 95) * 1000:>9.1f} "
+            f"{percentile(samples, 99) * 1000:>9.1f} "
+            f"{errors[path]:>7}"
+        )
+    print(f"{'total':<32} {total / elapsed:>9.1f}")
+    return 1 if sum(errors.values()) else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=128, help="parallel clients")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to run")
+    parser.add_argument("--endpoint", action="append", dest="endpoints", help="path to request (repeatable)")
+    args = parser.parse_args()
+
+    endpoints = args.endpoints or DEFAULT_ENDPOINTS
+    logger.info(f"Running {args.clients} clients for {args.duration}s against {args.base_url}")
+    return asyncio.run(run(args.base_url, endpoints, args.clients, args.duration))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Benchmark the inventory detail read path used by GET /products
+
+Times query plus serialization end to end against the configured database
+for the previous path (select InventoryItem, Product, Category and Store
+entities, copy them into a nested dict, validate against InventoryItemDetail
+and encode) and the column projection path (the /products projection query
+returning plain tuples, encoded by the precompiled RowSerializer). Both read
+the same rows in the same order, and their JSON is checked to be equal.
+
+The synthetic inventory is loaded inside a single transaction that is always
+rolled back, so nothing is left behind.
+
+Usage: DATABASE_URL=postgresql://... python scripts/benchmark_inventory_serialization.py [--sizes 10000 100000]
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+# Add the backend directory to the path so we can import the app package
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from pydantic import TypeAdapter
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.models.db_models import (
+    Product as DBProduct,
+    Category as DBCategory,
+    Store as DBStore,
+    InventoryItem as DBInventoryItem
+)
+from app.models.schemas import InventoryItemDetail
+from app.routers.products import _build_products_query, inventory_detail_serializer
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+SEED_QUERY = text("""
+    INSERT INTO inventory_items (product_id, store_id, quantity, expiration_date, purchase_date, batch_number, unit_price)
+    SELECT
+        p.ids[1 + (g % array_length(p.ids, 1))],
+        s.ids[1 + ((g / 7) % array_length(s.ids, 1))],
+        1 + (g % 50),
+        CURRENT_DATE + ((g::bigint * 7919) % 730 - 10)::int,
+        CURRENT_DATE - 30,
+        'LOTE-' || g,
+        ROUND((5 + (g % 495))::numeric, 2)
+    FROM
+        generate_series(1, :rows) AS g,
+        (SELECT array_agg(id) AS ids FROM products) p,
+        (SELECT array_agg(id) AS ids FROM stores) s
+""")
+
+def orm_path(conn, size: int, adapter: TypeAdapter) -> bytes:
+    """Previous path: ORM entities -> nested dict -> Pydantic -> JSON"""
+    with Session(bind=conn) as session:
+        results = (
+            session.query(
+                DBInventoryItem,
+                DBProduct,
+                DBCategory,
+                DBStore,
+                (func.current_date() - DBInventoryItem.expiration_date).label("days_until_expiry")
+            )
+            .join(DBProduct, DBInventoryItem.product_id == DBProduct.id)
+            .join(DBCategory, DBProduct.category_id == DBCategory.id)
+            .join(DBStore, DBInventoryItem.store_id == DBStore.id)
+            .order_by(DBInventoryItem.expiration_date.asc(), DBInventoryItem.id.asc())
+            .limit(size)
+            .all()
+        )
+
+        details = []
+        for item, product, category, store, days in results:
+            details.append({
+                "id": item.id,
+                "product_id": product.id,
+                "store_id": store.id,
+                "quantity": item.quantity,
+                "expiration_date": item.expiration_date,
+                "manufacturing_date": item.manufacturing_date,
+                "purchase_date": item.purchase_date,
+                "batch_number": item.batch_number,
+                "unit_price": item.unit_price,
+                "created_at": item.created_at,
+                "updated_at": item.updated_at,
+                "product": {
+                    "id": product.id,
+                    "name": product.name,
+                    "category_id": category.id,
+                    "description": product.description,
+                    "created_at": product.created_at,
+                    "updated_at": product.updated_at,
+                    "category": {
+                        "id": category.id,
+                        "name": category.name,
+                        "description": category.description,
+                        "created_at": category.created_at,
+                        "updated_at": category.updated_at
+                    }
+                },
+                "store": {
+                    "id": store.id,
+                    "name": store.name,
+                    "location": store.location,
+                    "created_at": store.created_at,
+                    "updated_at": store.updated_at
+                },
+                "days_until_expiry": days
+            })
+    # Mirrors FastAPI's response_model handling followed by JSONResponse
+    validated = adapter.validate_python(details)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+def projection_path(conn, size: int) -> bytes:
+    """New path: projection query -> plain tuples -> precompiled serializer"""
+    rows = conn.execute(_build_products_query().limit(size)).all()
+    return inventory_detail_serializer.dumps_many(rows)
+
+def timed(function, *args) -> Tuple[float, bytes]:
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def run(sizes: List[int]) -> None:
+    adapter = TypeAdapter(List[InventoryItemDetail])
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            logger.info(f"Loading {max(sizes):,} synthetic inventory rows (rolled back at exit)")
+            conn.execute(SEED_QUERY, {"rows": max(sizes)})
+            conn.execute(text("ANALYZE inventory_items"))
+
+            print(f"{'rows':>10} {'before rows/s':>15} {'after rows/s':>15} {'speedup':>9}")
+            for size in sizes:
+                before, before_json = timed(orm_path, conn, size, adapter)
+                after, after_json = timed(projection_path, conn, size)
+                if json.loads(before_json) != json.loads(after_json):
+                    raise RuntimeError(f"The two paths returned different JSON for {size} rows")
+                print(f"{size:>10} {size / before:>15,.0f} {size / after:>15,.0f} {before / after:>8.1f}x")
+        finally:
+            transaction.rollback()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    args = parser.parse_args()
+
+    logger.info(f"Benchmarking the inventory detail read path (query + serialization) for sizes: {args.sizes}")
+    run(args.sizes)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Benchmark JSON encoding and compression of the inventory and alert payloads
+
+Compares the previous encoders (the json module for GET /products, FastAPI's
+jsonable_encoder + json for the alert endpoints) with dumps_json, then times
+gzip and brotli on the encoded inventory payload at the levels the
+compression middleware uses.
+
+Usage: python scripts/benchmark_json_encoding.py [--sizes 10000 100000]
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, List
+
+# Add the backend directory to the path so we can import the app package
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.compression import BROTLI_AVAILABLE, BROTLI_QUALITY, GZIP_LEVEL
+from app.routers.products import inventory_detail_serializer
+from app.serialization import ORJSON_AVAILABLE, dumps_json, dumps_json_stdlib
+from benchmark_inventory_serialization import generate_rows
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+def timed(function: Callable, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def alert_payload(rows: List[tuple]) -> List[dict]:
+    """Alert dicts shaped like AlertEngine.get_alerts() output"""
+    return [
+        {
+            "product": {
+                "id": row[0],
+                "product_id": row[1],
+                "name": row[12],
+                "category": row[18],
+                "store": row[23],
+                "quantity": row[3],
+                "expiration_date": row[4].isoformat(),
+                "days_until_expiry": -row[27]
+            },
+            "alert_level": "high",
+            "recommended_action": "Aplicar desconto de 30% ou transferir para loja com maior demanda"
+        }
+        for row in rows
+    ]
+
+def run(sizes: List[int]) -> None:
+    print(f"{'payload':<22} {'rows':>9} {'before ms':>10} {'after ms':>10} {'speedup':>8} {'MB':>7}")
+    for size in sizes:
+        rows = generate_rows(size)
+        details = [inventory_detail_serializer.to_dict(row) for row in rows]
+
+        before_body, before = timed(dumps_json_stdlib, details)
+        after_body, after = timed(dumps_json, details)
+        assert json.loads(before_body) == json.loads(after_body)
+        print(
+            f"{'inventory detail':<22} {size:>9} {before * 1000:>10.1f} {after * 1000:>10.1f} "
+            f"{before / after:>7.1f}x {len(after_body) / 1e6:>7.1f}"
+        )
+
+        alerts = alert_payload(rows)
+        _, before = timed(lambda a: json.dumps(jsonable_encoder(a)).encode(), alerts)
+        alerts_body, after = timed(dumps_json, alerts)
+        print(
+            f"{'alerts':<22} {size:>9} {before * 1000:>10.1f} {after * 1000:>10.1f} "
+            f"{before / after:>7.1f}x {len(alerts_body) / 1e6:>7.1f}"
+        )
+
+        compressed, seconds = timed(
+            lambda body: zlib.compress(body, GZIP_LEVEL), after_body
+        )
+        print(
+            f"  gzip level {GZIP_LEVEL}: {seconds * 1000:.1f} ms, "
+            f"{len(after_body) / 1e6:.1f} MB -> {len(compressed) / 1e6:.2f} MB"
+        )
+        if BROTLI_AVAILABLE:
+            import brotli
+            compressed, seconds = timed(
+                lambda body: brotli.compress(body, quality=BROTLI_QUALITY), after_body
+            )
+            print(
+                f"  brotli quality {BROTLI_QUALITY}: {seconds * 1000:.1f} ms, "
+                f"{len(after_body) / 1e6:.1f} MB -> {len(compressed) / 1e6:.2f} MB"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    args = parser.parse_args()
+
+    if not ORJSON_AVAILABLE:
+        logger.warning("orjson is not installed, so dumps_json falls back to the json module")
+    logger.info(f"Benchmarking JSON encoding for sizes: {args.sizes}")
+    run(args.sizes)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
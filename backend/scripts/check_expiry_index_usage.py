@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Check that the expiry queries are served by index range scans
+
+Inside a single transaction that is always rolled back, the script loads
+a multi-million-row synthetic inventory into inventory_items (the triggers
+fill inventory_expiry_buckets), refreshes the planner statistics and runs
+EXPLAIN on:
+
+- the alert query used by /products/alerts and /product-alerts, which reads
+  inventory_expiry_buckets through idx_inventory_expiry_buckets_expiration
+- the expiring-items query of bulk recommendation generation, which filters
+  inventory_items on expiration_date directly like POST
+  /recommendations/generate does; the inventory_items expiry indexes now
+  only serve these direct queries, so this is what they are checked against
+
+and fails unless each reads the expiry rows through one of the expiry
+indexes with a range index condition.
+
+Usage: DATABASE_URL=postgresql://... python scripts/check_expiry_index_usage.py [--rows 3000000]
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+# Add the backend directory to the path so we can import the app package
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.models.alert_engine import ALERTS_QUERY
+from app.models.recommendation_generator import EXPIRING_ITEMS_PER_PAIR, RANKED_EXPIRING_QUERY
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+EXPIRY_INDEXES = {
+    "idx_inventory_items_expiration_date",
+    "idx_inventory_items_store_expiration",
+    "idx_inventory_expiry_buckets_expiration",
+}
+INDEX_SCAN_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+SEED_QUERY = text("""
+    INSERT INTO inventory_items (product_id, store_id, quantity, expiration_date, unit_price)
+    SELECT
+        p.ids[1 + (g % array_length(p.ids, 1))],
+        s.ids[1 + ((g / 7) % array_length(s.ids, 1))],
+        1 + (g % 50),
+        CURRENT_DATE + ((g::bigint * 7919) % 730 - 10)::int,
+        ROUND((5 + (g % 495))::numeric, 2)
+    FROM
+        generate_series(1, :rows) AS g,
+        (SELECT array_agg(id) AS ids FROM products) p,
+        (SELECT array_agg(id) AS ids FROM stores) s
+""")
+
+def walk_plan(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree"""
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+def expiry_range_scans(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return plan nodes that range-scan an expiry index"""
+    return [
+        node for node in walk_plan(plan)
+        if node.get("Node Type") in INDEX_SCAN_NODES
+        and node.get("Index Name") in EXPIRY_INDEXES
+        and "expiration_date" in node.get("Index Cond", "")
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=3_000_000, help="synthetic inventory rows to load")
+    parser.add_argument("--threshold", type=int, default=15, help="alert threshold in days")
+    args = parser.parse_args()
+
+    checked_queries = [
+        ("Alert query", ALERTS_QUERY, {"threshold": args.threshold}),
+        ("Expiring items query", RANKED_EXPIRING_QUERY, {
+            "horizon_days": args.threshold, "items_per_pair": EXPIRING_ITEMS_PER_PAIR
+        }),
+    ]
+
+    plans = {}
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            logger.info(f"Loading {args.rows:,} synthetic inventory rows (rolled back at exit)")
+            conn.execute(SEED_QUERY, {"rows": args.rows})
+            conn.execute(text("ANALYZE inventory_items"))
+            conn.execute(text("ANALYZE inventory_expiry_buckets"))
+
+            for name, query, params in checked_queries:
+                explain = text("EXPLAIN (FORMAT JSON) " + query.text)
+                plan_json = conn.execute(explain, params).scalar()
+                if isinstance(plan_json, str):
+                    plan_json = json.loads(plan_json)
+                plans[name] = plan_json[0]["Plan"]
+        finally:
+            transaction.rollback()
+
+    failed = False
+    for name, plan in plans.items():
+        scans = expiry_range_scans(plan)
+        if not scans:
+            logger.error(f"{name} does not use an expiry index range scan")
+            print(json.dumps(plan, indent=2))
+            failed = True
+            continue
+
+        for node in scans:
+            logger.info(f"{name}: {node['Node Type']} using {node['Index Name']}: {node['Index Cond']}")
+    if failed:
+        return 1
+    logger.info("All expiry queries use an expiry index range scan")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
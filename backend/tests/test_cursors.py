@@ -0,0 +1,65 @@
+import base64
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers import products, recommendations
+
+
+@pytest.mark.parametrize(
+    ("expiration_date", "item_id"),
+    [(date(2026, 10, 17), 1), (date(1999, 1, 1), 0), (date(2030, 12, 31), 2_147_483_647)],
+)
+def test_products_cursor_round_trip(expiration_date, item_id):
+    cursor = products._encode_cursor(expiration_date, item_id)
+    assert products._decode_cursor(cursor) == (expiration_date, item_id)
+
+
+@pytest.mark.parametrize(
+    ("created_at", "recommendation_id"),
+    [
+        (datetime(2026, 10, 17, 3, 4, 5, 123456), 42),
+        (datetime(2026, 10, 17, 3, 4, 5, tzinfo=timezone.utc), 1),
+        (datetime(2026, 1, 1), 2_147_483_647),
+    ],
+)
+def test_recommendations_cursor_round_trip(created_at, recommendation_id):
+    cursor = recommendations._encode_cursor(created_at, recommendation_id)
+    assert recommendations._decode_cursor(cursor) == (created_at, recommendation_id)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        products._encode_cursor(date(2026, 10, 17), 7),
+        recommendations._encode_cursor(datetime(2026, 10, 17, 3, 4, 5, 123456), 7),
+    ],
+)
+def test_cursors_are_url_safe(cursor):
+    assert "=" not in cursor
+    assert all(character.isalnum() or character in "-_" for character in cursor)
+
+
+def _encode(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("decode", [products._decode_cursor, recommendations._decode_cursor])
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "!!!",
+        "a",
+        _encode("2026-10-17"),
+        _encode("2026-10-17|"),
+        _encode("not-a-date|1"),
+        _encode("2026-10-17|one"),
+        base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),
+    ],
+)
+def test_invalid_cursors_are_rejected(decode, cursor):
+    with pytest.raises(HTTPException) as error:
+        decode(cursor)
+    assert error.value.status_code == 400
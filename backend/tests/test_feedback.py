@@ -0,0 +1,71 @@
+import asyncio
+
+from app.models.feedback import FeedbackIngestor
+
+
+class SlowWrites:
+    """Stands in for FeedbackIngestor._write, taking `delay` seconds per batch"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.batches = []
+        self.started = asyncio.Event()
+
+    async def __call__(self, batch):
+        self.started.set()
+        await asyncio.sleep(self.delay)
+        self.batches.append([recommendation_id for recommendation_id, _, _ in batch])
+        return {recommendation_id for recommendation_id, _, _ in batch if recommendation_id < 0}
+
+
+def test_stop_lets_the_write_in_progress_finish():
+    async def scenario():
+        ingestor = FeedbackIngestor(flush_interval_ms=1)
+        writes = SlowWrites(0.05)
+        ingestor._write = writes
+        ingestor.start()
+
+        first = asyncio.create_task(ingestor.submit([(1, True), (-2, False)]))
+        await writes.started.wait()
+        # Arrives while the first batch is being written
+        second = asyncio.create_task(ingestor.submit([(3, True)]))
+        await asyncio.sleep(0)
+        await ingestor.stop()
+
+        results = await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+        return results, writes.batches
+
+    (first, second), batches = asyncio.run(scenario())
+    assert first == {-2}
+    assert second == set()
+    assert batches == [[1, -2], [3]]
+
+
+def test_cancelled_write_keeps_the_batch_and_its_waiters():
+    async def scenario():
+        ingestor = FeedbackIngestor(flush_interval_ms=1)
+        writes = SlowWrites(10)
+        ingestor._write = writes
+        ingestor.start()
+
+        first = asyncio.create_task(ingestor.submit([(1, True)]))
+        await writes.started.wait()
+        second = asyncio.create_task(ingestor.submit([(-2, False)]))
+        await asyncio.sleep(0)
+
+        # e.g. the loop tearing the flusher down mid-write
+        ingestor._task.cancel()
+        await asyncio.gather(ingestor._task, return_exceptions=True)
+        pending = [recommendation_id for recommendation_id, _, _ in ingestor._pending]
+
+        writes.delay = 0
+        ingestor._task = None
+        await ingestor._flush()
+        results = await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+        return pending, results, writes.batches
+
+    pending, (first, second), batches = asyncio.run(scenario())
+    assert pending == [1, -2]
+    assert first == set()
+    assert second == {-2}
+    assert batches == [[1, -2]]
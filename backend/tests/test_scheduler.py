@@ -0,0 +1,179 @@
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.scheduler import CronSchedule, classify_claim
+
+
+def utc(*args: int) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    ("expression", "minutes", "hours", "days", "months", "weekdays"),
+    [
+        ("* * * * *", set(range(60)), set(range(24)), set(range(1, 32)), set(range(1, 13)), set(range(7))),
+        ("0 0 1 1 0", {0}, {0}, {1}, {1}, {0}),
+        ("59 23 31 12 6", {59}, {23}, {31}, {12}, {6}),
+        ("*/15 */6 */10 */3 */2", {0, 15, 30, 45}, {0, 6, 12, 18}, {1, 11, 21, 31}, {1, 4, 7, 10}, {0, 2, 4, 6}),
+        ("10-20/5 9-17/4 1-3 6-8 1-5", {10, 15, 20}, {9, 13, 17}, {1, 2, 3}, {6, 7, 8}, {1, 2, 3, 4, 5}),
+        ("5/20 3/10 * * *", {5, 25, 45}, {3, 13, 23}, set(range(1, 32)), set(range(1, 13)), set(range(7))),
+        ("0,30 8,12-14 1,15 1,7 1,3-4", {0, 30}, {8, 12, 13, 14}, {1, 15}, {1, 7}, {1, 3, 4}),
+        ("0 0 * * 7", {0}, {0}, set(range(1, 32)), set(range(1, 13)), {0}),
+        ("0 0 * * 5-7", {0}, {0}, set(range(1, 32)), set(range(1, 13)), {5, 6, 0}),
+    ],
+)
+def test_parses_fields(expression, minutes, hours, days, months, weekdays):
+    schedule = CronSchedule(expression)
+    assert schedule.minutes == minutes
+    assert schedule.hours == hours
+    assert schedule.days == days
+    assert schedule.months == months
+    assert schedule.weekdays == weekdays
+
+
+@pytest.mark.parametrize(
+    ("alias", "expression"),
+    [("@hourly", "0 * * * *"), ("@daily", "0 0 * * *"), ("@weekly", "0 0 * * 0"), ("@monthly", "0 0 1 * *")],
+)
+def test_aliases(alias, expression):
+    moment = utc(2026, 10, 17, 12, 34)
+    assert CronSchedule(alias).next_after(moment) == CronSchedule(expression).next_after(moment)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "60 * * * *",
+        "* 24 * * *",
+        "* * 0 * *",
+        "* * 32 * *",
+        "* * * 0 *",
+        "* * * 13 *",
+        "* * * * 8",
+        "20-10 * * * *",
+        "*/0 * * * *",
+        "a * * * *",
+        "* * * *",
+        "* * * * * *",
+        "",
+    ],
+)
+def test_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError, match="[Ii]nvalid|needs 5 fields"):
+        CronSchedule(expression)
+
+
+def test_rejects_schedules_that_never_fire():
+    with pytest.raises(ValueError, match="never fires"):
+        CronSchedule("0 0 30 2 *").next_after(utc(2026, 1, 1))
+
+
+@pytest.mark.parametrize(
+    ("expression", "moment", "expected"),
+    [
+        # Strictly after, with seconds dropped
+        ("* * * * *", utc(2026, 10, 17, 12, 0), utc(2026, 10, 17, 12, 1)),
+        ("* * * * *", utc(2026, 10, 17, 12, 0, 59, 999999), utc(2026, 10, 17, 12, 1)),
+        ("30 12 * * *", utc(2026, 10, 17, 12, 30), utc(2026, 10, 18, 12, 30)),
+        ("30 12 * * *", utc(2026, 10, 17, 12, 29, 30), utc(2026, 10, 17, 12, 30)),
+        # Steps and lists
+        ("*/15 * * * *", utc(2026, 10, 17, 10, 7), utc(2026, 10, 17, 10, 15)),
+        ("*/15 * * * *", utc(2026, 10, 17, 10, 45), utc(2026, 10, 17, 11, 0)),
+        ("5,35 * * * *", utc(2026, 10, 17, 10, 35), utc(2026, 10, 17, 11, 5)),
+        ("0 9-17/4 * * *", utc(2026, 10, 17, 9, 0), utc(2026, 10, 17, 13, 0)),
+        ("0 9-17/4 * * *", utc(2026, 10, 17, 17, 0), utc(2026, 10, 18, 9, 0)),
+        # Hour, day and month rollover
+        ("0 * * * *", utc(2026, 10, 17, 23, 30), utc(2026, 10, 18, 0, 0)),
+        ("0 0 1 * *", utc(2026, 1, 31, 12, 0), utc(2026, 2, 1, 0, 0)),
+        ("0 0 31 * *", utc(2026, 4, 1), utc(2026, 5, 31)),
+        ("0 0 31 * *", utc(2026, 1, 31, 0, 0), utc(2026, 3, 31)),
+        ("59 23 31 12 *", utc(2026, 12, 31, 23, 59), utc(2027, 12, 31, 23, 59)),
+        ("0 0 1 1 *", utc(2026, 12, 31, 23, 59), utc(2027, 1, 1)),
+        ("0 0 * 2 *", utc(2026, 10, 17), utc(2027, 2, 1)),
+        ("0 0 29 2 *", utc(2026, 3, 1), utc(2028, 2, 29)),
+        # Day of week; 2026-10-17 is a Saturday, 0 and 7 are Sunday
+        ("0 0 * * 0", utc(2026, 10, 17, 12, 0), utc(2026, 10, 18)),
+        ("0 0 * * 7", utc(2026, 10, 17, 12, 0), utc(2026, 10, 18)),
+        ("0 8 * * 1-5", utc(2026, 10, 16, 8, 0), utc(2026, 10, 19, 8, 0)),
+        ("0 0 * 11 1", utc(2026, 10, 17), utc(2026, 11, 2)),
+    ],
+)
+def test_next_after(expression, moment, expected):
+    assert CronSchedule(expression).next_after(moment) == expected
+
+
+@pytest.mark.parametrize(
+    ("expression", "moment", "expected"),
+    [
+        # Only one day field restricted: it alone decides
+        ("0 0 13 * *", utc(2026, 10, 17), utc(2026, 11, 13)),
+        ("0 0 * * 5", utc(2026, 10, 17), utc(2026, 10, 23)),
+        # Both restricted: a day matching either fires (13th or any Friday)
+        ("0 0 13 * 5", utc(2026, 10, 17), utc(2026, 10, 23)),
+        ("0 0 13 * 5", utc(2026, 11, 7), utc(2026, 11, 13)),
+        ("0 0 13 * 5", utc(2026, 11, 13), utc(2026, 11, 20)),
+        ("0 0 1 * 1", utc(2026, 10, 27), utc(2026, 11, 1)),
+        # ...within the allowed months only
+        ("0 0 13 2 5", utc(2026, 3, 1), utc(2027, 2, 5)),
+    ],
+)
+def test_day_of_month_and_day_of_week(expression, moment, expected):
+    assert CronSchedule(expression).next_after(moment) == expected
+
+
+def test_next_after_converts_to_utc():
+    sao_paulo = timezone(timedelta(hours=-3))
+    moment = datetime(2026, 10, 17, 22, 10, tzinfo=sao_paulo)
+    next_run = CronSchedule("0 2 * * *").next_after(moment)
+    assert next_run == utc(2026, 10, 18, 2, 0)
+    assert next_run.tzinfo == timezone.utc
+
+
+def test_consecutive_runs():
+    schedule = CronSchedule("*/5 * * * *")
+    moment = utc(2026, 10, 17, 23, 50)
+    runs = []
+    for _ in range(4):
+        moment = schedule.next_after(moment)
+        runs.append(moment)
+    assert runs == [
+        utc(2026, 10, 17, 23, 55),
+        utc(2026, 10, 18, 0, 0),
+        utc(2026, 10, 18, 0, 5),
+        utc(2026, 10, 18, 0, 10),
+    ]
+
+
+JobRow = namedtuple("JobRow", "enabled next_run_at run_requested_at")
+
+
+@pytest.mark.parametrize(
+    ("row", "expected"),
+    [
+        # Due by schedule
+        (
+            JobRow(True, utc(2026, 10, 17, 12, 0), None),
+            ("schedule", utc(2026, 10, 17, 12, 0), utc(2026, 10, 17, 13, 0)),
+        ),
+        # Requested before its time
+        (
+            JobRow(True, utc(2026, 10, 17, 13, 0), utc(2026, 10, 17, 12, 20)),
+            ("manual", utc(2026, 10, 17, 12, 20), utc(2026, 10, 17, 13, 0)),
+        ),
+        # Requested and due: manual, and the scheduled run it covers moves on
+        (
+            JobRow(True, utc(2026, 10, 17, 12, 0), utc(2026, 10, 17, 12, 20)),
+            ("manual", utc(2026, 10, 17, 12, 20), utc(2026, 10, 17, 13, 0)),
+        ),
+        # Requested while disabled, with a next_run_at long past
+        (
+            JobRow(False, utc(2026, 10, 1, 0, 0), utc(2026, 10, 17, 12, 20)),
+            ("manual", utc(2026, 10, 17, 12, 20), utc(2026, 10, 1, 0, 0)),
+        ),
+    ],
+)
+def test_classify_claim(row, expected):
+    now = utc(2026, 10, 17, 12, 30, 15)
+    assert classify_claim(CronSchedule("@hourly"), row, now) == expected
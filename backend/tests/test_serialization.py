@@ -0,0 +1,112 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.models.schemas import InventoryItemDetail
+from app.routers.products import INVENTORY_DETAIL_COLUMNS, inventory_detail_serializer
+from app.serialization import dumps_json, dumps_json_stdlib, select_fields
+
+COLUMNS = [
+    ("id", "c_id"),
+    ("quantity", "c_quantity"),
+    ("product.id", "c_product_id"),
+    ("product.name", "c_product_name"),
+    ("product.category.name", "c_category_name"),
+    ("store", "c_store"),
+    ("store_id", "c_store_id"),
+]
+
+
+@pytest.mark.parametrize("fields", [None, ""])
+def test_no_fields_keeps_every_column(fields):
+    assert select_fields(COLUMNS, fields) == COLUMNS
+
+
+def test_returns_a_copy():
+    selected = select_fields(COLUMNS, None)
+    selected.pop()
+    assert len(COLUMNS) == 7
+
+
+@pytest.mark.parametrize(
+    ("fields", "paths"),
+    [
+        ("id", ["id"]),
+        ("quantity,id", ["id", "quantity"]),
+        (" id , quantity ,", ["id", "quantity"]),
+        ("product", ["product.id", "product.name", "product.category.name"]),
+        ("product.category", ["product.category.name"]),
+        ("product.name,product", ["product.id", "product.name", "product.category.name"]),
+        # A prefix only selects whole path segments
+        ("store", ["store"]),
+        ("store_id", ["store_id"]),
+    ],
+)
+def test_selects_paths_and_nested_columns(fields, paths):
+    assert select_fields(COLUMNS, fields) == [(path, column) for path, column in COLUMNS if path in paths]
+
+
+@pytest.mark.parametrize(
+    ("fields", "unknown"),
+    [
+        ("price", "price"),
+        ("id,price,cost", "price, cost"),
+        ("prod", "prod"),
+        ("product.category.name.x", "product.category.name.x"),
+    ],
+)
+def test_unknown_fields_raise(fields, unknown):
+    with pytest.raises(ValueError, match=f"Unknown fields: {unknown}$"):
+        select_fields(COLUMNS, fields)
+
+
+def _inventory_detail_row():
+    created = datetime(2026, 10, 17, 3, 4, 5, 123456, tzinfo=timezone.utc)
+    updated = datetime(2026, 10, 17, 9, 0, tzinfo=timezone.utc)
+    values = {
+        "id": 7,
+        "product_id": 3,
+        "store_id": 2,
+        "quantity": 40,
+        "expiration_date": date(2026, 11, 1),
+        "manufacturing_date": None,
+        "purchase_date": date(2026, 10, 1),
+        "batch_number": "B-7",
+        "unit_price": Decimal("12.50"),
+        "created_at": created,
+        "updated_at": updated,
+        "product.id": 3,
+        "product.name": "Buquê Primavera",
+        "product.category_id": 5,
+        "product.description": None,
+        "product.created_at": created,
+        "product.updated_at": updated,
+        "product.category.id": 5,
+        "product.category.name": "Flores",
+        "product.category.description": "Arranjos",
+        "product.category.created_at": created - timedelta(days=30),
+        "product.category.updated_at": updated,
+        "store.id": 2,
+        "store.name": "Jardins",
+        "store.location": "São Paulo",
+        "store.created_at": created,
+        "store.updated_at": updated,
+        "days_until_expiry": -15,
+    }
+    return tuple(values[path] for path, _ in INVENTORY_DETAIL_COLUMNS)
+
+
+def test_row_serializer_matches_the_response_model():
+    row = _inventory_detail_row()
+    expected = InventoryItemDetail.model_validate(inventory_detail_serializer.to_dict(row)).model_dump(mode="json")
+    assert json.loads(inventory_detail_serializer.dumps(row)) == expected
+    assert expected["created_at"] == "2026-10-17T03:04:05.123456Z"
+
+
+def test_stdlib_encoder_matches_orjson():
+    value = inventory_detail_serializer.to_dict(_inventory_detail_row())
+    value["offset"] = datetime(2026, 10, 17, tzinfo=timezone(timedelta(hours=-3)))
+    value["naive"] = datetime(2026, 10, 17, 12, 0)
+    assert dumps_json_stdlib(value) == dumps_json(value)